@@ -20,11 +20,81 @@ class Settings(BaseSettings):
 
     # LLM settings
     default_llm_provider: str = "openai"
-    chunking_threshold: int = 6000
+    chunking_threshold: int = 6000  # Max tokens per chunk
+    chunk_tokenizer: str = "heuristic"  # heuristic or tiktoken (if installed)
+    chunk_fill_ratio: float = 0.9  # Share of the model's input budget a chunk may use
+    chunk_content_defined: bool = False  # Edit-stable boundaries (about 16% more chunks): new versions reuse cached chunks
+    llm_max_concurrency: int = 4  # Parallel chunk analyses per conversion
+    llm_global_concurrency: int = 8  # Chunk analyses in flight across all conversions
+
+    # LLM rate limits per provider account and model (0 = learn from headers)
+    llm_requests_per_minute: int = 0
+    llm_tokens_per_minute: int = 0
+    llm_rate_limit_retries: int = 5  # Retries of a call rejected with 429
+    llm_max_rate_limiters: int = 256  # Limiters kept (least recently used idle ones dropped)
+    llm_max_retries: int = 3  # Retries after a timeout, connection error or 5xx
+    llm_repair_followups: bool = True  # Ask the model to continue/fix invalid JSON
+
+    # Identical conversions in progress share one run
+    conversion_coalescing: bool = True
+
+    # Text extraction (off the event loop: 'process' or 'thread' pool)
+    extraction_executor: str = "process"
+    extraction_workers: int = 2
+    pdf_parallel_min_pages: int = 50  # Split PDF pages across workers from this size
 
     # Timeouts
     llm_timeout_seconds: int = 120
 
+    # LLM HTTP connection pool (shared per provider base URL)
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_keepalive_expiry_seconds: float = 30.0
+    llm_max_clients: int = 32  # Pooled clients kept (one per base URL, least recently used closed)
+    llm_http2: bool = True  # Used only if the 'h2' package is installed
+    llm_streaming: bool = False  # Stream completions and parse sections as they arrive
+
+    # Models labelled by name in LLM metrics (comma-separated); other names,
+    # chosen by callers, are counted as "other"
+    llm_metric_models: str = (
+        "gpt-4o,gpt-4-turbo,gpt-4,gpt-3.5-turbo,"
+        "claude-3-5-sonnet-20241022,claude-3-opus-20240229,claude-3-haiku-20240307,"
+        "devstral-small-2-24b-instruct-2512,qwen2.5-vl-32b-instruct,local-model"
+    )
+
+    # Analysis cache (memory LRU + SQLite, empty path disables the disk tier)
+    analysis_cache_enabled: bool = True
+    analysis_cache_memory_entries: int = 256
+    analysis_cache_path: str = ".cache/analysis.sqlite3"
+    analysis_cache_ttl_seconds: int = 7 * 24 * 3600
+    analysis_cache_max_disk_entries: int = 10000
+
+    # PDF rendering (pool of warm Chromium instances)
+    pdf_browser_pool_size: int = 2
+    pdf_browser_max_renders: int = 50  # Recycle a browser after N PDFs
+    pdf_browser_warmup: bool = False  # Launch browsers on startup
+
+    # Batch conversion
+    batch_max_files: int = 500
+    batch_max_size_mb: int = 1024  # Whole request (files or zip)
+    batch_concurrency: int = 4  # Documents converted at once in a batch
+
+    # Compression of result downloads (brotli if the 'brotli' package is installed)
+    response_compression_min_bytes: int = 1024
+    response_gzip_level: int = 6
+    response_brotli_quality: int = 5
+
+    # Offline assets: embed bundled fonts, no request to Google Fonts
+    offline_assets: bool = False
+
+    # Asynchronous jobs
+    job_workers: int = 2
+    job_queue_size: int = 100
+    job_store: str = "memory"  # memory or sqlite
+    job_store_path: str = ".cache/jobs.sqlite3"
+    job_ttl_seconds: int = 3600  # Finished jobs are kept this long
+    job_inline_result_max_kb: int = 512  # Larger outputs only via result_url
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -14,12 +14,14 @@ class DOCXExtractor:
     def __init__(self):
         self.supported_extensions = [".docx"]
 
-    def extract(self, file_path: str | Path) -> str:
+    def extract(self, file_path: str | Path, filename: Optional[str] = None) -> str:
         """
         Extract text from a DOCX file.
 
         Args:
             file_path: Path to the DOCX file.
+            filename: Original filename (for error messages), if the file
+                is a temporary copy.
 
         Returns:
             Extracted text content.
@@ -36,7 +38,7 @@ class DOCXExtractor:
         if file_path.suffix.lower() not in self.supported_extensions:
             raise ValueError(f"Unsupported file type: {file_path.suffix}")
 
-        return self._extract_text(file_path)
+        return self._extract_text(file_path, filename)
 
     def extract_from_bytes(self, content: bytes, filename: str = "document.docx") -> str:
         """
@@ -55,13 +57,13 @@ class DOCXExtractor:
         except Exception as e:
             raise ValueError(f"Failed to parse DOCX '{filename}': {e}")
 
-    def _extract_text(self, file_path: Path) -> str:
+    def _extract_text(self, file_path: Path, filename: Optional[str] = None) -> str:
         """Extract text from a DOCX file path."""
         try:
             doc = Document(file_path)
             return self._process_document(doc)
         except Exception as e:
-            raise ValueError(f"Failed to parse DOCX '{file_path}': {e}")
+            raise ValueError(f"Failed to parse DOCX '{filename or file_path}': {e}")
 
     def _process_document(self, doc: Document) -> str:
         """Process a python-docx document and extract text."""
@@ -1,6 +1,8 @@
 """PDF text extraction using PyMuPDF."""
 
+import asyncio
 import fitz  # PyMuPDF
+from concurrent.futures import Executor
 from typing import Optional
 from pathlib import Path
 
@@ -11,12 +13,14 @@ class PDFExtractor:
     def __init__(self):
         self.supported_extensions = [".pdf"]
 
-    def extract(self, file_path: str | Path) -> str:
+    def extract(self, file_path: str | Path, filename: Optional[str] = None) -> str:
         """
         Extract text from a PDF file.
 
         Args:
             file_path: Path to the PDF file.
+            filename: Original filename (for error messages), if the file
+                is a temporary copy.
 
         Returns:
             Extracted text content.
@@ -33,7 +37,7 @@ class PDFExtractor:
         if file_path.suffix.lower() not in self.supported_extensions:
             raise ValueError(f"Unsupported file type: {file_path.suffix}")
 
-        return self._extract_text(file_path)
+        return self._extract_text(file_path, filename)
 
     def extract_from_bytes(self, content: bytes, filename: str = "document.pdf") -> str:
         """
@@ -52,25 +56,75 @@ class PDFExtractor:
         except Exception as e:
             raise ValueError(f"Failed to parse PDF '{filename}': {e}")
 
-    def _extract_text(self, file_path: Path) -> str:
+    def _extract_text(self, file_path: Path, filename: Optional[str] = None) -> str:
         """Extract text from a PDF file path."""
         try:
             doc = fitz.open(file_path)
             return self._process_document(doc)
         except Exception as e:
-            raise ValueError(f"Failed to parse PDF '{file_path}': {e}")
+            raise ValueError(f"Failed to parse PDF '{filename or file_path}': {e}")
+
+    async def extract_parallel(
+        self,
+        file_path: str | Path,
+        executor: Executor,
+        workers: int,
+        min_pages: int = 50,
+        filename: Optional[str] = None,
+    ) -> str:
+        """
+        Extract text from a PDF file, splitting pages across workers.
 
-    def _process_document(self, doc: fitz.Document) -> str:
-        """Process a PyMuPDF document and extract text."""
-        text_parts = []
+        Each worker opens the file itself and extracts a contiguous page
+        range; results are joined in page order with the usual markers.
+        Documents under `min_pages` pages are extracted in one task.
+
+        Args:
+            file_path: Path to the PDF file.
+            executor: Executor running the page ranges (a process pool).
+            workers: Number of page ranges to run in parallel.
+            min_pages: Page count from which extraction is split.
+            filename: Original filename (for error messages).
+
+        Returns:
+            Extracted text content.
+        """
+        file_path = str(file_path)
+        filename = filename or file_path
+
+        try:
+            page_count = await asyncio.to_thread(_page_count, file_path)
+        except Exception as e:
+            raise ValueError(f"Failed to parse PDF '{filename}': {e}")
 
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text = page.get_text("text")
+        ranges = self._split_pages(page_count, workers if page_count >= min_pages else 1)
 
-            if text.strip():
-                text_parts.append(f"--- Page {page_num + 1} ---\n{text}")
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, _extract_page_range, file_path, start, stop, filename)
+            for start, stop in ranges
+        ))
 
+        return "\n\n".join(part for parts in results for part in parts)
+
+    @staticmethod
+    def _split_pages(page_count: int, workers: int) -> list[tuple[int, int]]:
+        """Split [0, page_count) into at most `workers` contiguous ranges."""
+        workers = max(1, min(workers, page_count))
+        size, extra = divmod(page_count, workers)
+        ranges = []
+        start = 0
+
+        for i in range(workers):
+            stop = start + size + (1 if i < extra else 0)
+            ranges.append((start, stop))
+            start = stop
+
+        return ranges
+
+    def _process_document(self, doc: fitz.Document) -> str:
+        """Process a PyMuPDF document and extract text."""
+        text_parts = _page_texts(doc, 0, len(doc))
         doc.close()
 
         return "\n\n".join(text_parts)
@@ -102,5 +156,34 @@ class PDFExtractor:
         }
 
 
+def _page_texts(doc: fitz.Document, start: int, stop: int) -> list[str]:
+    """Extract pages [start, stop) as text parts with page markers."""
+    text_parts = []
+
+    for page_num in range(start, stop):
+        page = doc[page_num]
+        text = page.get_text("text")
+
+        if text.strip():
+            text_parts.append(f"--- Page {page_num + 1} ---\n{text}")
+
+    return text_parts
+
+
+def _page_count(file_path: str) -> int:
+    """Return the number of pages of a PDF file."""
+    with fitz.open(file_path) as doc:
+        return len(doc)
+
+
+def _extract_page_range(file_path: str, start: int, stop: int, filename: str) -> list[str]:
+    """Extract a page range in a worker process."""
+    try:
+        with fitz.open(file_path) as doc:
+            return _page_texts(doc, start, stop)
+    except Exception as e:
+        raise ValueError(f"Failed to parse PDF '{filename}': {e}")
+
+
 # Singleton instance
 pdf_extractor = PDFExtractor()
@@ -1,15 +1,63 @@
 """FastAPI application for AutoDoc."""
 
-import json
+import asyncio
 import base64
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import json
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import (
+    FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+)
+from starlette.background import BackgroundTask
 
 from .config import settings
-from .models import LLMConfig, LLMProvider, OutputFormat, ConversionResponse, HealthResponse
-from .services.converter import conversion_service
+from .metrics import JOBS_QUEUED, metrics
+from .responses import (
+    artifact_response, compress_stream, content_disposition, negotiate_encoding
+)
+from .models import (
+    LLMConfig, LLMProvider, OutputFormat, ConversionResponse, HealthResponse,
+    JobInfo, JobStatus,
+)
+from .services.batch import batch_converter
+from .services.converter import ConversionError, conversion_service
+from .services.html_generator import html_generator
+from .services.jobs import JobQueueFullError, job_manager
+from .services.llm_service import llm_service
 from .services.pdf_generator import pdf_generator
+from .templates.fonts import FONTS_DIR, missing_fonts
+
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Room for the multipart envelope and form fields around the file
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown."""
+    if settings.offline_assets:
+        # Without them every page would silently render with system fonts
+        missing = missing_fonts()
+        if missing:
+            raise RuntimeError(
+                f"OFFLINE_ASSETS=true but fonts are missing from {FONTS_DIR}: "
+                f"{', '.join(missing)} (see README.md in that folder)"
+            )
+    await llm_service.startup()
+    if settings.pdf_browser_warmup:
+        await pdf_generator.start()
+    await job_manager.start()
+    yield
+    await job_manager.shutdown()
+    await pdf_generator.shutdown()
+    await llm_service.shutdown()
+    conversion_service.shutdown()
 
 
 # Create FastAPI app
@@ -17,9 +65,30 @@ app = FastAPI(
     title="AutoDoc API",
     description="Convert PDF/DOCX documents to professional HTML reports",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Configure CORS
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject uploads whose declared size is over the limit before reading them."""
+    content_length = request.headers.get("content-length", "")
+
+    if request.method == "POST" and content_length.isdigit():
+        max_size_mb = (
+            settings.batch_max_size_mb if request.url.path == "/convert/batch"
+            else settings.max_file_size_mb
+        )
+        max_size_bytes = max_size_mb * 1024 * 1024 + UPLOAD_FORM_OVERHEAD_BYTES
+        if int(content_length) > max_size_bytes:
+            return JSONResponse(
+                status_code=400,
+                content={"detail": _too_large(max_size_mb).detail},
+            )
+
+    return await call_next(request)
+
+
+# Configure CORS (added last so it also wraps early rejections)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins.split(","),
@@ -38,6 +107,9 @@ async def root():
         "endpoints": {
             "health": "/health",
             "convert": "/convert",
+            "batch": "/convert/batch",
+            "jobs": "/jobs",
+            "metrics": "/metrics",
         }
     }
 
@@ -48,34 +120,54 @@ async def health_check():
     return HealthResponse(status="healthy", version="1.0.0")
 
 
-@app.post("/convert", response_model=ConversionResponse)
-async def convert_document(
-    file: UploadFile = File(...),
-    llm_config: str = Form(...),
-    output_format: str = Form("html"),
-):
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
     """
-    Convert a document to HTML or PDF.
-
-    Args:
-        file: Uploaded PDF or DOCX file.
-        llm_config: JSON string with LLM configuration.
-        output_format: Output format ('html' or 'pdf').
+    Expose metrics in the Prometheus text format.
 
-    Returns:
-        ConversionResponse with HTML/PDF content or error.
+    Stage latencies, LLM call latency per provider and model, tokens,
+    cache hits, retries, errors and work in progress.
     """
-    # Validate output format
+    JOBS_QUEUED.set(job_manager.queue_size - job_manager.free_slots())
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def _parse_output_format(output_format: str) -> OutputFormat:
+    """Validate the requested output format."""
     try:
-        fmt = OutputFormat(output_format.lower())
+        return OutputFormat(output_format.lower())
     except ValueError:
         raise HTTPException(
             status_code=400,
             detail="Format de sortie invalide. Utilisez 'html' ou 'pdf'."
         )
 
+
+def _too_large(max_size_mb: Optional[int] = None) -> HTTPException:
+    """Error returned for uploads over the size limit."""
+    return HTTPException(
+        status_code=400,
+        detail=f"Fichier trop volumineux. Taille max: {max_size_mb or settings.max_file_size_mb}MB"
+    )
+
+
+async def _spool_upload(
+    file: UploadFile,
+    allowed_extensions: Optional[list[str]] = None,
+    max_size_mb: Optional[int] = None,
+) -> Path:
+    """
+    Validate the uploaded file and copy it to a temporary file.
+
+    The upload is copied in chunks and rejected as soon as it exceeds the
+    size limit, so it is never held in memory. The caller owns the
+    returned file and must delete it.
+    """
     # Validate file type
-    allowed_extensions = settings.allowed_extensions.split(",")
+    allowed_extensions = allowed_extensions or settings.allowed_extensions.split(",")
     file_ext = file.filename.lower().split(".")[-1] if file.filename else ""
 
     if file_ext not in allowed_extensions:
@@ -85,16 +177,32 @@ async def convert_document(
         )
 
     # Validate file size
-    content = await file.read()
-    max_size_bytes = settings.max_file_size_mb * 1024 * 1024
+    max_size_mb = max_size_mb or settings.max_file_size_mb
+    max_size_bytes = max_size_mb * 1024 * 1024
 
-    if len(content) > max_size_bytes:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Fichier trop volumineux. Taille max: {settings.max_file_size_mb}MB"
-        )
+    if file.size is not None and file.size > max_size_bytes:
+        raise _too_large(max_size_mb)
+
+    tmp = tempfile.NamedTemporaryFile(suffix=f".{file_ext}", delete=False)
+    path = Path(tmp.name)
+    size = 0
 
-    # Parse LLM config
+    try:
+        with tmp:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size_bytes:
+                    raise _too_large(max_size_mb)
+                tmp.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+    return path
+
+
+def _parse_llm_config(llm_config: str) -> LLMConfig:
+    """Parse and validate the LLM configuration sent by the client."""
     try:
         config_data = json.loads(llm_config)
         config = LLMConfig(**config_data)
@@ -124,92 +232,392 @@ async def convert_document(
             detail="URL de base requise pour le provider custom"
         )
 
-    # Convert document to HTML
-    result = await conversion_service.convert(
-        file_content=content,
-        filename=file.filename or "document",
-        llm_config=config
-    )
+    return config
 
-    # If PDF requested and HTML conversion succeeded, generate PDF
-    if fmt == OutputFormat.PDF and result.success and result.html:
-        try:
-            pdf_bytes = await pdf_generator.generate_pdf_async(result.html)
-            pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-            result.pdf_base64 = pdf_base64
-            result.format = "pdf"
-            result.filename = result.filename.replace('.html', '.pdf') if result.filename else "document.pdf"
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Erreur lors de la génération du PDF: {str(e)}"
-            )
 
+@app.post("/convert", response_model=ConversionResponse)
+async def convert_document(
+    file: UploadFile = File(...),
+    llm_config: str = Form(...),
+    output_format: str = Form("html"),
+):
+    """
+    Convert a document to HTML or PDF.
+
+    Args:
+        file: Uploaded PDF or DOCX file.
+        llm_config: JSON string with LLM configuration.
+        output_format: Output format ('html' or 'pdf').
+
+    Returns:
+        ConversionResponse with HTML/PDF content or error. A PDF larger
+        than `job_inline_result_max_kb` is not inlined: result_url points
+        to its download instead. A failed PDF rendering is an HTTP 500
+        error.
+    """
+    fmt = _parse_output_format(output_format)
+    config = _parse_llm_config(llm_config)
+    path = await _spool_upload(file)
+
+    try:
+        result = await conversion_service.convert(
+            file_content=path,
+            filename=file.filename or "document",
+            llm_config=config,
+            output_format=fmt,
+        )
+    finally:
+        path.unlink(missing_ok=True)
+
+    if result.error_stage == "pdf":
+        raise HTTPException(status_code=500, detail=result.error)
+    if result.pdf is not None:
+        if len(result.pdf) <= settings.job_inline_result_max_kb * 1024:
+            result.pdf_base64 = base64.b64encode(result.pdf).decode('utf-8')
+        else:
+            # Base64 in JSON would cost a third more, in memory and on the wire
+            job = await job_manager.keep_result(result)
+            result.result_url = f"/jobs/{job.id}/file"
     return result
 
 
 @app.post("/convert/download")
 async def convert_and_download(
+    request: Request,
     file: UploadFile = File(...),
     llm_config: str = Form(...),
+    output_format: str = Form("html"),
 ):
     """
-    Convert a document and return HTML as downloadable file.
+    Convert a document and return it as a downloadable file.
 
-    Same as /convert but returns the HTML directly for download.
+    Same as /convert but returns the output directly: HTML is streamed
+    section by section instead of building the whole page in memory, PDF
+    is sent as binary application/pdf.
     """
-    # Use the same logic as convert_document
-    allowed_extensions = settings.allowed_extensions.split(",")
-    file_ext = file.filename.lower().split(".")[-1] if file.filename else ""
+    fmt = _parse_output_format(output_format)
+    config = _parse_llm_config(llm_config)
+    path = await _spool_upload(file)
+    filename = file.filename or "document"
 
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Type de fichier non supporté. Extensions autorisées: {', '.join(allowed_extensions)}"
+    if fmt == OutputFormat.PDF:
+        try:
+            result = await conversion_service.convert(
+                file_content=path,
+                filename=filename,
+                llm_config=config,
+                output_format=fmt,
+            )
+        finally:
+            path.unlink(missing_ok=True)
+
+        if not result.success:
+            raise HTTPException(status_code=500, detail=result.error)
+        return await _file_response(request, result)
+
+    try:
+        doc_structure = await conversion_service.analyze(
+            file_content=path,
+            filename=filename,
+            llm_config=config
         )
+    except ConversionError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        path.unlink(missing_ok=True)
+
+    output_filename = conversion_service._generate_output_filename(filename)
+    headers = {
+        "Content-Disposition": content_disposition(output_filename),
+        "Vary": "Accept-Encoding",
+    }
+    body = html_generator.generate_iter(doc_structure)
+
+    # Compressed on the fly, fragment by fragment
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding:
+        body = compress_stream(body, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return StreamingResponse(
+        body,
+        media_type="text/html; charset=utf-8",
+        headers=headers
+    )
+
+
+async def _file_response(request: Request, result: ConversionResponse) -> Response:
+    """Return the output of a successful conversion as a binary download."""
+    if result.pdf is not None:
+        content, media_type = result.pdf, "application/pdf"
+    else:
+        content, media_type = (result.html or "").encode("utf-8"), "text/html; charset=utf-8"
+
+    return await artifact_response(
+        request,
+        content,
+        media_type,
+        headers={"Content-Disposition": content_disposition(result.filename or "document")}
+    )
+
+
+async def _spool_batch(files: list[UploadFile]) -> list[tuple[str, Path]]:
+    """
+    Spool the files of a batch, expanding zip archives.
+
+    Returns:
+        (filename, path) pairs. The caller owns the files.
+    """
+    allowed_extensions = settings.allowed_extensions.split(",")
+    max_file_bytes = settings.max_file_size_mb * 1024 * 1024
+    max_total_bytes = settings.batch_max_size_mb * 1024 * 1024
+    spooled: list[tuple[str, Path]] = []
 
-    content = await file.read()
-    max_size_bytes = settings.max_file_size_mb * 1024 * 1024
+    try:
+        for file in files:
+            filename = file.filename or "document"
+
+            if not filename.lower().endswith(".zip"):
+                spooled.append((filename, await _spool_upload(file)))
+            else:
+                archive = await _spool_upload(
+                    file, ["zip"], max_size_mb=settings.batch_max_size_mb
+                )
+                try:
+                    spooled.extend(await asyncio.to_thread(
+                        batch_converter.expand_zip,
+                        archive,
+                        allowed_extensions,
+                        max_file_bytes,
+                        max_total_bytes,
+                        settings.batch_max_files - len(spooled),
+                    ))
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=f"Archive invalide: {str(e)}")
+                finally:
+                    archive.unlink(missing_ok=True)
+
+            if len(spooled) > settings.batch_max_files:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Trop de fichiers. Maximum: {settings.batch_max_files}"
+                )
+    except BaseException:
+        batch_converter.discard(spooled)
+        raise
+
+    if not spooled:
+        raise HTTPException(status_code=400, detail="Aucun document PDF ou DOCX à convertir")
+
+    return spooled
+
+
+@app.post("/convert/batch")
+async def convert_batch(
+    files: list[UploadFile] = File(...),
+    llm_config: str = Form(...),
+    output_format: str = Form("html"),
+    delivery: str = Form("zip"),
+):
+    """
+    Convert many documents at once.
+
+    Accepts several PDF/DOCX files and/or zip archives of them. All the
+    chunks of the batch share the global LLM concurrency limit.
+
+    Args:
+        files: Uploaded documents or zip archives.
+        llm_config: JSON string with LLM configuration.
+        output_format: Output format ('html' or 'pdf').
+        delivery: 'zip' to wait and get a zip of the outputs (with a
+            resultats.json summary), written to disk as each document
+            finishes; or 'jobs' to get one job per file right away,
+            without keeping the request open for the whole batch.
 
-    if len(content) > max_size_bytes:
+    Returns:
+        The zip archive, or the list of queued jobs (202).
+    """
+    fmt = _parse_output_format(output_format)
+    config = _parse_llm_config(llm_config)
+
+    if delivery not in ("zip", "jobs"):
         raise HTTPException(
             status_code=400,
-            detail=f"Fichier trop volumineux. Taille max: {settings.max_file_size_mb}MB"
+            detail="Mode de livraison invalide. Utilisez 'zip' ou 'jobs'."
         )
 
+    spooled = await _spool_batch(files)
+
+    if delivery == "jobs":
+        if job_manager.free_slots() < len(spooled):
+            batch_converter.discard(spooled)
+            raise HTTPException(
+                status_code=503,
+                detail="Trop de conversions en attente, réessayez plus tard.",
+                headers={"Retry-After": "30"},
+            )
+
+        jobs = []
+        for index, (filename, path) in enumerate(spooled):
+            try:
+                # The job owns the spooled file from here on
+                job = await job_manager.submit(
+                    file_content=path,
+                    filename=filename,
+                    llm_config=config,
+                    output_format=fmt,
+                )
+            except JobQueueFullError:
+                batch_converter.discard(spooled[index + 1:])
+                raise HTTPException(
+                    status_code=503,
+                    detail="Trop de conversions en attente, réessayez plus tard.",
+                    headers={"Retry-After": "30"},
+                )
+            jobs.append(job.model_dump(mode="json"))
+
+        return JSONResponse(status_code=202, content=jobs)
+
     try:
-        config_data = json.loads(llm_config)
-        config = LLMConfig(**config_data)
-    except Exception as e:
+        archive = await batch_converter.convert_to_archive(spooled, config, fmt)
+    finally:
+        batch_converter.discard(spooled)
+
+    return FileResponse(
+        archive,
+        media_type="application/zip",
+        filename="autodoc_conversions.zip",
+        background=BackgroundTask(archive.unlink, missing_ok=True),
+    )
+
+
+@app.post("/jobs", response_model=JobInfo, status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    llm_config: str = Form(...),
+    output_format: str = Form("html"),
+):
+    """
+    Queue a conversion and return its job ID immediately.
+
+    Takes the same form fields as /convert. Poll /jobs/{id} for progress
+    and fetch /jobs/{id}/result once the job is completed, then the output
+    itself from /jobs/{id}/file.
+    """
+    fmt = _parse_output_format(output_format)
+    config = _parse_llm_config(llm_config)
+    path = await _spool_upload(file)
+
+    try:
+        # The job owns the spooled file from here on
+        return await job_manager.submit(
+            file_content=path,
+            filename=file.filename or "document",
+            llm_config=config,
+            output_format=fmt,
+        )
+    except JobQueueFullError:
         raise HTTPException(
-            status_code=400,
-            detail=f"Configuration LLM invalide: {str(e)}"
+            status_code=503,
+            detail="Trop de conversions en attente, réessayez plus tard.",
+            headers={"Retry-After": "30"},
         )
 
-    if not config.api_key:
-        raise HTTPException(status_code=400, detail="Clé API requise")
 
-    if config.provider == LLMProvider.CUSTOM and not config.base_url:
-        raise HTTPException(status_code=400, detail="URL de base requise pour provider custom")
+async def _get_job_or_404(job_id: str) -> JobInfo:
+    """Return a job or raise 404."""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche introuvable")
+    return job
 
-    result = await conversion_service.convert(
-        file_content=content,
-        filename=file.filename or "document",
-        llm_config=config
-    )
 
-    if not result.success:
-        raise HTTPException(status_code=500, detail=result.error)
+@app.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    """Return a job's status and progress."""
+    return await _get_job_or_404(job_id)
 
-    # Return HTML as response
-    return HTMLResponse(
-        content=result.html,
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Stream a job's progress as server-sent events.
+
+    Events: status (snapshot), extracting, extracted, analyzing,
+    section_ready, chunk_analyzed, analyzed, generating, generated,
+    rendering, rendered, then completed or failed. Stage end events carry duration_ms.
+    """
+    await _get_job_or_404(job_id)
+
+    async def event_stream():
+        async for event, data in job_manager.events(job_id):
+            if event == "ping":
+                yield ": ping\n\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
         headers={
-            "Content-Disposition": f"attachment; filename={result.filename}"
-        }
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+        },
     )
 
 
+@app.get("/jobs/{job_id}/result", response_model=ConversionResponse)
+async def get_job_result(job_id: str, request: Request):
+    """
+    Return the result of a finished job.
+
+    result_url points to the binary output (/jobs/{id}/file). The HTML and
+    PDF are also inlined (PDF as base64) when smaller than
+    `job_inline_result_max_kb`. Responses carry an ETag and are compressed
+    when the client accepts it.
+    """
+    job = await _get_job_or_404(job_id)
+
+    if job.status not in (JobStatus.COMPLETED, JobStatus.FAILED):
+        raise HTTPException(status_code=409, detail="La conversion n'est pas terminée")
+
+    result = await job_manager.get_result(job_id)
+    if result is None:
+        return ConversionResponse(success=False, error=job.error)
+    if not result.success:
+        return result
+
+    max_inline = settings.job_inline_result_max_kb * 1024
+    html = result.html if result.html and len(result.html) <= max_inline else None
+    pdf_base64 = None
+    if result.pdf is not None and len(result.pdf) <= max_inline:
+        pdf_base64 = base64.b64encode(result.pdf).decode('utf-8')
+
+    result = result.model_copy(update={
+        "html": html,
+        "pdf_base64": pdf_base64,
+        "result_url": f"/jobs/{job_id}/file",
+    })
+    return await artifact_response(
+        request, result.model_dump_json().encode("utf-8"), "application/json"
+    )
+
+
+@app.get("/jobs/{job_id}/file")
+async def download_job_file(job_id: str, request: Request):
+    """Download the output of a completed job: application/pdf or text/html."""
+    job = await _get_job_or_404(job_id)
+
+    if job.status not in (JobStatus.COMPLETED, JobStatus.FAILED):
+        raise HTTPException(status_code=409, detail="La conversion n'est pas terminée")
+
+    result = await job_manager.get_result(job_id)
+    if result is None or not result.success:
+        raise HTTPException(status_code=404, detail="Résultat introuvable")
+
+    return await _file_response(request, result)
+
+
 # Run with: uvicorn backend.app.main:app --reload
 if __name__ == "__main__":
     import uvicorn
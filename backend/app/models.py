@@ -224,6 +224,32 @@ class ConversionResponse(BaseModel):
     error: Optional[str] = None
     filename: Optional[str] = None
     format: str = "html"
+    result_url: Optional[str] = None  # Binary download of the output (jobs, large PDFs)
+    pdf: Optional[bytes] = Field(default=None, exclude=True)  # Rendered PDF, kept server-side
+    error_stage: Optional[str] = Field(default=None, exclude=True)  # "pdf" if rendering failed
+
+
+class JobStatus(str, Enum):
+    """Lifecycle of an asynchronous conversion job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobInfo(BaseModel):
+    """Status and progress of an asynchronous conversion job."""
+    id: str
+    status: JobStatus = JobStatus.QUEUED
+    stage: Optional[str] = None  # extracting, analyzing, generating, rendering
+    chunks_done: int = 0
+    chunks_total: int = 0
+    timings: dict[str, float] = {}  # Stage end event -> duration in ms
+    filename: Optional[str] = None
+    format: str = "html"
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
 
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,185 @@
+"""Compressed responses with strong ETags for converted documents."""
+
+import asyncio
+import gzip
+import hashlib
+import importlib.util
+import unicodedata
+import zlib
+from urllib.parse import quote
+from typing import Iterable, Iterator, Optional
+from fastapi import Request
+from fastapi.responses import Response
+from .config import settings
+
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Content codings in order of preference
+ENCODINGS = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+# Media types worth compressing (PDF and zip are already compressed)
+COMPRESSIBLE_TYPES = ("text/", "application/json")
+
+# Results are immutable but may be purged: always revalidate with the ETag
+CACHE_CONTROL = "private, no-cache"
+
+
+def content_disposition(filename: str) -> str:
+    """
+    Content-Disposition header value for downloading a file.
+
+    Header values are latin-1, so a name outside ASCII is sent twice: as a
+    quoted ASCII fallback, and as UTF-8 in `filename*` (RFC 5987), which
+    browsers prefer.
+
+    Args:
+        filename: Name of the downloaded file, e.g. "Cœur_converted.html".
+
+    Returns:
+        Header value, e.g. 'attachment; filename="C_ur_converted.html";
+        filename*=UTF-8\'\'C%C5%93ur_converted.html'.
+    """
+    # Accents become plain letters, other characters an underscore
+    decomposed = unicodedata.normalize("NFKD", filename)
+    fallback = "".join(
+        char if " " <= char <= "~" and char not in '"\\' else "_"
+        for char in decomposed
+        if not unicodedata.combining(char)
+    ) or "download"
+
+    value = f'attachment; filename="{fallback}"'
+    if fallback != filename:
+        value += f"; filename*=UTF-8''{quote(filename, safe='')}"
+    return value
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the content coding to use from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip;q=0.8, br".
+
+    Returns:
+        "br", "gzip", or None for identity.
+    """
+    weights: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    candidates = [
+        (weights.get(coding, weights.get("*", 0.0)), -rank, coding)
+        for rank, coding in enumerate(ENCODINGS)
+    ]
+    weight, _, coding = max(candidates)
+    return coding if weight > 0 else None
+
+
+def content_etag(content: bytes, encoding: Optional[str] = None) -> str:
+    """Strong ETag of a representation: content hash, plus its coding."""
+    return _etag(hashlib.sha256(content).hexdigest()[:32], encoding)
+
+
+def _etag(digest: str, encoding: Optional[str]) -> str:
+    """Format an ETag from a content digest."""
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etags: Iterable[str]) -> bool:
+    """Whether an If-None-Match header matches one of the ETags (weak comparison)."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    """Compress a body. Output is deterministic, so its ETag stays strong."""
+    if encoding == "br":
+        import brotli
+        return brotli.compress(content, quality=settings.response_brotli_quality)
+    return gzip.compress(content, compresslevel=settings.response_gzip_level, mtime=0)
+
+
+def compress_stream(fragments: Iterable[str], encoding: str) -> Iterator[bytes]:
+    """Compress text fragments as they are produced."""
+    if encoding == "br":
+        import brotli
+        compressor = brotli.Compressor(quality=settings.response_brotli_quality)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(settings.response_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+
+    for fragment in fragments:
+        data = process(fragment.encode("utf-8"))
+        if data:
+            yield data
+    yield finish()
+
+
+def is_compressible(media_type: str) -> bool:
+    """Whether a media type is worth compressing."""
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+async def artifact_response(
+    request: Request,
+    content: bytes,
+    media_type: str,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    """
+    Build a response for a stored result, with conditional GET and compression.
+
+    The ETag is derived from the content (one per content coding). A
+    request whose If-None-Match matches gets 304 without a body; otherwise
+    text bodies over `response_compression_min_bytes` are compressed with
+    the best coding the client accepts.
+
+    Args:
+        request: Incoming request (Accept-Encoding, If-None-Match).
+        content: Response body.
+        media_type: Content type of the body.
+        headers: Extra headers (e.g. Content-Disposition).
+
+    Returns:
+        200 response, or 304 if the client already has this content.
+    """
+    encoding = None
+    if is_compressible(media_type) and len(content) >= settings.response_compression_min_bytes:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    response_headers = {
+        **(headers or {}),
+        "ETag": _etag(digest, encoding),
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etags = [_etag(digest, coding) for coding in (None, *ENCODINGS)]
+        if _etag_matches(if_none_match, etags):
+            response_headers.pop("Content-Disposition", None)
+            return Response(status_code=304, headers=response_headers)
+
+    if encoding:
+        content = await asyncio.to_thread(compress, content, encoding)
+        response_headers["Content-Encoding"] = encoding
+
+    return Response(content=content, media_type=media_type, headers=response_headers)
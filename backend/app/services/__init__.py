@@ -1,11 +1,16 @@
 """Services for AutoDoc."""
 
+from .analysis_cache import AnalysisCache, analysis_cache
 from .llm_service import LLMService, llm_service
 from .html_generator import HTMLGenerator, html_generator
 from .converter import ConversionService, conversion_service
 from .pdf_generator import PDFGenerator, pdf_generator
+from .jobs import JobManager, job_manager
+from .batch import BatchConverter, batch_converter
 
 __all__ = [
+    "AnalysisCache",
+    "analysis_cache",
     "LLMService",
     "llm_service",
     "HTMLGenerator",
@@ -14,4 +19,8 @@ __all__ = [
     "conversion_service",
     "PDFGenerator",
     "pdf_generator",
+    "JobManager",
+    "job_manager",
+    "BatchConverter",
+    "batch_converter",
 ]
@@ -0,0 +1,188 @@
+"""Content-addressed cache of LLM analysis results."""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from ..models import LLMConfig, DocumentStructure
+from ..config import settings
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of validated DocumentStructure JSON.
+
+    Entries live in an in-memory LRU and, if a path is configured, in a
+    SQLite file shared across restarts. The disk tier expires entries after
+    `ttl_seconds` and keeps at most `max_disk_entries` rows.
+    """
+
+    def __init__(
+        self,
+        memory_entries: int = 256,
+        db_path: Optional[str | Path] = None,
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_disk_entries: int = 10000,
+    ):
+        self.memory_entries = memory_entries
+        self.db_path = Path(db_path) if db_path else None
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str, config: LLMConfig, prompt_version: str) -> str:
+        """
+        Build the cache key for a chunk analysis.
+
+        Args:
+            text: Chunk text sent to the LLM.
+            config: LLM configuration (the API key is not part of the key).
+            prompt_version: Hash of the system prompt.
+
+        Returns:
+            Hex digest identifying the analysis.
+        """
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        parts = [
+            text_hash,
+            config.provider.value,
+            config.model,
+            config.base_url or "",
+            prompt_version,
+        ]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[DocumentStructure]:
+        """Return the cached structure for a key, or None on a miss."""
+        value = self._memory_get(key)
+
+        if value is None and self.db_path:
+            value = await asyncio.to_thread(self._disk_get, key)
+            if value is not None:
+                self._memory_set(key, value)
+
+        if value is None:
+            return None
+
+        return DocumentStructure.model_validate_json(value)
+
+    async def set(self, key: str, doc: DocumentStructure) -> None:
+        """Store a validated structure under a key."""
+        value = doc.model_dump_json()
+        self._memory_set(key, value)
+
+        if self.db_path:
+            await asyncio.to_thread(self._disk_set, key, value)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        self._memory.clear()
+
+        if self.db_path:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM analysis_cache")
+                conn.commit()
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        """Look up a key in the LRU tier."""
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: str) -> None:
+        """Insert a key in the LRU tier, evicting the oldest entries."""
+        if self.memory_entries <= 0:
+            return
+
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite database on first use."""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        """Look up a key in the SQLite tier, honoring the TTL."""
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM analysis_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+
+            conn.execute(
+                "UPDATE analysis_cache SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+            conn.commit()
+            return value
+
+    def _disk_set(self, key: str, value: str) -> None:
+        """Insert a key in the SQLite tier and apply TTL/size eviction."""
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache "
+                "(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+
+            if self.ttl_seconds:
+                conn.execute(
+                    "DELETE FROM analysis_cache WHERE created_at < ?",
+                    (now - self.ttl_seconds,),
+                )
+
+            if self.max_disk_entries > 0:
+                conn.execute(
+                    "DELETE FROM analysis_cache WHERE key IN ("
+                    "SELECT key FROM analysis_cache "
+                    "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+
+            conn.commit()
+
+
+# Singleton instance
+analysis_cache = AnalysisCache(
+    memory_entries=settings.analysis_cache_memory_entries,
+    db_path=settings.analysis_cache_path or None,
+    ttl_seconds=settings.analysis_cache_ttl_seconds,
+    max_disk_entries=settings.analysis_cache_max_disk_entries,
+)
@@ -0,0 +1,224 @@
+"""Batch conversion: zip uploads, shared scheduling and zip results."""
+
+import asyncio
+import json
+import tempfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Optional
+from ..models import LLMConfig, ConversionResponse, OutputFormat
+from ..config import settings
+from .converter import conversion_service
+
+# Entries copied out of a zip archive in chunks of this size
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Summary of every document, written at the root of the result archive
+MANIFEST_NAME = "resultats.json"
+
+
+class BatchConverter:
+    """
+    Convert many documents in one request.
+
+    Documents run a few at a time, and all their chunks share the global
+    LLM limiter of `llm_service`, so a batch of hundreds of reports keeps
+    the provider busy without exceeding its concurrency.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = concurrency or settings.batch_concurrency
+
+    @staticmethod
+    def expand_zip(
+        zip_path: Path,
+        allowed_extensions: list[str],
+        max_file_bytes: int,
+        max_total_bytes: int,
+        max_files: int,
+    ) -> list[tuple[str, Path]]:
+        """
+        Copy the supported documents of a zip archive to temporary files.
+
+        Entries with other extensions (and folders) are skipped. Sizes are
+        checked against the declared and the actual uncompressed sizes, so
+        a zip bomb is rejected after at most the limit is written.
+
+        Args:
+            zip_path: Path to the zip archive.
+            allowed_extensions: Extensions to keep, without the dot.
+            max_file_bytes: Maximum size of one document.
+            max_total_bytes: Maximum size of all documents together.
+            max_files: Maximum number of documents.
+
+        Returns:
+            (filename, path) pairs. The caller owns the files.
+
+        Raises:
+            ValueError: If the archive is invalid or over a limit.
+        """
+        files: list[tuple[str, Path]] = []
+        total = 0
+
+        try:
+            with zipfile.ZipFile(zip_path) as archive:
+                for info in archive.infolist():
+                    name = PurePosixPath(info.filename).name
+                    ext = name.lower().rsplit(".", 1)[-1] if "." in name else ""
+                    if info.is_dir() or name.startswith(".") or ext not in allowed_extensions:
+                        continue
+                    if "__MACOSX" in PurePosixPath(info.filename).parts:
+                        continue
+
+                    if len(files) >= max_files:
+                        raise ValueError(f"Too many files in archive (max {max_files})")
+                    if info.file_size > max_file_bytes:
+                        raise ValueError(f"File too large in archive: {name}")
+
+                    tmp = tempfile.NamedTemporaryFile(suffix=f".{ext}", delete=False)
+                    path = Path(tmp.name)
+                    files.append((name, path))
+                    size = 0
+
+                    with tmp, archive.open(info) as entry:
+                        while chunk := entry.read(COPY_CHUNK_SIZE):
+                            size += len(chunk)
+                            total += len(chunk)
+                            if size > max_file_bytes:
+                                raise ValueError(f"File too large in archive: {name}")
+                            if total > max_total_bytes:
+                                raise ValueError("Archive too large once extracted")
+                            tmp.write(chunk)
+        except zipfile.BadZipFile as e:
+            BatchConverter.discard(files)
+            raise ValueError(f"Invalid zip archive: {e}")
+        except BaseException:
+            BatchConverter.discard(files)
+            raise
+
+        return files
+
+    @staticmethod
+    def discard(files: list[tuple[str, Path]]) -> None:
+        """Delete the temporary files of a batch."""
+        for _, path in files:
+            path.unlink(missing_ok=True)
+
+    async def convert_to_archive(
+        self,
+        files: list[tuple[str, Path]],
+        llm_config: LLMConfig,
+        output_format: OutputFormat = OutputFormat.HTML,
+    ) -> Path:
+        """
+        Convert every document of a batch into a zip archive.
+
+        Each output is written to the archive as soon as its conversion
+        finishes, so only the documents in progress are held in memory.
+        The archive holds one HTML or PDF file per converted document and
+        a resultats.json summary with the status (and error) of each one,
+        in upload order. A failed document doesn't stop the others.
+
+        Args:
+            files: (filename, path) pairs.
+            llm_config: LLM configuration shared by the batch.
+            output_format: Output format.
+
+        Returns:
+            Path to the temporary zip file. The caller owns it.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        write_lock = asyncio.Lock()
+        summary: list[dict] = [{} for _ in files]
+
+        # Named in upload order, whatever order the conversions finish in
+        used_names = {MANIFEST_NAME}
+        names = [
+            self._unique_name(self._output_name(source, output_format), used_names)
+            for source, _ in files
+        ]
+
+        tmp = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
+        path = Path(tmp.name)
+
+        async def convert(index: int, filename: str, source: Path) -> None:
+            async with semaphore:
+                try:
+                    result = await conversion_service.convert(
+                        file_content=source,
+                        filename=filename,
+                        llm_config=llm_config,
+                        output_format=output_format,
+                    )
+                except Exception as e:
+                    result = ConversionResponse(
+                        success=False,
+                        error=f"Erreur lors de la conversion: {str(e)}"
+                    )
+
+            entry = {"source": filename, "success": result.success}
+            if result.success:
+                # ZipFile allows one writer at a time
+                async with write_lock:
+                    await asyncio.to_thread(self._write_output, archive, names[index], result)
+                entry["output"] = names[index]
+            else:
+                entry["error"] = result.error
+            summary[index] = entry
+
+        try:
+            with tmp, zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                tasks = [
+                    asyncio.create_task(convert(index, filename, source))
+                    for index, (filename, source) in enumerate(files)
+                ]
+                try:
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    # Writing failed (e.g. disk full): stop the other documents
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    raise
+                archive.writestr(
+                    MANIFEST_NAME,
+                    json.dumps(summary, ensure_ascii=False, indent=2),
+                )
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+
+        return path
+
+    @staticmethod
+    def _write_output(archive: zipfile.ZipFile, name: str, result: ConversionResponse) -> None:
+        """Add the output of one converted document to the archive."""
+        if result.pdf is not None:
+            # PDF is already compressed
+            archive.writestr(name, result.pdf, compress_type=zipfile.ZIP_STORED)
+        else:
+            archive.writestr(name, result.html or "")
+
+    @staticmethod
+    def _output_name(source: str, output_format: OutputFormat) -> str:
+        """Name of a document's output, as the conversion service names it."""
+        name = conversion_service._generate_output_filename(source)
+        if output_format == OutputFormat.PDF:
+            name = name.replace(".html", ".pdf")
+        return name
+
+    @staticmethod
+    def _unique_name(name: str, used_names: set[str]) -> str:
+        """Make an archive entry name unique (same names from different folders)."""
+        candidate = name
+        index = 2
+        while candidate in used_names:
+            stem, dot, ext = name.rpartition(".")
+            candidate = f"{stem}_{index}.{ext}" if dot else f"{name}_{index}"
+            index += 1
+        used_names.add(candidate)
+        return candidate
+
+
+# Singleton instance
+batch_converter = BatchConverter()
@@ -0,0 +1,415 @@
+"""Token-aware splitting of extracted text into LLM-sized chunks."""
+
+import hashlib
+import importlib.util
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import Optional
+
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+
+# Context windows (tokens) of known models, matched by longest name prefix
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "o1": 200000,
+    "o3": 200000,
+    "o4": 200000,
+    "claude": 200000,
+}
+
+# Boundaries from coarsest to finest. A text is only split at a finer
+# level when one of its pieces is still too large.
+SPLIT_PATTERNS = (
+    re.compile(r"\n+(?=#{1,6} )"),              # Headings (DOCXExtractor)
+    re.compile(r"\n+(?=--- Page \d+ ---)"),     # Page markers (PDFExtractor)
+    re.compile(r"\n[ \t]*\n\s*"),               # Paragraphs
+    re.compile(r"\n"),                          # Lines
+    re.compile(r"(?<=[.!?…])\s+"),              # Sentences
+    re.compile(r"\s+"),                         # Words
+)
+
+# Letters, digits, whitespace runs and single symbols
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+|\s+|[^\w\s]|_")
+
+# Markdown structure emitted by the extractors
+_HEADING_PATTERN = re.compile(r"^(#{1,6}) +(.+?)\s*$", re.MULTILINE)
+_TABLE_PATTERN = re.compile(r"^\|.*\|[ \t]*(?:\n\|.*\|[ \t]*)*$", re.MULTILINE)
+_TABLE_SEPARATOR = re.compile(r"^\|[-:| \t]+\|[ \t]*$")
+
+# Tokens set aside for the heading breadcrumb of continuation chunks
+BREADCRUMB_MAX_TOKENS = 64
+BREADCRUMB_TITLE_CHARS = 60
+
+# A chunk at least this full closes before a new section rather than
+# taking its first lines
+SECTION_BREAK_FILL = 0.5
+
+# Content-defined boundaries: past CONTENT_MIN_FILL of the budget, a chunk
+# ends after a piece chosen by the hash of its text, on average every
+# CONTENT_CUT_SPAN of the budget. This costs about 16% more chunks than
+# greedy packing; a later start gets closer to it but stops resyncing
+# after an edit
+CONTENT_MIN_FILL = 0.7
+CONTENT_CUT_SPAN = 0.2
+
+
+class Tokenizer(ABC):
+    """Counts the tokens of a text."""
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Return the number of tokens of a text."""
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    Offline estimate of BPE token counts.
+
+    Mimics how BPE vocabularies cut text: short words are one token, long
+    words one token per ~4 letters, accented letters cost extra (they are
+    rarer in the vocabularies), digits go by groups of 3 and every symbol
+    is a token. It slightly overestimates, which keeps chunks safe.
+    """
+
+    def count(self, text: str) -> int:
+        tokens = 0
+        for piece in _TOKEN_PATTERN.findall(text):
+            first = piece[0]
+            if first.isspace():
+                # A single space or newline is merged into the next token
+                tokens += math.ceil((len(piece) - 1) / 4)
+            elif first.isdigit():
+                tokens += math.ceil(len(piece) / 3)
+            elif first.isalpha():
+                non_ascii = sum(1 for char in piece if ord(char) > 127)
+                tokens += max(1, math.ceil(len(piece) / 4)) + math.ceil(non_ascii / 2)
+            else:
+                tokens += 1
+        return tokens
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Exact counts with tiktoken (downloads its vocabulary on first use)."""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        import tiktoken
+
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def create_tokenizer(kind: str) -> Tokenizer:
+    """
+    Build the tokenizer selected in settings.
+
+    Args:
+        kind: 'heuristic' or 'tiktoken' (heuristic if tiktoken isn't installed).
+
+    Returns:
+        Tokenizer instance.
+
+    Raises:
+        ValueError: If the tokenizer kind is unknown.
+    """
+    if kind == "heuristic":
+        return HeuristicTokenizer()
+    elif kind == "tiktoken":
+        return TiktokenTokenizer() if TIKTOKEN_AVAILABLE else HeuristicTokenizer()
+    else:
+        raise ValueError(f"Unsupported tokenizer: {kind}")
+
+
+def context_tokens(model: Optional[str]) -> Optional[int]:
+    """Return a model's context window, or None if unknown."""
+    if not model:
+        return None
+
+    name = model.lower().rsplit("/", 1)[-1]
+    matches = [prefix for prefix in MODEL_CONTEXT_TOKENS if name.startswith(prefix)]
+    if not matches:
+        return None
+    return MODEL_CONTEXT_TOKENS[max(matches, key=len)]
+
+
+def max_chunk_tokens(
+    threshold: int,
+    model: Optional[str] = None,
+    prompt_tokens: int = 0,
+    fill_ratio: float = 0.9,
+) -> int:
+    """
+    Token budget of one chunk for a model.
+
+    The LLM rewrites the whole chunk as JSON, so its answer is about as
+    long as the chunk: the context left after the prompt is shared equally
+    between input and output, and `fill_ratio` of the input half is used.
+
+    Args:
+        threshold: Configured maximum chunk size (tokens).
+        model: Model name, to look up its context window.
+        prompt_tokens: Size of the system prompt.
+        fill_ratio: Share of the input budget a chunk may fill.
+
+    Returns:
+        Maximum chunk size in tokens.
+    """
+    window = context_tokens(model)
+    if window is None:
+        return threshold
+
+    budget = int((window - prompt_tokens) / 2 * fill_ratio)
+    return max(1, min(threshold, budget))
+
+
+class TextChunker:
+    """
+    Split text into as few chunks as possible, none above a token budget.
+
+    Splits happen at the coarsest boundary that works: headings, then
+    page markers, paragraphs, lines, sentences and words. Markdown tables
+    are never cut mid-row: a table too large for one chunk is split
+    between rows, repeating its header. Adjacent pieces are packed until
+    the budget is reached, closing a reasonably full chunk at a section
+    start, and chunks opening mid-section begin with a heading breadcrumb.
+
+    With `content_defined`, chunks may also end earlier, at points picked
+    from the content itself: an edit then only moves the boundaries of the
+    chunks around it, and the other chunks of a new version of a document
+    come out identical (and are served by the analysis cache).
+    """
+
+    def __init__(self, tokenizer: Tokenizer, content_defined: bool = False):
+        self.tokenizer = tokenizer
+        self.content_defined = content_defined
+
+    def split(self, text: str, max_tokens: int) -> list[str]:
+        """
+        Split text into chunks of at most `max_tokens` tokens.
+
+        Args:
+            text: Text to split.
+            max_tokens: Token budget of one chunk.
+
+        Returns:
+            Chunks in document order (the text itself if it fits).
+        """
+        if self.tokenizer.count(text) <= max_tokens:
+            return [text]
+
+        # Room for the breadcrumb, unless the budget is too small to share
+        reserve = BREADCRUMB_MAX_TOKENS if max_tokens >= 8 * BREADCRUMB_MAX_TOKENS else 0
+
+        pieces = self._pieces(text, max_tokens - reserve, 0)
+        return self._pack(pieces, max_tokens, reserve)
+
+    def _pieces(self, text: str, max_tokens: int, level: int) -> list[tuple[str, int]]:
+        """Cut text into (piece, tokens) pairs that each fit the budget."""
+        tokens = self.tokenizer.count(text)
+        if tokens <= max_tokens:
+            return [(text, tokens)]
+
+        if _TABLE_PATTERN.fullmatch(text.strip()):
+            return self._split_table(text.strip(), max_tokens)
+
+        if level >= len(SPLIT_PATTERNS):
+            return self._hard_split(text, max_tokens)
+
+        parts = self._split_at(text, SPLIT_PATTERNS[level])
+        if len(parts) == 1:
+            return self._pieces(text, max_tokens, level + 1)
+
+        pieces = []
+        for part in parts:
+            pieces.extend(self._pieces(part, max_tokens, level + 1))
+        return pieces
+
+    @staticmethod
+    def _split_at(text: str, pattern: re.Pattern) -> list[str]:
+        """Split text after each boundary match outside tables, keeping every character."""
+        tables = [match.span() for match in _TABLE_PATTERN.finditer(text)]
+
+        parts = []
+        start = 0
+        for match in pattern.finditer(text):
+            end = match.end()
+            if any(table_start < end < table_end for table_start, table_end in tables):
+                continue
+            if end > start and match.start() > 0:
+                parts.append(text[start:end])
+                start = end
+        parts.append(text[start:])
+        return [part for part in parts if part]
+
+    def _split_table(self, table: str, max_tokens: int) -> list[tuple[str, int]]:
+        """Split a markdown table between rows, each part keeping the header."""
+        lines = table.split("\n")
+        header_size = 2 if len(lines) > 1 and _TABLE_SEPARATOR.match(lines[1]) else 1
+        header = "\n".join(lines[:header_size])
+        header_tokens = self.tokenizer.count(header + "\n")
+
+        pieces = []
+        rows: list[str] = []
+        rows_tokens = 0
+
+        def flush():
+            part = header + "\n" + "\n".join(rows) + "\n\n"
+            pieces.append((part, self.tokenizer.count(part)))
+
+        for row in lines[header_size:]:
+            row_tokens = self.tokenizer.count(row + "\n")
+            if header_tokens + row_tokens + 1 > max_tokens:
+                # A single row larger than the budget: no way to keep it whole
+                if rows:
+                    flush()
+                    rows, rows_tokens = [], 0
+                pieces.extend(self._hard_split(row + "\n\n", max_tokens))
+                continue
+
+            if rows and header_tokens + rows_tokens + row_tokens + 1 > max_tokens:
+                flush()
+                rows, rows_tokens = [], 0
+            rows.append(row)
+            rows_tokens += row_tokens
+
+        if rows:
+            flush()
+        return pieces
+
+    def _hard_split(self, text: str, max_tokens: int) -> list[tuple[str, int]]:
+        """Cut a text without any boundary (e.g. a huge token) by length."""
+        pieces = []
+        while text:
+            size = len(text)
+            tokens = self.tokenizer.count(text)
+            while tokens > max_tokens:
+                size = max(1, min(size - 1, size * max_tokens // tokens))
+                tokens = self.tokenizer.count(text[:size])
+            pieces.append((text[:size], tokens))
+            text = text[size:]
+        return pieces
+
+    def _pack(
+        self,
+        pieces: list[tuple[str, int]],
+        max_tokens: int,
+        reserve: int,
+    ) -> list[str]:
+        """
+        Merge consecutive pieces into chunks, prefixing breadcrumbs.
+
+        Piece counts are summed to fill a chunk, but they don't add up
+        exactly once joined (two "\n" pieces make a "\n\n" run, BPE merges
+        across the join): a closing chunk is counted as a whole, and hands
+        its last pieces over to the next one while it is over the budget.
+        """
+        chunks = []
+        current: list[str] = []
+        current_tokens = 0
+        has_breadcrumb = False
+        # Pieces of the current chunk, with the open headings before each
+        added: list[tuple[str, int, list[tuple[int, str]]]] = []
+        trail: list[tuple[int, str]] = []  # Open headings (level, title)
+        pending = pieces[::-1]
+
+        def close() -> None:
+            nonlocal current, current_tokens, has_breadcrumb, added, trail
+            chunk = "".join(current).strip()
+            while self.tokenizer.count(chunk) > max_tokens:
+                if len(added) > 1:
+                    piece, tokens, trail = added.pop()
+                    current.pop()
+                    pending.append((piece, tokens))
+                elif has_breadcrumb:
+                    current.pop(0)
+                    has_breadcrumb = False
+                else:
+                    break  # A single piece: fits on its own
+                chunk = "".join(current).strip()
+            chunks.append(chunk)
+            current, current_tokens, has_breadcrumb, added = [], 0, False, []
+
+        while pending or current:
+            if not pending:
+                close()
+                continue
+
+            piece, tokens = pending.pop()
+            heading = _HEADING_PATTERN.match(piece.lstrip("\n"))
+            full = current_tokens + tokens > max_tokens
+            section_break = heading is not None and current_tokens >= max_tokens * SECTION_BREAK_FILL
+
+            if added and (full or section_break):
+                # Closing may hand pieces back: they come before this one
+                pending.append((piece, tokens))
+                close()
+                continue
+
+            if not current:
+                breadcrumb = self._breadcrumb(trail, heading, reserve) if chunks else ""
+                if breadcrumb:
+                    current.append(breadcrumb)
+                    current_tokens += self.tokenizer.count(breadcrumb)
+                    has_breadcrumb = True
+
+            added.append((piece, tokens, list(trail)))
+            current.append(piece)
+            current_tokens += tokens
+            self._follow_headings(trail, piece)
+
+            if self.content_defined and self._is_cut_point(piece, tokens, current_tokens, max_tokens):
+                close()
+
+        return [chunk for chunk in chunks if chunk]
+
+    @staticmethod
+    def _is_cut_point(piece: str, tokens: int, current_tokens: int, max_tokens: int) -> bool:
+        """Whether a chunk ends after this piece, from the piece's content only."""
+        if current_tokens < max_tokens * CONTENT_MIN_FILL:
+            return False
+
+        digest = hashlib.blake2b(piece.encode("utf-8"), digest_size=8).digest()
+        draw = int.from_bytes(digest, "big") / 2 ** 64
+        # Proportional to the piece size, so the rate doesn't depend on how
+        # finely the text was cut
+        return draw < tokens / (max_tokens * CONTENT_CUT_SPAN)
+
+    @staticmethod
+    def _follow_headings(trail: list[tuple[int, str]], piece: str) -> None:
+        """Update the open headings with the ones found in a piece."""
+        for match in _HEADING_PATTERN.finditer(piece):
+            level = len(match.group(1))
+            while trail and trail[-1][0] >= level:
+                trail.pop()
+            trail.append((level, match.group(2)))
+
+    def _breadcrumb(
+        self,
+        trail: list[tuple[int, str]],
+        heading: Optional[re.Match],
+        reserve: int,
+    ) -> str:
+        """Heading path of a chunk starting mid-document, within `reserve` tokens."""
+        if heading is not None:
+            # The chunk opens a section itself: only its parents are missing
+            level = len(heading.group(1))
+            trail = [entry for entry in trail if entry[0] < level]
+
+        titles = [
+            title if len(title) <= BREADCRUMB_TITLE_CHARS
+            else title[:BREADCRUMB_TITLE_CHARS - 1] + "…"
+            for _, title in trail
+        ]
+        while titles:
+            breadcrumb = f"[Section en cours : {' > '.join(titles)}]\n\n"
+            if self.tokenizer.count(breadcrumb) <= reserve:
+                return breadcrumb
+            titles = titles[1:]
+        return ""
@@ -1,11 +1,86 @@
 """Conversion orchestration service."""
 
-from typing import Optional
-from ..models import LLMConfig, ConversionResponse
-from ..extractors import get_extractor
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import secrets
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from ..models import LLMConfig, ConversionResponse, DocumentStructure, OutputFormat
+from ..extractors import get_extractor, pdf_extractor
 from ..config import settings
-from .llm_service import llm_service
+from ..metrics import CONVERSIONS, CONVERSIONS_IN_PROGRESS, STAGE_SECONDS
+from .llm_service import llm_service, ANALYSIS_PROMPT
+from .chunker import TextChunker, create_tokenizer, max_chunk_tokens
 from .html_generator import html_generator
+from .pdf_generator import pdf_generator
+
+# Called as progress(event, **details) while a conversion advances
+ProgressCallback = Callable[..., Awaitable[None]]
+
+# Events starting a stage, and events ending one (with duration_ms)
+STAGE_EVENTS = ("extracting", "analyzing", "generating", "rendering")
+STAGE_END_EVENTS = ("extracted", "analyzed", "generated", "rendered")
+
+
+def _write_temp_file(content: bytes, suffix: str) -> Path:
+    """Write content to a new temporary file and return its path."""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(content)
+    return Path(tmp.name)
+
+
+def _link_file(path: Path) -> Optional[Path]:
+    """Hardlink a file under a new name next to it, or None if the filesystem can't."""
+    link = path.with_name(f"{path.stem}-{secrets.token_hex(8)}{path.suffix}")
+    try:
+        os.link(path, link)
+    except OSError:
+        return None
+    return link
+
+
+def _hash_file(path: Path) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionError(Exception):
+    """Raised when a document cannot be analyzed (message shown to the user)."""
+
+
+@dataclass
+class _Flight:
+    """A conversion in progress, shared by every identical request."""
+    task: Optional[asyncio.Task] = None
+    listeners: list[ProgressCallback] = field(default_factory=list)
+    path: Optional[Path] = None  # The run's own link to the uploaded file
+
+    async def report(self, event: str, **details) -> None:
+        """Forward a progress event to every waiting caller."""
+        for listener in list(self.listeners):
+            try:
+                await listener(event, **details)
+            except Exception:
+                pass  # One caller's callback must not fail the shared conversion
+
+
+def _extract_worker(source: bytes | Path, filename: str) -> str:
+    """Extract text from file content or a file path (module-level so worker processes can run it)."""
+    extractor = get_extractor(filename)
+    if isinstance(source, Path):
+        return extractor.extract(source, filename)
+    return extractor.extract_from_bytes(source, filename)
 
 
 class ConversionService:
@@ -13,55 +88,251 @@ class ConversionService:
 
     def __init__(self):
         self.chunking_threshold = settings.chunking_threshold
+        self.chunk_fill_ratio = settings.chunk_fill_ratio
+        self.chunker = TextChunker(
+            create_tokenizer(settings.chunk_tokenizer),
+            content_defined=settings.chunk_content_defined,
+        )
+        self.max_concurrency = settings.llm_max_concurrency
+        self.extraction_executor = settings.extraction_executor
+        self.extraction_workers = settings.extraction_workers
+        self.coalescing = settings.conversion_coalescing
+        self._executor: Optional[Executor] = None
+        self._in_flight: dict[str, _Flight] = {}
 
     async def convert(
         self,
-        file_content: bytes,
+        file_content: bytes | Path,
         filename: str,
-        llm_config: LLMConfig
+        llm_config: LLMConfig,
+        output_format: OutputFormat = OutputFormat.HTML,
+        progress: Optional[ProgressCallback] = None,
     ) -> ConversionResponse:
         """
-        Convert a document to HTML.
+        Convert a document to HTML or PDF.
+
+        Progress events, in order: extracting, extracted (pages, characters),
+        analyzing (chunks_total), section_ready (chunk, title) for each section
+        as soon as the LLM has produced it, chunk_analyzed (chunks_done,
+        chunks_total), analyzed, generating, generated (html_bytes), then rendering and
+        rendered (pdf_bytes) for PDF output. Events ending a stage carry its
+        duration_ms.
+
+        Args:
+            file_content: File content as bytes, or path to the uploaded
+                file (preferred for large files: it is never loaded in memory).
+            filename: Original filename.
+            llm_config: LLM configuration.
+            output_format: Output format (HTML, or PDF rendered from the HTML).
+            progress: Optional coroutine called as `progress(event, **details)`.
+
+        Identical conversions running at the same time (same file content,
+        provider, model, API key and format) share a single run: later
+        callers wait for the first one's result and receive its remaining
+        progress events. The run reads its own link to an uploaded file, so
+        the first caller may go away and delete its upload.
+
+        Returns:
+            ConversionResponse with HTML/PDF or error.
+        """
+        if not self.coalescing:
+            return await self._convert(file_content, filename, llm_config, output_format, progress)
+
+        key = await self._flight_key(file_content, llm_config, output_format)
+        flight = self._in_flight.get(key)
+
+        if flight is None:
+            flight = _Flight()
+            if isinstance(file_content, Path):
+                flight.path = _link_file(file_content)
+                if flight.path is None:
+                    # Without its own file the run could outlive the upload
+                    return await self._convert(file_content, filename, llm_config, output_format, progress)
+            flight.task = asyncio.create_task(
+                self._convert(flight.path or file_content, filename, llm_config, output_format, flight.report)
+            )
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda _: self._end_flight(key, flight))
+
+        if progress is not None:
+            flight.listeners.append(progress)
+        try:
+            # Shielded: a caller going away doesn't cancel it for the others
+            result = await asyncio.shield(flight.task)
+        finally:
+            if progress in flight.listeners:
+                flight.listeners.remove(progress)
+
+        return self._for_caller(result, filename)
+
+    async def _flight_key(
+        self,
+        file_content: bytes | Path,
+        llm_config: LLMConfig,
+        output_format: OutputFormat,
+    ) -> str:
+        """
+        Identify identical conversions: same file, LLM settings and format.
+
+        The API key is part of it (hashed): a caller never gets a result, or
+        an error, obtained with someone else's key.
+        """
+        if isinstance(file_content, Path):
+            file_hash = await asyncio.to_thread(_hash_file, file_content)
+        else:
+            file_hash = hashlib.sha256(file_content).hexdigest()
+
+        return "|".join([
+            file_hash,
+            llm_config.provider.value,
+            llm_config.model,
+            llm_config.base_url or "",
+            hashlib.sha256(llm_config.api_key.encode("utf-8")).hexdigest()[:16],
+            output_format.value,
+        ])
+
+    def _end_flight(self, key: str, flight: _Flight) -> None:
+        """Forget a finished conversion so later requests start a new one."""
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        if flight.path is not None:
+            flight.path.unlink(missing_ok=True)
+
+    def _for_caller(self, result: ConversionResponse, filename: str) -> ConversionResponse:
+        """Copy a shared result, named after this caller's file."""
+        if not result.success or not result.filename:
+            return result.model_copy()
+
+        output_filename = self._generate_output_filename(filename)
+        if result.format == "pdf":
+            output_filename = output_filename.replace('.html', '.pdf')
+        return result.model_copy(update={"filename": output_filename})
+
+    async def analyze(
+        self,
+        file_content: bytes | Path,
+        filename: str,
+        llm_config: LLMConfig,
+        progress: Optional[ProgressCallback] = None,
+    ) -> DocumentStructure:
+        """
+        Extract and analyze a document, without generating any output.
+
+        Used by the streaming download, which renders the structure itself.
+        Emits the extracting to analyzed progress events of `convert`.
 
         Args:
-            file_content: File content as bytes.
+            file_content: File content as bytes, or path to the uploaded file.
             filename: Original filename.
             llm_config: LLM configuration.
+            progress: Optional coroutine called as `progress(event, **details)`.
 
         Returns:
-            ConversionResponse with HTML or error.
+            Parsed document structure.
+
+        Raises:
+            ConversionError: If the document can't be converted.
         """
         try:
             # Step 1: Extract text
-            text = self._extract_text(file_content, filename)
+            await self._report(progress, "extracting")
+            started = time.perf_counter()
+            with STAGE_SECONDS.time(stage="extract"):
+                text = await self._extract_text(file_content, filename)
+            await self._report(
+                progress, "extracted",
+                pages=text.count("--- Page ") or None,
+                characters=len(text),
+                duration_ms=self._elapsed_ms(started),
+            )
 
             if not text.strip():
-                return ConversionResponse(
-                    success=False,
-                    error="Le document ne contient pas de texte extractible."
-                )
+                raise ConversionError("Le document ne contient pas de texte extractible.")
 
             # Step 2: Chunk if necessary
-            chunks = self._chunk_text(text)
+            with STAGE_SECONDS.time(stage="chunk"):
+                chunks = self._chunk_text(text, llm_config.model)
 
             # Step 3: Analyze with LLM
-            if len(chunks) == 1:
-                doc_structure = await llm_service.analyze_document(chunks[0], llm_config)
-            else:
-                doc_structure = await self._analyze_chunks(chunks, llm_config)
+            await self._report(progress, "analyzing", chunks_total=len(chunks))
+            started = time.perf_counter()
+            with STAGE_SECONDS.time(stage="analyze"):
+                if len(chunks) == 1:
+                    doc_structure = await llm_service.analyze_document(
+                        chunks[0], llm_config, self._section_reporter(progress, 1)
+                    )
+                    await self._report(
+                        progress, "chunk_analyzed",
+                        chunk=1, chunks_done=1, chunks_total=1,
+                        duration_ms=self._elapsed_ms(started),
+                    )
+                else:
+                    doc_structure = await self._analyze_chunks(chunks, llm_config, progress)
+            await self._report(progress, "analyzed", duration_ms=self._elapsed_ms(started))
+
+        except ConversionError:
+            raise
+        except ValueError as e:
+            raise ConversionError(f"Erreur de validation: {str(e)}")
+        except Exception as e:
+            raise ConversionError(f"Erreur lors de la conversion: {str(e)}")
+
+        return doc_structure
+
+    async def _convert(
+        self,
+        file_content: bytes | Path,
+        filename: str,
+        llm_config: LLMConfig,
+        output_format: OutputFormat,
+        progress: Optional[ProgressCallback],
+    ) -> ConversionResponse:
+        """Run one conversion (see convert), recording it in the metrics."""
+        with CONVERSIONS_IN_PROGRESS.track():
+            result = await self._run_conversion(
+                file_content, filename, llm_config, output_format, progress
+            )
+
+        CONVERSIONS.inc(
+            format=output_format.value,
+            status="success" if result.success else "error",
+        )
+        return result
+
+    async def _run_conversion(
+        self,
+        file_content: bytes | Path,
+        filename: str,
+        llm_config: LLMConfig,
+        output_format: OutputFormat,
+        progress: Optional[ProgressCallback],
+    ) -> ConversionResponse:
+        """Extract, analyze, generate HTML and render the PDF if requested."""
+        try:
+            doc_structure = await self.analyze(file_content, filename, llm_config, progress)
 
             # Step 4: Generate HTML
-            html_content = html_generator.generate(doc_structure)
+            await self._report(progress, "generating")
+            started = time.perf_counter()
+            with STAGE_SECONDS.time(stage="html"):
+                html_content = html_generator.generate(doc_structure)
+            await self._report(
+                progress, "generated",
+                html_bytes=len(html_content.encode("utf-8")),
+                duration_ms=self._elapsed_ms(started),
+            )
 
             # Generate output filename
             output_filename = self._generate_output_filename(filename)
 
-            return ConversionResponse(
+            result = ConversionResponse(
                 success=True,
                 html=html_content,
                 filename=output_filename
             )
 
+        except ConversionError as e:
+            return ConversionResponse(success=False, error=str(e))
         except ValueError as e:
             return ConversionResponse(
                 success=False,
@@ -73,84 +344,215 @@ class ConversionService:
                 error=f"Erreur lors de la conversion: {str(e)}"
             )
 
-    def _extract_text(self, content: bytes, filename: str) -> str:
-        """Extract text from file content."""
-        extractor = get_extractor(filename)
-        return extractor.extract_from_bytes(content, filename)
+        # Step 5: Render PDF if requested
+        if output_format == OutputFormat.PDF:
+            await self._report(progress, "rendering")
+            started = time.perf_counter()
+            try:
+                with STAGE_SECONDS.time(stage="pdf"):
+                    pdf_bytes = await pdf_generator.generate_pdf_async(result.html)
+            except Exception as e:
+                return ConversionResponse(
+                    success=False,
+                    error=f"Erreur lors de la génération du PDF: {str(e)}",
+                    error_stage="pdf",
+                )
+            await self._report(
+                progress, "rendered",
+                pdf_bytes=len(pdf_bytes),
+                duration_ms=self._elapsed_ms(started),
+            )
+
+            result.pdf = pdf_bytes
+            result.format = "pdf"
+            result.filename = result.filename.replace('.html', '.pdf')
+
+        return result
+
+    def _section_reporter(self, progress: Optional[ProgressCallback], chunk: int):
+        """Build the per-section callback reporting 'section_ready' events."""
+        if progress is None:
+            return None
 
-    def _chunk_text(self, text: str) -> list[str]:
+        async def on_section(section: dict) -> None:
+            await progress("section_ready", chunk=chunk, title=section.get("title", ""))
+
+        return on_section
+
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        """Milliseconds elapsed since a perf_counter() reading."""
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    async def _report(
+        self,
+        progress: Optional[ProgressCallback],
+        event: str,
+        **details
+    ) -> None:
+        """Forward a progress event if a callback was given."""
+        if progress is not None:
+            await progress(event, **details)
+
+    async def _extract_text(self, source: bytes | Path, filename: str) -> str:
         """
-        Split text into chunks if it exceeds the threshold.
+        Extract text from file content or path in the extraction executor.
 
-        Simple chunking strategy: split by double newlines (paragraphs).
+        PyMuPDF and python-docx are CPU-bound and would otherwise block
+        the event loop (and every other request) for the whole extraction.
         """
-        # Estimate tokens (rough: 1 token ≈ 4 chars)
-        estimated_tokens = len(text) / 4
-
-        if estimated_tokens <= self.chunking_threshold:
-            return [text]
-
-        # Split into paragraphs
-        paragraphs = text.split("\n\n")
-        chunks = []
-        current_chunk = []
-        current_size = 0
-
-        for para in paragraphs:
-            para_tokens = len(para) / 4
-
-            if current_size + para_tokens > self.chunking_threshold:
-                if current_chunk:
-                    chunks.append("\n\n".join(current_chunk))
-                current_chunk = [para]
-                current_size = para_tokens
+        loop = asyncio.get_running_loop()
+        try:
+            if self.extraction_executor == "process" and filename.lower().endswith(".pdf"):
+                return await self._extract_pdf_parallel(source, filename)
+
+            return await loop.run_in_executor(
+                self._get_executor(), _extract_worker, source, filename
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. crashed on a malformed file): start fresh
+            self.shutdown()
+            raise ValueError(f"Extraction crashed for '{filename}'")
+
+    async def _extract_pdf_parallel(self, source: bytes | Path, filename: str) -> str:
+        """
+        Extract a PDF with its pages split across the worker processes.
+
+        Every worker opens the file itself; bytes are first written once to
+        a temporary file instead of being pickled to each of them.
+        """
+        if isinstance(source, Path):
+            path, temporary = source, False
+        else:
+            path, temporary = await asyncio.to_thread(_write_temp_file, source, ".pdf"), True
+
+        try:
+            return await pdf_extractor.extract_parallel(
+                path,
+                self._get_executor(),
+                workers=self.extraction_workers,
+                min_pages=settings.pdf_parallel_min_pages,
+                filename=filename,
+            )
+        finally:
+            if temporary:
+                path.unlink(missing_ok=True)
+
+    def _get_executor(self) -> Executor:
+        """Create the extraction executor on first use."""
+        if self._executor is None:
+            workers = max(1, self.extraction_workers)
+            if self.extraction_executor == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            elif self.extraction_executor == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=workers)
             else:
-                current_chunk.append(para)
-                current_size += para_tokens
+                raise ValueError(f"Unsupported extraction executor: {self.extraction_executor}")
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the extraction executor."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-        if current_chunk:
-            chunks.append("\n\n".join(current_chunk))
+    def _chunk_text(self, text: str, model: Optional[str] = None) -> list[str]:
+        """
+        Split text into chunks if it exceeds the token budget.
 
-        return chunks
+        The budget is `chunking_threshold`, lowered to fit the model's
+        context window when it is known. With `chunk_content_defined`,
+        boundaries depend on the text around them rather than on where the
+        previous chunk ended, so re-uploading an edited document re-analyzes
+        only the chunks that changed: the others hit the analysis cache.
+        """
+        max_tokens = max_chunk_tokens(
+            self.chunking_threshold,
+            model,
+            prompt_tokens=self.chunker.tokenizer.count(ANALYSIS_PROMPT),
+            fill_ratio=self.chunk_fill_ratio,
+        )
+        return self.chunker.split(text, max_tokens)
 
     async def _analyze_chunks(
         self,
         chunks: list[str],
-        llm_config: LLMConfig
+        llm_config: LLMConfig,
+        progress: Optional[ProgressCallback] = None,
     ):
         """
-        Analyze multiple chunks and merge results.
+        Analyze multiple chunks concurrently and merge results.
 
-        For simplicity, we analyze each chunk separately and merge sections.
+        Chunks are sent to the LLM in parallel, bounded by
+        `llm_max_concurrency`, then merged back in document order.
         """
         from ..models import DocumentStructure, Metadata, Section
 
-        all_sections = []
-        metadata = None
-        conclusion = None
-        sources = []
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        done = 0
 
-        for i, chunk in enumerate(chunks):
-            # Add context for non-first chunks
+        async def analyze(i: int, chunk: str):
+            # Add context for non-first chunks. It must not depend on the
+            # chunk's position, or any inserted chunk would change the text
+            # (and cache key) of all the following ones.
             if i > 0:
-                chunk = f"[Suite du document - Partie {i+1}/{len(chunks)}]\n\n{chunk}"
+                chunk = f"[Suite du document]\n\n{chunk}"
+
+            async with semaphore:
+                started = time.perf_counter()
+                doc = await llm_service.analyze_document(
+                    chunk, llm_config, self._section_reporter(progress, i + 1)
+                )
 
-            doc = await llm_service.analyze_document(chunk, llm_config)
+            nonlocal done
+            done += 1
+            await self._report(
+                progress, "chunk_analyzed",
+                chunk=i + 1, chunks_done=done, chunks_total=len(chunks),
+                duration_ms=self._elapsed_ms(started),
+            )
+            return doc
 
-            # Use metadata from first chunk
-            if i == 0:
-                metadata = doc.metadata
+        tasks = [
+            asyncio.create_task(analyze(i, chunk))
+            for i, chunk in enumerate(chunks)
+        ]
+        try:
+            docs = await asyncio.gather(*tasks)
+        except BaseException:
+            # One chunk failed: don't keep paying for the others
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
-            # Collect sections
-            all_sections.extend(doc.sections)
+        all_sections = []
+        sources = []
 
-            # Use conclusion from last chunk
-            if i == len(chunks) - 1 and doc.conclusion:
-                conclusion = doc.conclusion
+        for doc in docs:
+            sections = list(doc.sections)
+
+            # A section cut by a chunk boundary comes back in both chunks
+            # (the breadcrumb names it): join the two halves
+            if all_sections and sections and (
+                all_sections[-1].title.strip().lower() == sections[0].title.strip().lower()
+            ):
+                previous = all_sections[-1]
+                all_sections[-1] = previous.model_copy(
+                    update={"content": previous.content + sections[0].content}
+                )
+                sections = sections[1:]
 
-            # Collect sources
+            all_sections.extend(sections)
             sources.extend(doc.sources)
 
+        # Metadata from first chunk, conclusion from last chunk
+        metadata = docs[0].metadata
+        conclusion = docs[-1].conclusion
+
         # Merge into final structure
         return DocumentStructure(
             metadata=metadata or Metadata(title="Document"),
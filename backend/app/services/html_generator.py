@@ -1,9 +1,33 @@
 """HTML generator from document structure."""
 
 import html
-from typing import Optional
+import re
+from typing import Iterator, Optional
 from ..models import DocumentStructure, Metadata, Section, ConclusionSection, Source
-from ..templates.base_template import get_html_template
+from ..templates.base_template import get_template_parts
+
+# Inline markdown, matched in one pass: **bold** or *italic*. Italic text
+# may contain bold pairs, and a star that opens a bold pair never closes it,
+# so nested emphasis always yields well-nested tags.
+_INLINE_PATTERN = re.compile(
+    r"\*\*(.+?)\*\*"
+    r"|\*((?:\*\*.+?\*\*|[^*]|\*(?!\*.*?\*\*))+?)\*(?!\*.+?\*\*)"
+)
+_BOLD_PATTERN = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC_PATTERN = re.compile(r"\*(.+?)\*")
+
+
+def _inline_markdown(match: re.Match) -> str:
+    """Render one bold or italic span, with the other style nested inside."""
+    bold, italic = match.group(1, 2)
+    if bold is not None:
+        if "*" in bold:
+            bold = _ITALIC_PATTERN.sub(r"<em>\1</em>", bold)
+        return f"<strong>{bold}</strong>"
+
+    if "*" in italic:
+        italic = _BOLD_PATTERN.sub(r"<strong>\1</strong>", italic)
+    return f"<em>{italic}</em>"
 
 
 class HTMLGenerator:
@@ -19,51 +43,69 @@ class HTMLGenerator:
         Returns:
             Complete HTML string.
         """
-        parts = []
+        return "".join(self.generate_iter(doc))
 
+    def generate_iter(self, doc: DocumentStructure) -> Iterator[str]:
+        """
+        Generate the HTML document as fragments, one section at a time.
+
+        Joining the fragments gives exactly the output of `generate`, but
+        only the current fragment needs to be held in memory.
+
+        Args:
+            doc: Parsed document structure.
+
+        Yields:
+            Consecutive pieces of the HTML document.
+        """
+        head, middle, tail = get_template_parts()
+        yield head + doc.metadata.title + middle
+
+        for i, part in enumerate(self._generate_parts(doc)):
+            yield part if i == 0 else "\n" + part
+
+        yield tail
+
+    def _generate_parts(self, doc: DocumentStructure) -> Iterator[str]:
+        """Generate the body of the document, block by block."""
         # Cover page
-        parts.append(self._generate_cover(doc.metadata))
+        yield self._generate_cover(doc.metadata)
 
         # Content wrapper
-        parts.append('<div class="content">')
+        yield '<div class="content">'
 
         # Table of contents
         if doc.toc and doc.sections:
-            parts.append(self._generate_toc(doc.sections))
+            yield self._generate_toc(doc.sections)
 
         # Sections
         for i, section in enumerate(doc.sections, 1):
-            parts.append(self._generate_section(section, i))
+            yield self._generate_section(section, i)
             if i < len(doc.sections):
-                parts.append('<div class="divider">· · ·</div>')
+                yield '<div class="divider">· · ·</div>'
 
         # Conclusion
         if doc.conclusion:
-            parts.append(self._generate_conclusion(doc.conclusion))
+            yield self._generate_conclusion(doc.conclusion)
 
         # Sources
         if doc.sources:
-            parts.append(self._generate_sources(doc.sources))
+            yield self._generate_sources(doc.sources)
 
-        parts.append('</div>')  # Close content
+        yield '</div>'  # Close content
 
         # Footer
-        parts.append(self._generate_footer(doc.metadata))
-
-        content = "\n".join(parts)
-        return get_html_template(doc.metadata.title, content)
+        yield self._generate_footer(doc.metadata)
 
     def _escape(self, text: str) -> str:
         """Escape HTML and convert markdown formatting."""
         if not text:
             return ""
         escaped = html.escape(text)
-        # Convert **bold** to <strong>
-        import re
-        escaped = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', escaped)
-        # Convert *italic* to <em>
-        escaped = re.sub(r'\*(.+?)\*', r'<em>\1</em>', escaped)
-        return escaped
+        # Convert **bold** to <strong> and *italic* to <em>
+        if "*" not in escaped:
+            return escaped
+        return _INLINE_PATTERN.sub(_inline_markdown, escaped)
 
     def _generate_cover(self, meta: Metadata) -> str:
         """Generate cover page HTML."""
@@ -0,0 +1,498 @@
+"""Asynchronous conversion jobs: bounded queue, workers and job stores."""
+
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from ..models import (
+    LLMConfig, OutputFormat, ConversionResponse, JobInfo, JobStatus
+)
+from ..config import settings
+from .converter import conversion_service, STAGE_EVENTS, STAGE_END_EVENTS
+
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+UNFINISHED_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+# Error of the jobs a restart left unfinished (their queue was in memory)
+INTERRUPTED_ERROR = "Conversion interrompue par un redémarrage du serveur. Relancez-la."
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue cannot accept more work."""
+
+
+class JobStore(ABC):
+    """Persistence for job status and results."""
+
+    @abstractmethod
+    async def save(self, job: JobInfo) -> None:
+        """Create or update a job."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[JobInfo]:
+        """Return a job, or None if unknown."""
+
+    @abstractmethod
+    async def save_result(self, job_id: str, result: ConversionResponse) -> None:
+        """Store the result of a finished job."""
+
+    @abstractmethod
+    async def get_result(self, job_id: str) -> Optional[ConversionResponse]:
+        """Return the result of a finished job, or None."""
+
+    @abstractmethod
+    async def purge(self, older_than: float) -> None:
+        """Drop finished jobs last updated before a timestamp."""
+
+    @abstractmethod
+    async def fail_unfinished(self, error: str) -> int:
+        """Mark every queued or running job as failed; return how many."""
+
+
+class MemoryJobStore(JobStore):
+    """Job store kept in process memory (lost on restart)."""
+
+    def __init__(self):
+        self._jobs: dict[str, JobInfo] = {}
+        self._results: dict[str, ConversionResponse] = {}
+
+    async def save(self, job: JobInfo) -> None:
+        self._jobs[job.id] = job.model_copy()
+
+    async def get(self, job_id: str) -> Optional[JobInfo]:
+        job = self._jobs.get(job_id)
+        return job.model_copy() if job else None
+
+    async def save_result(self, job_id: str, result: ConversionResponse) -> None:
+        self._results[job_id] = result
+
+    async def get_result(self, job_id: str) -> Optional[ConversionResponse]:
+        return self._results.get(job_id)
+
+    async def purge(self, older_than: float) -> None:
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATUSES and job.updated_at < older_than
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+
+    async def fail_unfinished(self, error: str) -> int:
+        unfinished = [job for job in self._jobs.values() if job.status in UNFINISHED_STATUSES]
+        for job in unfinished:
+            _mark_failed(job, error)
+        return len(unfinished)
+
+
+class SQLiteJobStore(JobStore):
+    """Job store backed by a SQLite file (survives restarts)."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite database on first use."""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, info TEXT NOT NULL, result TEXT, "
+                "status TEXT NOT NULL, updated_at REAL NOT NULL, output BLOB)"
+            )
+            # Databases created before PDFs were stored as binary
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "output" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN output BLOB")
+            self._conn.commit()
+        return self._conn
+
+    def _execute(self, query: str, params: tuple = ()) -> list:
+        """Run one statement under the lock and return its rows."""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(query, params).fetchall()
+            conn.commit()
+            return rows
+
+    async def save(self, job: JobInfo) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO jobs (id, info, status, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET info = excluded.info, "
+            "status = excluded.status, updated_at = excluded.updated_at",
+            (job.id, job.model_dump_json(), job.status.value, job.updated_at),
+        )
+
+    async def get(self, job_id: str) -> Optional[JobInfo]:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT info FROM jobs WHERE id = ?", (job_id,)
+        )
+        return JobInfo.model_validate_json(rows[0][0]) if rows else None
+
+    async def save_result(self, job_id: str, result: ConversionResponse) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE jobs SET result = ?, output = ? WHERE id = ?",
+            (result.model_dump_json(), result.pdf, job_id),
+        )
+
+    async def get_result(self, job_id: str) -> Optional[ConversionResponse]:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT result, output FROM jobs WHERE id = ?", (job_id,)
+        )
+        if not rows or rows[0][0] is None:
+            return None
+
+        result = ConversionResponse.model_validate_json(rows[0][0])
+        result.pdf = rows[0][1]
+        return result
+
+    async def purge(self, older_than: float) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (JobStatus.COMPLETED.value, JobStatus.FAILED.value, older_than),
+        )
+
+    async def fail_unfinished(self, error: str) -> int:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT info FROM jobs WHERE status IN (?, ?)",
+            tuple(status.value for status in UNFINISHED_STATUSES),
+        )
+        for (info,) in rows:
+            job = JobInfo.model_validate_json(info)
+            _mark_failed(job, error)
+            await self.save(job)
+        return len(rows)
+
+
+def _mark_failed(job: JobInfo, error: str) -> None:
+    """Set a job as failed with an error."""
+    job.status = JobStatus.FAILED
+    job.error = error
+    job.updated_at = time.time()
+
+
+def create_job_store(kind: str, path: str) -> JobStore:
+    """
+    Build the job store selected in settings.
+
+    Args:
+        kind: 'memory' or 'sqlite'.
+        path: SQLite file path (sqlite only).
+
+    Returns:
+        JobStore instance.
+
+    Raises:
+        ValueError: If the store kind is unknown.
+    """
+    if kind == "memory":
+        return MemoryJobStore()
+    elif kind == "sqlite":
+        return SQLiteJobStore(path)
+    else:
+        raise ValueError(f"Unsupported job store: {kind}")
+
+
+def _discard_upload(file_content: bytes | Path) -> None:
+    """Delete a spooled upload once its job no longer needs it."""
+    if isinstance(file_content, Path):
+        file_content.unlink(missing_ok=True)
+
+
+@dataclass
+class _JobRequest:
+    """Everything a worker needs to run a queued job."""
+    job_id: str
+    file_content: bytes | Path
+    filename: str
+    llm_config: LLMConfig
+    output_format: OutputFormat
+
+
+class JobManager:
+    """
+    Run conversions in the background.
+
+    Jobs wait in a bounded queue and are picked up by a fixed number of
+    worker tasks, so bursts are absorbed without overloading the LLM or
+    the PDF renderer.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 2,
+        queue_size: int = 100,
+        ttl_seconds: int = 3600,
+    ):
+        self.store = store
+        self.workers = workers
+        self.queue_size = queue_size
+        self.ttl_seconds = ttl_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._subscribers: dict[str, list[asyncio.Queue]] = {}
+
+    async def start(self) -> None:
+        """
+        Start the worker tasks.
+
+        The queue lives in memory, so jobs still queued or running in the
+        store (left by a restart) can never finish: they are marked failed.
+        """
+        if self._tasks:
+            return
+
+        await self.store.fail_unfinished(INTERRUPTED_ERROR)
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker())
+            for _ in range(max(1, self.workers))
+        ]
+
+    async def shutdown(self) -> None:
+        """Stop the worker tasks (queued jobs are dropped)."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            _discard_upload(queue.get_nowait().file_content)
+
+    async def submit(
+        self,
+        file_content: bytes | Path,
+        filename: str,
+        llm_config: LLMConfig,
+        output_format: OutputFormat = OutputFormat.HTML,
+    ) -> JobInfo:
+        """
+        Queue a conversion job.
+
+        Args:
+            file_content: File content as bytes, or path to a spooled upload.
+                The job takes ownership of the file and deletes it when done.
+            filename: Original filename.
+            llm_config: LLM configuration.
+            output_format: Output format.
+
+        Returns:
+            The queued job.
+
+        Raises:
+            JobQueueFullError: If the queue is full.
+        """
+        await self.start()
+
+        if self._queue.full():
+            _discard_upload(file_content)
+            raise JobQueueFullError("Job queue is full")
+
+        now = time.time()
+        await self.store.purge(now - self.ttl_seconds)
+
+        job = JobInfo(
+            id=uuid.uuid4().hex,
+            filename=filename,
+            format=output_format.value,
+            created_at=now,
+            updated_at=now,
+        )
+        await self.store.save(job)
+
+        try:
+            self._queue.put_nowait(_JobRequest(
+                job_id=job.id,
+                file_content=file_content,
+                filename=filename,
+                llm_config=llm_config,
+                output_format=output_format,
+            ))
+        except asyncio.QueueFull:
+            _discard_upload(file_content)
+            await self._finish(job, JobStatus.FAILED, error="Job queue is full")
+            raise JobQueueFullError("Job queue is full")
+
+        return job
+
+    async def keep_result(self, result: ConversionResponse) -> JobInfo:
+        """
+        Record a conversion run outside the queue as a completed job.
+
+        Lets a synchronous request return a large output by reference: it
+        is downloaded from /jobs/{id}/file until the job expires.
+
+        Args:
+            result: Successful conversion result.
+
+        Returns:
+            The completed job.
+        """
+        now = time.time()
+        await self.store.purge(now - self.ttl_seconds)
+
+        job = JobInfo(
+            id=uuid.uuid4().hex,
+            status=JobStatus.COMPLETED,
+            filename=result.filename,
+            format=result.format,
+            created_at=now,
+            updated_at=now,
+        )
+        await self.store.save(job)
+        await self.store.save_result(job.id, result)
+        return job
+
+    def free_slots(self) -> int:
+        """Number of jobs the queue can still accept."""
+        if self._queue is None:
+            return self.queue_size
+        return self.queue_size - self._queue.qsize()
+
+    async def get(self, job_id: str) -> Optional[JobInfo]:
+        """Return a job's status and progress."""
+        return await self.store.get(job_id)
+
+    async def get_result(self, job_id: str) -> Optional[ConversionResponse]:
+        """Return a finished job's result."""
+        return await self.store.get_result(job_id)
+
+    async def _worker(self) -> None:
+        """Process queued jobs one at a time."""
+        while True:
+            queue = self._queue
+            request = await queue.get()
+            try:
+                await self._run(request)
+            finally:
+                _discard_upload(request.file_content)
+                queue.task_done()
+
+    async def _run(self, request: _JobRequest) -> None:
+        """Run one job and record its result."""
+        job = await self.store.get(request.job_id)
+        if job is None:
+            return
+
+        job.status = JobStatus.RUNNING
+        job.updated_at = time.time()
+        await self.store.save(job)
+
+        async def progress(event: str, **details) -> None:
+            if event in STAGE_EVENTS:
+                job.stage = event
+            if event in STAGE_END_EVENTS:
+                job.timings[event] = details["duration_ms"]
+            if "chunks_done" in details:
+                job.chunks_done = details["chunks_done"]
+            if "chunks_total" in details:
+                job.chunks_total = details["chunks_total"]
+            job.updated_at = time.time()
+            await self.store.save(job)
+            self._publish(job.id, event, details)
+
+        try:
+            result = await conversion_service.convert(
+                file_content=request.file_content,
+                filename=request.filename,
+                llm_config=request.llm_config,
+                output_format=request.output_format,
+                progress=progress,
+            )
+        except Exception as e:
+            result = ConversionResponse(
+                success=False,
+                error=f"Erreur lors de la conversion: {str(e)}"
+            )
+
+        await self.store.save_result(job.id, result)
+
+        if result.success:
+            job.filename = result.filename
+            job.format = result.format
+            await self._finish(job, JobStatus.COMPLETED)
+        else:
+            await self._finish(job, JobStatus.FAILED, error=result.error)
+
+    async def _finish(
+        self,
+        job: JobInfo,
+        status: JobStatus,
+        error: Optional[str] = None
+    ) -> None:
+        """Mark a job as finished."""
+        job.status = status
+        job.error = error
+        job.updated_at = time.time()
+        await self.store.save(job)
+        self._publish(job.id, status.value, job.model_dump(mode="json"))
+
+    async def events(
+        self,
+        job_id: str,
+        keepalive_seconds: float = 15.0
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Yield a job's progress events as (event, data) until it finishes.
+
+        The first event is a 'status' snapshot of the job so late
+        subscribers catch up; the last one is 'completed' or 'failed'.
+        A 'ping' event is yielded after `keepalive_seconds` of silence.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+
+        try:
+            job = await self.store.get(job_id)
+            if job is None:
+                return
+
+            yield "status", job.model_dump(mode="json")
+            if job.status in FINISHED_STATUSES:
+                return
+
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield "ping", {}
+                    continue
+
+                yield event, data
+                if event in (JobStatus.COMPLETED.value, JobStatus.FAILED.value):
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id, [])
+            if queue in subscribers:
+                subscribers.remove(queue)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def _publish(self, job_id: str, event: str, data: dict) -> None:
+        """Send an event to every subscriber of a job."""
+        for queue in self._subscribers.get(job_id, []):
+            queue.put_nowait((event, data))
+
+
+# Singleton instance
+job_manager = JobManager(
+    store=create_job_store(settings.job_store, settings.job_store_path),
+    workers=settings.job_workers,
+    queue_size=settings.job_queue_size,
+    ttl_seconds=settings.job_ttl_seconds,
+)
@@ -0,0 +1,237 @@
+"""Parsing helpers for LLM JSON output: incremental sections and repair."""
+
+import json
+import re
+from typing import Optional
+from ..models import Section
+
+# What may precede the opening brace: whitespace and a markdown fence
+_PREFIX_PATTERN = re.compile(r"\s*(```(json)?)?\s*")
+_FENCE = "```json"
+
+
+class SectionStreamParser:
+    """
+    Extract sections from a DocumentStructure JSON as it streams in.
+
+    Feed text deltas with `feed()`; every section object of the top-level
+    "sections" array is returned as soon as its closing brace arrives.
+    Output that cannot be a JSON object, or a section that does not
+    validate, raises ValueError right away so the stream can be aborted.
+    """
+
+    def __init__(self):
+        self._prefix = ""
+        self._started = False
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_parts: Optional[list[str]] = None
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._sections_depth: Optional[int] = None
+        self._section_parts: Optional[list[str]] = None
+        self.sections_count = 0
+
+    def feed(self, delta: str) -> list[dict]:
+        """
+        Add a text delta and return the sections completed by it.
+
+        Only the new text is scanned. Of what came before, the parser keeps
+        the pieces of the section and the top-level key being read, so
+        the cost stays linear in the length of the completion.
+
+        Raises:
+            ValueError: If the output is not a JSON object or a section
+                is invalid.
+        """
+        completed = []
+
+        if not self._started:
+            self._prefix += delta
+            brace = self._find_start()
+            if brace is None:
+                return completed
+            delta, self._prefix = self._prefix[brace:], ""
+
+        # Where the open section and top-level string start in this delta
+        section_from = 0
+        string_from = 0
+
+        for pos, char in enumerate(delta):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._string_parts is not None:
+                        self._string_parts.append(delta[string_from:pos])
+                        self._last_string = "".join(self._string_parts)
+                        self._string_parts = None
+            elif char == '"':
+                self._in_string = True
+                # Only top-level strings can be keys worth remembering
+                if len(self._stack) == 1:
+                    self._string_parts = []
+                    string_from = pos + 1
+            elif char == ":" and len(self._stack) == 1:
+                self._key = self._last_string
+            elif char in "{[":
+                if (
+                    char == "{"
+                    and self._sections_depth is not None
+                    and len(self._stack) == self._sections_depth
+                ):
+                    self._section_parts = []
+                    section_from = pos
+                self._stack.append(char)
+                if char == "[" and len(self._stack) == 2 and self._key == "sections":
+                    self._sections_depth = 2
+            elif char in "}]":
+                if not self._stack:
+                    raise ValueError("Invalid JSON response from LLM: unbalanced brackets")
+                self._stack.pop()
+                if (
+                    char == "}"
+                    and self._section_parts is not None
+                    and len(self._stack) == self._sections_depth
+                ):
+                    self._section_parts.append(delta[section_from:pos + 1])
+                    completed.append(self._emit("".join(self._section_parts)))
+                    self._section_parts = None
+                elif char == "]" and len(self._stack) == 1 and self._sections_depth:
+                    self._sections_depth = None
+
+        # Carry the unfinished section and key over to the next delta
+        if self._section_parts is not None:
+            self._section_parts.append(delta[section_from:])
+        if self._string_parts is not None:
+            self._string_parts.append(delta[string_from:])
+
+        return completed
+
+    def _find_start(self) -> Optional[int]:
+        """Locate the opening brace, rejecting output that isn't JSON."""
+        brace = self._prefix.find("{")
+        prefix = self._prefix if brace < 0 else self._prefix[:brace]
+
+        if not _PREFIX_PATTERN.fullmatch(prefix):
+            stripped = prefix.lstrip()
+            # A fence may still be arriving (e.g. "``")
+            if brace >= 0 or not _FENCE.startswith(stripped):
+                raise ValueError(
+                    f"Invalid JSON response from LLM: unexpected output {prefix.strip()[:40]!r}"
+                )
+
+        if brace < 0:
+            return None
+
+        self._started = True
+        return brace
+
+    def _emit(self, raw: str) -> dict:
+        """Parse and validate one section object."""
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON response from LLM: {e}")
+
+        try:
+            Section(**data)
+        except Exception as e:
+            raise ValueError(f"Invalid document structure from LLM: {e}")
+
+        self.sections_count += 1
+        return data
+
+
+def repair_json(text: str) -> tuple[str, bool]:
+    """
+    Fix the common defects of LLM JSON output, without any model call.
+
+    Strips markdown fences and prose before the opening brace or after
+    the closing one, drops trailing commas, and closes the strings and
+    brackets of a truncated output (dropping a dangling key or comma).
+
+    Args:
+        text: Raw completion text.
+
+    Returns:
+        (json_text, truncated): the repaired text, and whether the output
+        was cut short (closing it may have lost the end of the document).
+    """
+    start = text.find("{")
+    if start < 0:
+        return text.strip(), False
+
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = False
+    escape = False
+    end = None
+
+    for pos in range(start, len(text)):
+        char = text[pos]
+        out.append(char)
+
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            out.pop()
+            _drop_trailing_comma(out)
+            out.append(char)
+            if stack:
+                stack.pop()
+            if not stack:
+                end = pos
+                break
+
+    if end is not None:
+        return "".join(out), False
+
+    # Truncated: finish the current string, then close every bracket
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    _drop_dangling(out, stack)
+    for closer in reversed(stack):
+        _drop_trailing_comma(out)
+        out.append(closer)
+    return "".join(out), True
+
+
+def _drop_trailing_comma(out: list[str]) -> None:
+    """Remove whitespace and a comma at the end of the output."""
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _drop_dangling(out: list[str], stack: list[str]) -> None:
+    """Remove an object key left without its value by a truncation."""
+    text = "".join(out).rstrip()
+
+    if stack and stack[-1] == "}":
+        # '"key":' or '"key"' as the last member of an object
+        match = re.search(r'[{,]\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', text)
+        if match and (text.endswith(":") or text[match.start()] == "," or text[match.start()] == "{"):
+            text = text[:match.start() + 1]
+            if text.endswith(","):
+                text = text[:-1]
+    elif text.endswith(":"):
+        text = text[:-1]
+
+    out[:] = list(text)
@@ -1,10 +1,26 @@
 """LLM service for document analysis - Multi-provider support."""
 
+import asyncio
 import httpx
+import hashlib
+import importlib.util
 import json
-from typing import Optional
-from ..models import LLMConfig, LLMProvider, DocumentStructure
+import random
+from collections import OrderedDict
+from contextlib import aclosing
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from ..models import LLMConfig, LLMProvider, DocumentStructure, Section
 from ..config import settings
+from ..metrics import (
+    ANALYSIS_CACHE, LLM_ERRORS, LLM_PARSE_SECONDS, LLM_REQUEST_SECONDS,
+    LLM_REQUESTS_IN_FLIGHT, LLM_RETRIES, LLM_TOKENS,
+)
+from .analysis_cache import AnalysisCache, analysis_cache
+from .chunker import HeuristicTokenizer
+from .json_stream import SectionStreamParser, repair_json
+from .rate_limiter import ProviderLimiter, RateLimiter, parse_reset, rate_limiter
 
 
 # System prompt for document analysis
@@ -74,24 +90,157 @@ ANALYSIS_PROMPT = """Tu es un analyseur de documents expert. Analyse le texte su
 
 Retourne UNIQUEMENT le JSON valide, sans commentaires ni explications."""
 
+# Follow-up asking the model to finish a truncated answer
+CONTINUE_PROMPT = """Ta réponse a été coupée. Continue le JSON exactement là où il s'est arrêté, sans répéter ce qui précède ni ajouter de texte."""
+
+# Follow-up asking the model to fix its own invalid JSON (without the document)
+FIX_PROMPT = """Tu corriges du JSON invalide produit par un analyseur de documents. Il doit suivre la structure : metadata (title obligatoire), toc, sections (chacune avec type "section", title et content), conclusion, sources.
+
+Corrige l'erreur indiquée sans modifier le contenu et retourne UNIQUEMENT le JSON corrigé, sans commentaires ni explications."""
+
+# Changes whenever the prompt changes, invalidating cached analyses
+PROMPT_VERSION = hashlib.sha256(ANALYSIS_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+OPENAI_BASE_URL = "https://api.openai.com"
+ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+
+# HTTP/2 needs the optional 'h2' package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Called with each section dict as soon as it is available
+SectionCallback = Callable[[dict], Awaitable[None]]
+
+
+# Transient provider errors worth retrying (529: Anthropic overloaded)
+RETRY_STATUSES = {500, 502, 503, 504, 529}
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+
+# Rate limiter of the call in progress, fed with the response headers
+_active_limiter: ContextVar[Optional[ProviderLimiter]] = ContextVar("active_limiter", default=None)
+
+
+@dataclass
+class ProviderRequest:
+    """HTTP request to a provider's completion endpoint."""
+    base_url: str
+    path: str
+    headers: dict
+    payload: dict
+
 
 class LLMService:
     """Service for calling LLM APIs."""
 
     def __init__(self):
         self.timeout = settings.llm_timeout_seconds
+        self.streaming = settings.llm_streaming
+        self.max_concurrency = settings.llm_global_concurrency
+        self.rate_limit_retries = settings.llm_rate_limit_retries
+        self.max_retries = settings.llm_max_retries
+        self.repair_followups = settings.llm_repair_followups
+        self.rate_limiter: RateLimiter = rate_limiter
+        self._tokenizer = HeuristicTokenizer()
+        self._prompt_tokens = self._tokenizer.count(ANALYSIS_PROMPT)
+        self.metric_models = {
+            model.strip() for model in settings.llm_metric_models.split(",") if model.strip()
+        }
+        self.max_clients = settings.llm_max_clients
+        self._clients: OrderedDict[str, httpx.AsyncClient] = OrderedDict()
+        self._closing: set[asyncio.Task] = set()
+        self._limiter: Optional[asyncio.Semaphore] = None
+        self._limiter_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.cache: Optional[AnalysisCache] = (
+            analysis_cache if settings.analysis_cache_enabled else None
+        )
+
+    async def startup(self) -> None:
+        """Open pooled clients for the hosted providers."""
+        self._get_client(OPENAI_BASE_URL)
+        self._get_client(ANTHROPIC_BASE_URL)
+
+    async def shutdown(self) -> None:
+        """Close every pooled client."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+        await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def _get_limiter(self) -> asyncio.Semaphore:
+        """
+        Get the semaphore bounding LLM calls across all conversions.
+
+        Every chunk of every conversion (single, job or batch) goes through
+        it, so a large batch queues up instead of flooding the provider.
+        """
+        loop = asyncio.get_running_loop()
+        if self._limiter is None or self._limiter_loop is not loop:
+            self._limiter = asyncio.Semaphore(max(1, self.max_concurrency))
+            self._limiter_loop = loop
+        return self._limiter
+
+    def _get_client(self, base_url: str) -> httpx.AsyncClient:
+        """
+        Get the long-lived client for a base URL, creating it if needed.
+
+        Clients keep connections alive between calls so chunks after the
+        first one skip the TCP/TLS handshake. Custom base URLs come from
+        the caller, so at most `max_clients` clients are kept: the least
+        recently used one is closed (a call still using it fails with a
+        transport error and is retried on a new client).
+        """
+        base_url = base_url.rstrip("/")
+        client = self._clients.get(base_url)
+
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=self.timeout,
+                http2=settings.llm_http2 and HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_keepalive_connections,
+                    keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+                ),
+            )
+            self._clients[base_url] = client
+        self._clients.move_to_end(base_url)
+
+        self._evict_clients(keep=base_url)
+        return client
+
+    def _evict_clients(self, keep: str) -> None:
+        """Close the least recently used clients over `max_clients` (hosted providers stay)."""
+        evictable = [
+            url for url in self._clients if url not in (keep, OPENAI_BASE_URL, ANTHROPIC_BASE_URL)
+        ]
+        excess = len(self._clients) - max(1, self.max_clients)
+
+        for url in evictable[:max(0, excess)]:
+            task = asyncio.get_running_loop().create_task(self._clients.pop(url).aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
 
     async def analyze_document(
         self,
         text: str,
-        config: LLMConfig
+        config: LLMConfig,
+        on_section: Optional[SectionCallback] = None,
     ) -> DocumentStructure:
         """
         Analyze document text using the configured LLM.
 
+        Results are cached by chunk text, provider, model and prompt
+        version, so re-uploading a document skips the LLM entirely. An
+        analysis salvaged from invalid output is not cached.
+
         Args:
             text: Extracted document text.
             config: LLM configuration (provider, api_key, model).
+            on_section: Optional coroutine called with each section dict.
+                In streaming mode it runs as soon as the section is
+                complete, before the rest of the response arrives.
 
         Returns:
             Parsed DocumentStructure.
@@ -100,21 +249,289 @@ class LLMService:
             ValueError: If LLM response is invalid.
             httpx.HTTPError: If API call fails.
         """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(text, config, PROMPT_VERSION)
+            cached = await self.cache.get(cache_key)
+            ANALYSIS_CACHE.inc(result="hit" if cached is not None else "miss")
+            if cached is not None:
+                await self._emit_sections(cached, on_section)
+                return cached
+
+        streamed = 0
+
+        async def on_streamed_section(section: dict) -> None:
+            nonlocal streamed
+            streamed += 1
+            await on_section(section)
+
+        response = await self._request_completion(
+            text, config, on_streamed_section if on_section is not None else None
+        )
+        provider = config.provider.value
+        recovered = False
+        try:
+            with LLM_PARSE_SECONDS.time(provider=provider):
+                doc = self._parse_response(response)
+        except ValueError as e:
+            try:
+                doc = await self._recover(text, config, response, e)
+            except ValueError:
+                LLM_ERRORS.inc(provider=provider, reason="invalid_output")
+                raise
+            recovered = True
+
+        # Sections the stream didn't deliver (all of them without streaming)
+        await self._emit_sections(doc, on_section, skip=streamed)
+
+        # A salvaged analysis may miss content (e.g. a section lost to
+        # truncation): the next conversion asks the model again
+        if cache_key is not None and not recovered:
+            await self.cache.set(cache_key, doc)
+
+        return doc
+
+    async def _request_completion(
+        self,
+        text: str,
+        config: LLMConfig,
+        on_section: Optional[SectionCallback] = None,
+    ) -> str:
+        """
+        Get the analysis completion of a text (streamed or not).
+
+        A retried stream starts over from its first section: sections
+        already passed to `on_section` by an earlier attempt are not
+        passed again.
+        """
+        delivered = 0
+
+        async def call() -> str:
+            if not self.streaming:
+                return await self._call_provider(text, config)
+
+            received = 0
+
+            async def on_new_section(section: dict) -> None:
+                nonlocal delivered, received
+                received += 1
+                if received > delivered:
+                    delivered = received
+                    await on_section(section)
+
+            return await self._stream_response(
+                text, config, on_new_section if on_section is not None else None
+            )
+
+        return await self._limited_call(config, self._estimate_tokens(text), call)
+
+    async def _limited_call(
+        self,
+        config: LLMConfig,
+        tokens: int,
+        call: Callable[[], Awaitable[str]],
+    ) -> str:
+        """
+        Run a provider call within its rate limits, retrying failures.
+
+        A 429 response shrinks the concurrency of that provider account,
+        pauses it for Retry-After (or an exponential backoff) and retries,
+        up to `rate_limit_retries` times. Timeouts, connection errors and
+        5xx responses are retried up to `max_retries` times with jittered
+        exponential backoff.
+        """
+        provider = config.provider.value
+        limiter = self.rate_limiter.get(provider, config.api_key, config.model)
+        rate_limited = 0
+        failures = 0
+
+        while True:
+            await limiter.acquire(tokens)
+            context = _active_limiter.set(limiter)
+            try:
+                async with self._get_limiter():
+                    with LLM_REQUESTS_IN_FLIGHT.track(provider=provider), \
+                            LLM_REQUEST_SECONDS.time(provider=provider, model=self._model_label(config.model)):
+                        response = await call()
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status == 429 and rate_limited < self.rate_limit_retries:
+                    limiter.on_rate_limited(parse_reset(e.response.headers.get("retry-after")), rate_limited)
+                    rate_limited += 1
+                    LLM_RETRIES.inc(provider=provider, reason="rate_limited")
+                    continue
+                if status not in RETRY_STATUSES or failures >= self.max_retries:
+                    LLM_ERRORS.inc(provider=provider, reason=str(status))
+                    raise
+                failures += 1
+                LLM_RETRIES.inc(provider=provider, reason="transient")
+            except httpx.TransportError:
+                if failures >= self.max_retries:
+                    LLM_ERRORS.inc(provider=provider, reason="transport")
+                    raise
+                failures += 1
+                LLM_RETRIES.inc(provider=provider, reason="transient")
+            else:
+                limiter.on_success()
+                return response
+            finally:
+                _active_limiter.reset(context)
+                limiter.release()
+
+            await asyncio.sleep(self._backoff(failures))
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Jittered exponential delay before retry number `attempt`."""
+        delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.5)
+
+    def _estimate_tokens(self, text: str) -> int:
+        """Tokens a call is expected to cost: the prompt, the text and a completion as long."""
+        return self._prompt_tokens + 2 * self._tokenizer.count(text)
+
+    async def _recover(
+        self,
+        text: str,
+        config: LLMConfig,
+        response: str,
+        error: ValueError,
+    ) -> DocumentStructure:
+        """
+        Salvage an invalid completion instead of re-running the analysis.
+
+        The output is first repaired locally. A truncated output is then
+        completed by asking the model to continue where it stopped, and
+        output that still doesn't validate is sent back, alone, to be
+        fixed. Both follow-ups are much cheaper than a new analysis.
+
+        Raises:
+            ValueError: If the output can't be recovered.
+        """
+        repaired, truncated = repair_json(response)
+
+        if truncated and self.repair_followups:
+            LLM_RETRIES.inc(provider=config.provider.value, reason="continue")
+            request = self._continue_request(text, config, response)
+            continuation = await self._limited_call(
+                config, self._estimate_tokens(text),
+                lambda: self._send(request, config.provider),
+            )
+            stripped = continuation.lstrip()
+            if stripped.startswith(("{", "```")):
+                # The model started over instead of continuing
+                repaired, truncated = repair_json(continuation)
+            else:
+                repaired, truncated = repair_json(response.rstrip() + continuation)
+
+        try:
+            return self._parse_repaired(repaired, truncated)
+        except ValueError as e:
+            error = e
+
+        if not self.repair_followups:
+            raise error
+
+        LLM_RETRIES.inc(provider=config.provider.value, reason="fix")
+        request = self._fix_request(config, repaired, error)
+        fixed = await self._limited_call(
+            config, self._estimate_tokens(repaired),
+            lambda: self._send(request, config.provider),
+        )
+        return self._parse_repaired(*repair_json(fixed))
+
+    def _parse_repaired(self, repaired: str, truncated: bool) -> DocumentStructure:
+        """Parse repaired output, dropping a last section cut by truncation."""
+        if truncated:
+            try:
+                data = json.loads(repaired)
+            except json.JSONDecodeError:
+                data = None
+
+            sections = data.get("sections") if isinstance(data, dict) else None
+            if isinstance(sections, list) and sections:
+                try:
+                    Section(**sections[-1])
+                except Exception:
+                    sections.pop()
+                    repaired = json.dumps(data)
+
+        return self._parse_response(repaired)
+
+    def _continue_request(self, text: str, config: LLMConfig, partial: str) -> ProviderRequest:
+        """Build a request asking the model to finish a truncated answer."""
+        request = self._build_request(text, config)
+
+        if config.provider == LLMProvider.ANTHROPIC:
+            # Prefilled assistant turn: the model resumes from its last character
+            request.payload["messages"].append({"role": "assistant", "content": partial.rstrip()})
+        else:
+            request.payload["messages"] += [
+                {"role": "assistant", "content": partial},
+                {"role": "user", "content": CONTINUE_PROMPT},
+            ]
+            # The continuation alone is not a JSON object
+            request.payload.pop("response_format", None)
+
+        return request
+
+    def _fix_request(self, config: LLMConfig, broken: str, error: ValueError) -> ProviderRequest:
+        """Build a request asking the model to fix invalid JSON."""
+        request = self._build_request("", config)
+        content = f"Erreur : {error}\n\nJSON à corriger :\n{broken}"
+
+        if config.provider == LLMProvider.ANTHROPIC:
+            request.payload["system"] = FIX_PROMPT
+            request.payload["messages"] = [{"role": "user", "content": content}]
+        else:
+            request.payload["messages"] = [
+                {"role": "system", "content": FIX_PROMPT},
+                {"role": "user", "content": content},
+            ]
+
+        return request
+
+    def _observe(self, response: httpx.Response) -> None:
+        """Pass a response's rate-limit headers to the limiter of the call."""
+        limiter = _active_limiter.get()
+        if limiter is not None:
+            limiter.update(response.headers)
+
+    async def _emit_sections(
+        self,
+        doc: DocumentStructure,
+        on_section: Optional[SectionCallback],
+        skip: int = 0,
+    ) -> None:
+        """Pass the sections of a finished analysis, after the first `skip`, to the callback."""
+        if on_section is not None:
+            for section in doc.sections[skip:]:
+                await on_section(section.model_dump())
+
+    async def _call_provider(self, text: str, config: LLMConfig) -> str:
+        """Call the configured provider and return the completion text."""
         if config.provider == LLMProvider.OPENAI:
-            response = await self._call_openai(text, config)
+            return await self._call_openai(text, config)
         elif config.provider == LLMProvider.ANTHROPIC:
-            response = await self._call_anthropic(text, config)
+            return await self._call_anthropic(text, config)
         elif config.provider == LLMProvider.CUSTOM:
-            response = await self._call_custom(text, config)
+            return await self._call_custom(text, config)
         else:
             raise ValueError(f"Unsupported provider: {config.provider}")
 
-        return self._parse_response(response)
-
-    async def _call_openai(self, text: str, config: LLMConfig) -> str:
-        """Call OpenAI API."""
-        url = "https://api.openai.com/v1/chat/completions"
+    def _build_request(self, text: str, config: LLMConfig) -> ProviderRequest:
+        """Build the HTTP request for the configured provider."""
+        if config.provider == LLMProvider.OPENAI:
+            return self._openai_request(text, config)
+        elif config.provider == LLMProvider.ANTHROPIC:
+            return self._anthropic_request(text, config)
+        elif config.provider == LLMProvider.CUSTOM:
+            return self._custom_request(text, config)
+        else:
+            raise ValueError(f"Unsupported provider: {config.provider}")
 
+    def _openai_request(self, text: str, config: LLMConfig) -> ProviderRequest:
+        """Build an OpenAI chat completion request."""
         headers = {
             "Authorization": f"Bearer {config.api_key}",
             "Content-Type": "application/json",
@@ -130,17 +547,10 @@ class LLMService:
             "response_format": {"type": "json_object"},
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
-
-    async def _call_anthropic(self, text: str, config: LLMConfig) -> str:
-        """Call Anthropic API."""
-        url = "https://api.anthropic.com/v1/messages"
+        return ProviderRequest(OPENAI_BASE_URL, "/v1/chat/completions", headers, payload)
 
+    def _anthropic_request(self, text: str, config: LLMConfig) -> ProviderRequest:
+        """Build an Anthropic messages request."""
         headers = {
             "x-api-key": config.api_key,
             "anthropic-version": "2023-06-01",
@@ -156,20 +566,13 @@ class LLMService:
             ],
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-
-        data = response.json()
-        return data["content"][0]["text"]
+        return ProviderRequest(ANTHROPIC_BASE_URL, "/v1/messages", headers, payload)
 
-    async def _call_custom(self, text: str, config: LLMConfig) -> str:
-        """Call custom OpenAI-compatible API (LM Studio, Ollama, etc.)."""
+    def _custom_request(self, text: str, config: LLMConfig) -> ProviderRequest:
+        """Build a request for a custom OpenAI-compatible API."""
         if not config.base_url:
             raise ValueError("base_url is required for custom provider")
 
-        url = f"{config.base_url.rstrip('/')}/v1/chat/completions"
-
         headers = {
             "Content-Type": "application/json",
         }
@@ -187,12 +590,161 @@ class LLMService:
             "temperature": 0.1,
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(url, headers=headers, json=payload)
+        return ProviderRequest(config.base_url, "/v1/chat/completions", headers, payload)
+
+    async def _post(self, request: ProviderRequest) -> dict:
+        """Send a request on the pooled client and return the JSON body."""
+        client = self._get_client(request.base_url)
+        response = await client.post(request.path, headers=request.headers, json=request.payload)
+        self._observe(response)
+        response.raise_for_status()
+        return response.json()
+
+    async def _send(self, request: ProviderRequest, provider: LLMProvider) -> str:
+        """Send a request and return the completion text."""
+        data = await self._post(request)
+        if provider == LLMProvider.ANTHROPIC:
+            completion = data["content"][0]["text"]
+        else:
+            completion = data["choices"][0]["message"]["content"]
+
+        self._record_tokens(request, provider, completion, data.get("usage"))
+        return completion
+
+    def _record_tokens(
+        self,
+        request: ProviderRequest,
+        provider: LLMProvider,
+        completion: str,
+        usage: Optional[dict] = None,
+    ) -> None:
+        """Count the tokens of a call: the provider's usage figures, else estimates."""
+        usage = usage or {}
+        tokens_in = usage.get("prompt_tokens", usage.get("input_tokens"))
+        tokens_out = usage.get("completion_tokens", usage.get("output_tokens"))
+
+        if tokens_in is None:
+            messages = request.payload.get("messages", [])
+            tokens_in = self._tokenizer.count(request.payload.get("system", "")) + sum(
+                self._tokenizer.count(str(message.get("content", ""))) for message in messages
+            )
+        if tokens_out is None:
+            tokens_out = self._tokenizer.count(completion)
+
+        labels = {
+            "provider": provider.value,
+            "model": self._model_label(request.payload.get("model", "")),
+        }
+        LLM_TOKENS.inc(tokens_in, direction="in", **labels)
+        LLM_TOKENS.inc(tokens_out, direction="out", **labels)
+
+    def _model_label(self, model: str) -> str:
+        """Model name for metric labels: known models only, so callers can't add series."""
+        return model if model in self.metric_models else "other"
+
+    async def _call_openai(self, text: str, config: LLMConfig) -> str:
+        """Call OpenAI API."""
+        return await self._send(self._openai_request(text, config), LLMProvider.OPENAI)
+
+    async def _call_anthropic(self, text: str, config: LLMConfig) -> str:
+        """Call Anthropic API."""
+        return await self._send(self._anthropic_request(text, config), LLMProvider.ANTHROPIC)
+
+    async def _call_custom(self, text: str, config: LLMConfig) -> str:
+        """Call custom OpenAI-compatible API (LM Studio, Ollama, etc.)."""
+        return await self._send(self._custom_request(text, config), LLMProvider.CUSTOM)
+
+    async def _stream_response(
+        self,
+        text: str,
+        config: LLMConfig,
+        on_section: Optional[SectionCallback] = None,
+    ) -> str:
+        """
+        Stream a completion, passing sections to the callback as they close.
+
+        Once the output turns out malformed (e.g. a trailing comma in a
+        section), sections are no longer passed on, but the rest of the
+        completion is still read: the caller repairs it like a
+        non-streamed one.
+
+        Returns:
+            The full completion text.
+        """
+        parser: Optional[SectionStreamParser] = SectionStreamParser()
+        parts = []
+
+        async with aclosing(self._stream_completion(text, config)) as deltas:
+            async for delta in deltas:
+                parts.append(delta)
+                if parser is None:
+                    continue
+                try:
+                    sections = parser.feed(delta)
+                except ValueError:
+                    parser = None
+                    continue
+                for section in sections:
+                    if on_section is not None:
+                        await on_section(section)
+
+        return "".join(parts)
+
+    async def _stream_completion(self, text: str, config: LLMConfig) -> AsyncIterator[str]:
+        """Yield completion text deltas from the provider's SSE stream."""
+        request = self._build_request(text, config)
+        request.payload["stream"] = True
+        if config.provider != LLMProvider.ANTHROPIC:
+            # OpenAI-compatible servers only report usage in a last chunk on request
+            request.payload["stream_options"] = {"include_usage": True}
+
+        client = self._get_client(request.base_url)
+        usage: dict = {}
+        tokens_out = 0
+
+        async with client.stream(
+            "POST", request.path, headers=request.headers, json=request.payload
+        ) as response:
+            self._observe(response)
+            if response.is_error:
+                await response.aread()
             response.raise_for_status()
 
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+
+                event = json.loads(data)
+                # Anthropic: message_start then message_delta; OpenAI: last chunk
+                usage.update((event.get("message") or {}).get("usage") or {})
+                usage.update(event.get("usage") or {})
+
+                delta = self._extract_delta(event, config.provider)
+                if delta:
+                    tokens_out += self._tokenizer.count(delta)
+                    yield delta
+
+        usage.setdefault("output_tokens", tokens_out)
+        self._record_tokens(request, config.provider, "", usage)
+
+    def _extract_delta(self, event: dict, provider: LLMProvider) -> Optional[str]:
+        """Get the text delta out of one streamed event."""
+        if provider == LLMProvider.ANTHROPIC:
+            if event.get("type") == "error":
+                raise ValueError(f"LLM stream error: {event.get('error')}")
+            if event.get("type") == "content_block_delta":
+                return event["delta"].get("text")
+            return None
+
+        # OpenAI-compatible chunk
+        choices = event.get("choices") or []
+        if not choices:
+            return None
+        return (choices[0].get("delta") or {}).get("content")
 
     def _parse_response(self, response: str) -> DocumentStructure:
         """Parse LLM response into DocumentStructure."""
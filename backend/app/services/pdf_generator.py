@@ -1,35 +1,115 @@
 """PDF generation service using Playwright for perfect rendering."""
 
-from playwright.sync_api import sync_playwright
-from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import re
+from typing import Optional
+from playwright.async_api import async_playwright, Browser, Playwright
+from ..config import settings
 
+_REMOTE_URL = re.compile(r"^https?://")
 
-class PDFGenerator:
-    """Service for converting HTML to PDF using headless browser."""
 
-    def __init__(self):
-        self._executor = ThreadPoolExecutor(max_workers=2)
+class _BrowserSlot:
+    """A pool slot holding one Chromium instance and its render count."""
 
-    def _generate_pdf_sync(self, html_content: str) -> bytes:
-        """
-        Generate PDF synchronously using Playwright.
+    def __init__(self):
+        self.browser: Optional[Browser] = None
+        self.renders = 0
 
-        Args:
-            html_content: Complete HTML document string.
 
-        Returns:
-            PDF file as bytes.
+class PDFGenerator:
+    """
+    Service for converting HTML to PDF using headless browser.
+
+    Keeps a pool of warm Chromium instances. Each job gets a fresh browser
+    context, so jobs don't share cookies or storage, and browsers are
+    recycled after `max_renders` jobs or when they crash.
+    """
+
+    def __init__(self, pool_size: Optional[int] = None, max_renders: Optional[int] = None):
+        self.pool_size = pool_size or settings.pdf_browser_pool_size
+        self.max_renders = max_renders or settings.pdf_browser_max_renders
+        self._playwright: Optional[Playwright] = None
+        self._playwright_lock: Optional[asyncio.Lock] = None
+        self._pool: Optional[asyncio.Queue] = None
+        self._slots: list[_BrowserSlot] = []
+
+    async def start(self) -> None:
+        """Launch every browser of the pool ahead of the first job."""
+        self._ensure_pool()
+        for slot in self._slots:
+            if slot.browser is None:
+                slot.browser = await self._launch()
+
+    async def shutdown(self) -> None:
+        """Close every browser and stop Playwright."""
+        for slot in self._slots:
+            await self._retire(slot)
+
+        self._pool = None
+        self._slots = []
+
+        playwright, self._playwright = self._playwright, None
+        if playwright is not None:
+            await playwright.stop()
+
+    def _ensure_pool(self) -> asyncio.Queue:
+        """Create the pool slots on first use (browsers launch lazily)."""
+        if self._pool is None:
+            self._pool = asyncio.Queue()
+            self._slots = [_BrowserSlot() for _ in range(max(1, self.pool_size))]
+            for slot in self._slots:
+                self._pool.put_nowait(slot)
+        return self._pool
+
+    async def _get_playwright(self) -> Playwright:
         """
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
+        Start the Playwright driver on first use.
 
-            # Set content and wait for fonts to load
-            page.set_content(html_content, wait_until='networkidle')
+        Concurrent first renders would each start a driver and leak all
+        but one, so the start runs under a lock and is checked again
+        once the lock is held.
+        """
+        if self._playwright is None:
+            if self._playwright_lock is None:
+                self._playwright_lock = asyncio.Lock()
+            async with self._playwright_lock:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+        return self._playwright
+
+    async def _launch(self) -> Browser:
+        """Launch a new headless Chromium."""
+        playwright = await self._get_playwright()
+        return await playwright.chromium.launch()
+
+    async def _retire(self, slot: _BrowserSlot) -> None:
+        """Close a slot's browser so the next job launches a fresh one."""
+        browser, slot.browser = slot.browser, None
+        slot.renders = 0
+
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass  # Already dead
+
+    async def _render(self, browser: Browser, html_content: str) -> bytes:
+        """Render HTML to PDF in a fresh context of a pooled browser."""
+        context = await browser.new_context()
+        try:
+            if settings.offline_assets:
+                # Everything is embedded: never wait on the network
+                await context.route(_REMOTE_URL, lambda route: route.abort())
+
+            page = await context.new_page()
+
+            # The load event covers stylesheets; fonts settle right after
+            await page.set_content(html_content, wait_until='load')
+            await page.evaluate("document.fonts.ready.then(() => true)")
 
             # Generate PDF with print settings
-            pdf_bytes = page.pdf(
+            return await page.pdf(
                 format='A4',
                 print_background=True,
                 margin={
@@ -39,14 +119,15 @@ class PDFGenerator:
                     'right': '15mm'
                 }
             )
-
-            browser.close()
-
-        return pdf_bytes
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass  # Browser crashed, handled by the caller
 
     async def generate_pdf_async(self, html_content: str) -> bytes:
         """
-        Generate PDF asynchronously by running sync code in thread pool.
+        Generate PDF with a browser from the pool.
 
         Args:
             html_content: Complete HTML document string.
@@ -54,13 +135,28 @@ class PDFGenerator:
         Returns:
             PDF file as bytes.
         """
-        loop = asyncio.get_event_loop()
-        pdf_bytes = await loop.run_in_executor(
-            self._executor,
-            self._generate_pdf_sync,
-            html_content
-        )
-        return pdf_bytes
+        pool = self._ensure_pool()
+        slot = await pool.get()
+
+        try:
+            if slot.browser is None or not slot.browser.is_connected():
+                await self._retire(slot)
+                slot.browser = await self._launch()
+
+            try:
+                pdf_bytes = await self._render(slot.browser, html_content)
+            except Exception:
+                if not slot.browser.is_connected():
+                    await self._retire(slot)
+                raise
+
+            slot.renders += 1
+            if slot.renders >= self.max_renders:
+                await self._retire(slot)
+
+            return pdf_bytes
+        finally:
+            pool.put_nowait(slot)
 
 
 # Singleton instance
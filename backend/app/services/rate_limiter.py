@@ -0,0 +1,268 @@
+"""Client-side rate limiting and adaptive concurrency for LLM providers."""
+
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+from ..config import settings
+
+# OpenAI durations such as "1s", "6m0s" or "20ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# Rate-limit headers: (limit, remaining, reset) for requests and tokens
+OPENAI_HEADERS = {
+    "requests": ("x-ratelimit-limit-requests", "x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+    "tokens": ("x-ratelimit-limit-tokens", "x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+}
+ANTHROPIC_HEADERS = {
+    "requests": ("anthropic-ratelimit-requests-limit", "anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+    "tokens": ("anthropic-ratelimit-tokens-limit", "anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-reset"),
+}
+
+# Wait after a 429 without Retry-After: doubles with each attempt
+DEFAULT_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Convert a reset or Retry-After header to seconds from now.
+
+    Accepts a number of seconds, an OpenAI duration ("6m0s"), an RFC 3339
+    timestamp (Anthropic) or an HTTP date.
+    """
+    if not value:
+        return None
+    value = value.strip()
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Budget refilled continuously at `per_minute` units per minute (0 = unlimited)."""
+
+    def __init__(self, per_minute: float = 0):
+        self.per_minute = per_minute
+        self.available = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.per_minute > 0:
+            elapsed = now - self._updated
+            self.available = min(self.per_minute, self.available + elapsed * self.per_minute / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available."""
+        if self.per_minute <= 0:
+            return 0.0
+
+        self._refill(now)
+        # A request larger than the whole budget waits for a full bucket
+        amount = min(amount, self.per_minute)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60 / self.per_minute
+
+    def take(self, amount: float) -> None:
+        """Spend units (the balance may go negative until refilled)."""
+        if self.per_minute > 0:
+            self.available -= min(amount, self.per_minute)
+
+    def set_limit(self, per_minute: float, now: float) -> None:
+        """Adopt the limit announced by the provider."""
+        self._refill(now)
+        if self.per_minute <= 0:
+            self.available = float(per_minute)
+        self.per_minute = per_minute
+        self.available = min(self.available, per_minute)
+
+    def set_remaining(self, remaining: float, now: float) -> None:
+        """Never assume more budget than the provider reports."""
+        self._refill(now)
+        self.available = min(self.available, remaining)
+
+
+class ProviderLimiter:
+    """
+    Limits for one (provider, API key, model).
+
+    Requests wait for the request and token buckets, for any Retry-After
+    pause, and for a free slot in an AIMD concurrency window: the window
+    grows by one slot per window of successful calls and halves on 429.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 8,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = float(self.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._released = asyncio.Event()
+
+    @property
+    def idle(self) -> bool:
+        """Whether dropping the limiter loses nothing: no call and no pause."""
+        return self.in_flight == 0 and self.blocked_until <= time.monotonic()
+
+    async def acquire(self, tokens: float) -> None:
+        """Wait until a call estimated at `tokens` tokens may start."""
+        while True:
+            now = time.monotonic()
+            wait = max(
+                self.blocked_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(tokens, now),
+            )
+
+            if wait <= 0 and self.in_flight < int(self.concurrency):
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                self.in_flight += 1
+                return
+
+            # Sleep until the budget refills or another call ends
+            self._released.clear()
+            try:
+                await asyncio.wait_for(self._released.wait(), wait if wait > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self) -> None:
+        """Mark a call as finished."""
+        self.in_flight -= 1
+        self._released.set()
+
+    def on_success(self) -> None:
+        """Additive increase of the concurrency window."""
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def on_rate_limited(self, retry_after: Optional[float], attempt: int = 0) -> None:
+        """Multiplicative decrease, and pause every call until the provider allows."""
+        self.concurrency = max(1.0, self.concurrency / 2)
+
+        if retry_after is None:
+            retry_after = min(MAX_BACKOFF_SECONDS, DEFAULT_BACKOFF_SECONDS * 2 ** attempt)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Learn limits and remaining budget from rate-limit response headers."""
+        now = time.monotonic()
+
+        for names in (OPENAI_HEADERS, ANTHROPIC_HEADERS):
+            for kind, (limit_name, remaining_name, reset_name) in names.items():
+                bucket = self.requests if kind == "requests" else self.tokens
+                limit = _header_number(headers, limit_name)
+                remaining = _header_number(headers, remaining_name)
+
+                if limit:
+                    bucket.set_limit(limit, now)
+                if remaining is not None:
+                    bucket.set_remaining(remaining, now)
+                    if remaining <= 0:
+                        reset = parse_reset(headers.get(reset_name))
+                        if reset:
+                            self.blocked_until = max(self.blocked_until, now + reset)
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    """Read a numeric header, or None."""
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Registry of limiters, one per (provider, API key, model).
+
+    Keys and models come from callers, so the registry keeps at most
+    `max_limiters` of them: past that, the least recently used idle
+    limiters are dropped (a new one relearns the limits from headers).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_limiters: Optional[int] = None,
+    ):
+        self.requests_per_minute = (
+            settings.llm_requests_per_minute if requests_per_minute is None else requests_per_minute
+        )
+        self.tokens_per_minute = (
+            settings.llm_tokens_per_minute if tokens_per_minute is None else tokens_per_minute
+        )
+        self.max_concurrency = max_concurrency or settings.llm_global_concurrency
+        self.max_limiters = max_limiters or settings.llm_max_rate_limiters
+        self._limiters: OrderedDict[tuple, ProviderLimiter] = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self, provider: str, api_key: str, model: str) -> ProviderLimiter:
+        """Return the limiter of a provider account and model."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Limiters hold asyncio primitives bound to their loop
+            self._limiters.clear()
+            self._loop = loop
+
+        # Keep a fingerprint of the key rather than the key itself
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        key = (provider, key_hash, model)
+
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = ProviderLimiter(
+                self.requests_per_minute, self.tokens_per_minute, self.max_concurrency
+            )
+            self._limiters[key] = limiter
+            self._evict()
+        else:
+            self._limiters.move_to_end(key)
+        return limiter
+
+    def _evict(self) -> None:
+        """Drop the least recently used idle limiters past `max_limiters`."""
+        excess = len(self._limiters) - self.max_limiters
+        if excess <= 0:
+            return
+
+        # Limiters with calls in flight or a pending pause are kept
+        for key in [key for key, limiter in self._limiters.items() if limiter.idle][:excess]:
+            del self._limiters[key]
+
+
+# Singleton instance
+rate_limiter = RateLimiter()
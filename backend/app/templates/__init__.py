@@ -1,5 +1,5 @@
 """HTML templates for AutoDoc."""
 
-from .base_template import BASE_CSS, HTML_TEMPLATE, get_html_template
+from .base_template import BASE_CSS, HTML_TEMPLATE, get_html_template, get_template_parts
 
-__all__ = ["BASE_CSS", "HTML_TEMPLATE", "get_html_template"]
+__all__ = ["BASE_CSS", "HTML_TEMPLATE", "get_html_template", "get_template_parts"]
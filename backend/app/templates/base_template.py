@@ -1,5 +1,10 @@
 """Base HTML template with CSS from reference design."""
 
+from functools import lru_cache
+from typing import Optional
+from ..config import settings
+from .fonts import GOOGLE_FONTS_LINK, get_font_face_css
+
 # CSS extracted from audit-deux-decembre-complet.html
 BASE_CSS = """
 :root {
@@ -671,7 +676,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{title}</title>
-    <link href="https://fonts.googleapis.com/css2?family=Cormorant+Garamond:ital,wght@0,400;0,500;0,600;1,400;1,500&family=Source+Sans+Pro:wght@300;400;600&display=swap" rel="stylesheet">
+    {font_links}
     <style>
 {css}
     </style>
@@ -683,19 +688,71 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 """
 
 
-def get_html_template(title: str, content: str) -> str:
+# Markers splitting the template around the title and the content
+_TITLE_SLOT = "\x00title\x00"
+_CONTENT_SLOT = "\x00content\x00"
+
+
+def get_template_parts(offline: Optional[bool] = None) -> tuple[str, str, str]:
+    """
+    Static text of the page around the title and the content.
+
+    A page is `head + title + middle + content + tail`; streaming responses
+    send the parts around the content as it is generated.
+
+    Args:
+        offline: Embed bundled fonts instead of linking Google Fonts.
+            Defaults to the `offline_assets` setting.
+
+    Returns:
+        (head, middle, tail).
+    """
+    if offline is None:
+        offline = settings.offline_assets
+    return _template_parts(offline)
+
+
+@lru_cache(maxsize=2)
+def _template_parts(offline: bool) -> tuple[str, str, str]:
+    """
+    Static text of the page around the title and the content.
+
+    Formatted once per font mode (the CSS is large), so rendering a
+    document is a plain concatenation.
+
+    Returns:
+        (head up to the title, head after the title up to the content, end).
+    """
+    if offline:
+        font_links = ""
+        css = get_font_face_css() + BASE_CSS
+    else:
+        font_links = GOOGLE_FONTS_LINK
+        css = BASE_CSS
+
+    page = HTML_TEMPLATE.format(
+        title=_TITLE_SLOT,
+        font_links=font_links,
+        css=css,
+        content=_CONTENT_SLOT
+    )
+    head, rest = page.split(_TITLE_SLOT)
+    middle, tail = rest.split(_CONTENT_SLOT)
+    return head, middle, tail
+
+
+def get_html_template(title: str, content: str, offline: Optional[bool] = None) -> str:
     """
     Generate complete HTML document.
 
     Args:
         title: Document title.
         content: HTML body content.
+        offline: Embed bundled fonts instead of linking Google Fonts.
+            Defaults to the `offline_assets` setting.
 
     Returns:
         Complete HTML document string.
     """
-    return HTML_TEMPLATE.format(
-        title=title,
-        css=BASE_CSS,
-        content=content
-    )
+    head, middle, tail = get_template_parts(offline)
+    return "".join((head, title, middle, content, tail))
@@ -0,0 +1,87 @@
+"""Web fonts used by the HTML template, remote or bundled."""
+
+import base64
+from functools import lru_cache
+from pathlib import Path
+
+# Directory holding bundled .woff2 files for offline mode
+FONTS_DIR = Path(__file__).parent / "fonts"
+
+# Remote stylesheet used when offline mode is disabled
+GOOGLE_FONTS_LINK = (
+    '<link href="https://fonts.googleapis.com/css2?family=Cormorant+Garamond:'
+    'ital,wght@0,400;0,500;0,600;1,400;1,500&family=Source+Sans+Pro:'
+    'wght@300;400;600&display=swap" rel="stylesheet">'
+)
+
+# Files offline mode needs: the styles GOOGLE_FONTS_LINK loads
+BUNDLED_FONTS = (
+    "CormorantGaramond-400.woff2",
+    "CormorantGaramond-500.woff2",
+    "CormorantGaramond-600.woff2",
+    "CormorantGaramond-400-italic.woff2",
+    "CormorantGaramond-500-italic.woff2",
+    "SourceSansPro-300.woff2",
+    "SourceSansPro-400.woff2",
+    "SourceSansPro-600.woff2",
+)
+
+# File name prefix -> CSS font-family
+FONT_FAMILIES = {
+    "CormorantGaramond": "Cormorant Garamond",
+    "SourceSansPro": "Source Sans Pro",
+}
+
+
+def missing_fonts(fonts_dir: Path = FONTS_DIR) -> list[str]:
+    """
+    List the font files offline mode needs but can't find.
+
+    Args:
+        fonts_dir: Directory expected to contain the .woff2 files.
+
+    Returns:
+        Missing file names (empty if every font is bundled).
+    """
+    return [name for name in BUNDLED_FONTS if not (Path(fonts_dir) / name).is_file()]
+
+
+@lru_cache(maxsize=None)
+def get_font_face_css(fonts_dir: Path = FONTS_DIR) -> str:
+    """
+    Build @font-face rules embedding the bundled fonts as data URIs.
+
+    Files must be named `<Family>-<weight>[-italic].woff2`, for example
+    `CormorantGaramond-400-italic.woff2`. Unknown or malformed names are
+    ignored; a missing file falls back to the CSS font stacks (the server
+    refuses to start in offline mode while `missing_fonts()` isn't empty).
+
+    Args:
+        fonts_dir: Directory containing the .woff2 files.
+
+    Returns:
+        CSS string (empty if no font is bundled).
+    """
+    rules = []
+
+    for font_file in sorted(Path(fonts_dir).glob("*.woff2")):
+        parts = font_file.stem.split("-")
+        family = FONT_FAMILIES.get(parts[0])
+
+        if family is None or len(parts) < 2 or not parts[1].isdigit():
+            continue
+
+        style = "italic" if "italic" in parts[2:] else "normal"
+        data = base64.b64encode(font_file.read_bytes()).decode("ascii")
+
+        rules.append(
+            "@font-face {\n"
+            f"    font-family: '{family}';\n"
+            f"    font-style: {style};\n"
+            f"    font-weight: {parts[1]};\n"
+            "    font-display: block;\n"
+            f"    src: url(data:font/woff2;base64,{data}) format('woff2');\n"
+            "}\n"
+        )
+
+    return "\n".join(rules)
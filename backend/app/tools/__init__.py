@@ -0,0 +1 @@
+"""Developer tools: benchmark harness and fake LLM server."""
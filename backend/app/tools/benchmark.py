@@ -0,0 +1,358 @@
+"""
+Benchmark of the conversion pipeline against a fake LLM server.
+
+Generates synthetic PDF/DOCX documents, converts them through the full
+ConversionService.convert path with a local deterministic
+OpenAI-compatible server standing in for the provider, and reports
+per-stage timings, memory and throughput at several concurrency levels.
+
+Run from the backend directory:
+
+    python -m app.tools.benchmark --pages 20 --documents 8 --concurrency 1,4,8 \\
+        --llm-latency-ms 200 --json results.json --baseline previous.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+from ..metrics import STAGE_SECONDS
+from ..models import LLMConfig, LLMProvider, OutputFormat
+from ..services.converter import conversion_service
+from ..services.llm_service import llm_service
+from ..services.pdf_generator import pdf_generator
+from .fake_llm import FakeLLMServer, MockOptions, create_app
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ("extract", "chunk", "analyze", "html", "pdf")
+
+# Vocabulary of the synthetic documents
+WORDS = (
+    "analyse budget projet équipe résultat objectif client marché stratégie "
+    "croissance risque contrôle données rapport synthèse recommandation phase "
+    "livrable planning ressource qualité performance indicateur audit conformité "
+    "processus organisation pilotage gouvernance investissement coût délai "
+    "périmètre partenaire fournisseur contrat service production innovation "
+    "développement évaluation suivi décision priorité action mesure impact"
+).split()
+
+WORDS_PER_PAGE = 350
+
+
+@dataclass
+class BenchmarkOptions:
+    """Parameters of a benchmark run."""
+    pages: int = 10
+    documents: int = 8
+    concurrency: list[int] = field(default_factory=lambda: [1, 4])
+    kind: str = "pdf"  # pdf, docx or both
+    output_format: str = "html"
+    llm_latency_ms: float = 100
+    chunk_tokens: Optional[int] = None
+    cache: bool = False
+    trace_memory: bool = False
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_pages(pages: int, seed: int) -> list[tuple[str, list[str]]]:
+    """
+    Generate the content of a synthetic document.
+
+    Returns:
+        One (heading, paragraphs) pair per page, about WORDS_PER_PAGE words each.
+    """
+    rng = random.Random(seed)
+    content = []
+
+    for number in range(1, pages + 1):
+        heading = f"{number}. {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}"
+        paragraphs = []
+        words = 0
+        while words < WORDS_PER_PAGE:
+            paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+            paragraphs.append(paragraph)
+            words += len(paragraph.split())
+        content.append((heading, paragraphs))
+
+    return content
+
+
+def make_pdf(pages: int, seed: int) -> bytes:
+    """Build a synthetic PDF of `pages` pages."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for heading, paragraphs in synthetic_pages(pages, seed):
+        page = doc.new_page()
+        text = heading + "\n\n" + "\n\n".join(paragraphs)
+        page.insert_textbox(fitz.Rect(50, 50, 545, 800), text, fontsize=9, fontname="helv")
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def make_docx(pages: int, seed: int) -> bytes:
+    """Build a synthetic DOCX with as much text as `pages` pages."""
+    from docx import Document
+
+    doc = Document()
+    for heading, paragraphs in synthetic_pages(pages, seed):
+        doc.add_heading(heading, level=1)
+        for paragraph in paragraphs:
+            doc.add_paragraph(paragraph)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_level(
+    files: list[tuple[str, bytes]],
+    concurrency: int,
+    llm_config: LLMConfig,
+    options: BenchmarkOptions,
+) -> dict:
+    """Convert a set of documents with `concurrency` conversions at a time."""
+    output_format = OutputFormat(options.output_format)
+    before = {stage: (STAGE_SECONDS.sum(stage=stage), STAGE_SECONDS.count(stage=stage)) for stage in STAGES}
+    if options.trace_memory:
+        tracemalloc.reset_peak()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    async def convert(filename: str, content: bytes) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            result = await conversion_service.convert(
+                file_content=content,
+                filename=filename,
+                llm_config=llm_config,
+                output_format=output_format,
+            )
+            latencies.append(time.perf_counter() - started)
+            if not result.success:
+                errors.append(result.error or "")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(convert(name, content) for name, content in files))
+    wall = time.perf_counter() - started
+
+    stages = {}
+    for stage in STAGES:
+        total = STAGE_SECONDS.sum(stage=stage) - before[stage][0]
+        count = STAGE_SECONDS.count(stage=stage) - before[stage][1]
+        if count:
+            stages[stage] = {
+                "count": count,
+                "total_seconds": round(total, 4),
+                "mean_ms": round(total / count * 1000, 2),
+            }
+
+    level = {
+        "concurrency": concurrency,
+        "documents": len(files),
+        "pages": options.pages * len(files),
+        "errors": len(errors),
+        "wall_seconds": round(wall, 4),
+        "documents_per_second": round(len(files) / wall, 3),
+        "pages_per_second": round(options.pages * len(files) / wall, 2),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.5) * 1000, 2),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+            "max": round(max(latencies, default=0) * 1000, 2),
+        },
+        "stages": stages,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if options.trace_memory:
+        level["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+    if errors:
+        level["first_error"] = errors[0]
+    return level
+
+
+async def run_benchmark(options: BenchmarkOptions, base_url: str) -> dict:
+    """
+    Run every concurrency level against the LLM server at `base_url`.
+
+    Each conversion gets a different document, so neither the analysis
+    cache nor request coalescing hides the work (unless `cache` is set).
+
+    Returns:
+        JSON-serializable report.
+    """
+    llm_config = LLMConfig(
+        provider=LLMProvider.CUSTOM, api_key="none", model="fake-model", base_url=base_url
+    )
+    saved = (llm_service.cache, conversion_service.chunking_threshold)
+    if not options.cache:
+        llm_service.cache = None
+    if options.chunk_tokens:
+        conversion_service.chunking_threshold = options.chunk_tokens
+    if options.trace_memory:
+        tracemalloc.start()
+
+    makers = {"pdf": make_pdf, "docx": make_docx}
+    kinds = ["pdf", "docx"] if options.kind == "both" else [options.kind]
+    seed = 0
+    levels = []
+
+    try:
+        for concurrency in options.concurrency:
+            files = []
+            for i in range(options.documents):
+                kind = kinds[i % len(kinds)]
+                files.append((f"bench_{seed}.{kind}", makers[kind](options.pages, seed)))
+                seed += 1
+            levels.append(await run_level(files, concurrency, llm_config, options))
+    finally:
+        llm_service.cache, conversion_service.chunking_threshold = saved
+        if options.trace_memory:
+            tracemalloc.stop()
+        await llm_service.shutdown()
+        # Browsers and the Playwright driver of a --format pdf run
+        await pdf_generator.shutdown()
+        conversion_service.shutdown()
+
+    return {
+        "version": 1,
+        "options": asdict(options),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "levels": levels,
+    }
+
+
+def compare(report: dict, baseline: dict) -> list[str]:
+    """Describe the change of throughput and latency against a previous report."""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    lines = []
+
+    for level in report["levels"]:
+        old = previous.get(level["concurrency"])
+        if old is None:
+            continue
+
+        def change(new: float, before: float) -> str:
+            return f"{(new - before) / before * 100:+.1f}%" if before else "n/a"
+
+        lines.append(
+            f"concurrency {level['concurrency']}: "
+            f"throughput {change(level['documents_per_second'], old['documents_per_second'])}, "
+            f"p50 {change(level['latency_ms']['p50'], old['latency_ms']['p50'])}, "
+            f"p95 {change(level['latency_ms']['p95'], old['latency_ms']['p95'])}"
+        )
+
+    return lines
+
+
+def format_report(report: dict) -> str:
+    """Render a report as a text table."""
+    lines = [
+        f"{'conc':>4} {'docs':>5} {'docs/s':>8} {'pages/s':>8} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'errors':>6} {'rss MB':>8}  stage means (ms)"
+    ]
+    for level in report["levels"]:
+        stages = " ".join(f"{name}={stage['mean_ms']}" for name, stage in level["stages"].items())
+        rss = level["peak_rss_mb"]
+        lines.append(
+            f"{level['concurrency']:>4} {level['documents']:>5} "
+            f"{level['documents_per_second']:>8.2f} {level['pages_per_second']:>8.1f} "
+            f"{level['latency_ms']['p50']:>9.1f} {level['latency_ms']['p95']:>9.1f} "
+            f"{level['errors']:>6} {rss if rss is None else round(rss, 1):>8}  {stages}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> tuple[BenchmarkOptions, argparse.Namespace]:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the AutoDoc conversion pipeline.")
+    parser.add_argument("--pages", type=int, default=10, help="pages per document")
+    parser.add_argument("--documents", type=int, default=8, help="documents per concurrency level")
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated concurrency levels")
+    parser.add_argument("--kind", choices=["pdf", "docx", "both"], default="pdf")
+    parser.add_argument("--format", choices=["html", "pdf"], default="html", help="output format")
+    parser.add_argument("--llm-latency-ms", type=float, default=100, help="fake LLM answer delay")
+    parser.add_argument("--chunk-tokens", type=int, help="override the chunking threshold")
+    parser.add_argument("--cache", action="store_true", help="keep the analysis cache enabled")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report the Python allocation peak (slows the run)")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare with a previous JSON report")
+    args = parser.parse_args(argv)
+
+    options = BenchmarkOptions(
+        pages=args.pages,
+        documents=args.documents,
+        concurrency=[int(level) for level in args.concurrency.split(",")],
+        kind=args.kind,
+        output_format=args.format,
+        llm_latency_ms=args.llm_latency_ms,
+        chunk_tokens=args.chunk_tokens,
+        cache=args.cache,
+        trace_memory=args.trace_memory,
+    )
+    return options, args
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    """Run the benchmark from the command line and return the report."""
+    options, args = parse_args(argv)
+
+    with FakeLLMServer(create_app(MockOptions(latency_ms=options.llm_latency_ms))) as server:
+        report = asyncio.run(run_benchmark(options, server.base_url))
+
+    print(format_report(report))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            for line in compare(report, json.load(f)):
+                print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
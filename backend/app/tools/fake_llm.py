@@ -0,0 +1,447 @@
+"""
+Mock OpenAI-compatible LLM server, for benchmarks and load tests.
+
+Answers chat completions with a valid DocumentStructure derived from the
+document text (headings, lists, tables and paragraphs found by simple
+heuristics), so AutoDoc can run end to end without a provider. Latency,
+errors, 429 responses (random or from a requests-per-minute budget),
+truncated answers and streaming are configurable, to exercise the rate
+limiter and the retry and repair paths offline.
+
+Run stand-alone from the backend directory, then use it as the `custom`
+provider with base_url http://127.0.0.1:8001:
+
+    python -m app.tools.fake_llm --port 8001 --latency-ms 800 \\
+        --latency-distribution lognormal --error-rate 0.02 --rpm 120
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from ..services.json_stream import repair_json
+from ..services.llm_service import CONTINUE_PROMPT, FIX_PROMPT
+
+# Document text sits between these markers in the analysis prompt
+_DOCUMENT_PATTERN = re.compile(r"---\n(.*)\n---", re.DOTALL)
+
+# Lines added by the extractors and the chunker, not part of the content
+_IGNORED_LINE = re.compile(r"^(--- Page \d+ ---|\[Suite du document\]|\[Section en cours : .*\])$")
+
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+)$")
+_NUMBERED_HEADING = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+\S")
+_LIST_ITEM = re.compile(r"^(?:[-•*▪–]|\d+[.)])\s+(.+)$")
+_TABLE_SEPARATOR = re.compile(r"^\|?[\s:|-]+\|?$")
+
+# Blocks per section of a text without headings
+PARAGRAPHS_PER_SECTION = 4
+
+# Longest line still taken for a heading
+HEADING_MAX_WORDS = 10
+
+# HTTP statuses of injected server errors
+ERROR_STATUSES = (500, 502, 503)
+
+
+@dataclass
+class MockOptions:
+    """Behaviour of the mock server."""
+    latency_ms: float = 0  # Median delay before answering
+    latency_distribution: str = "fixed"  # fixed, uniform or lognormal
+    latency_spread: float = 0.5  # uniform: ±fraction of the median; lognormal: sigma
+    error_rate: float = 0  # Share of requests answered with a 5xx
+    rate_limit_rate: float = 0  # Share of requests answered with a 429
+    requests_per_minute: int = 0  # Budget over which requests get 429 (0 = none)
+    retry_after_seconds: float = 1
+    truncate_rate: float = 0  # Share of answers cut in the middle of the JSON
+    stream_chunk_chars: int = 40  # Characters per streamed delta
+    stream_interval_ms: float = 0  # Delay between streamed deltas
+    seed: Optional[int] = None
+
+
+def _is_heading(line: str) -> bool:
+    """Whether a line looks like a heading."""
+    if _MARKDOWN_HEADING.match(line):
+        return True
+    words = line.split()
+    if len(words) > HEADING_MAX_WORDS or line.endswith((".", ":", ";", ",")):
+        return False
+    return bool(_NUMBERED_HEADING.match(line)) or (line.isupper() and len(words) > 1)
+
+
+def _heading_text(line: str) -> str:
+    match = _MARKDOWN_HEADING.match(line)
+    return match.group(1).strip() if match else line
+
+
+def _table_block(rows: list[str]) -> dict:
+    """Build a table block from markdown table lines."""
+    cells = [
+        [cell.strip() for cell in row.strip().strip("|").split("|")]
+        for row in rows if not _TABLE_SEPARATOR.match(row.strip())
+    ]
+    headers = cells[0] if cells else []
+    return {"type": "table", "headers": headers, "rows": cells[1:]}
+
+
+def build_document(text: str) -> dict:
+    """
+    Build a valid DocumentStructure dict from a text, deterministically.
+
+    The first line is the title. Headings (markdown, numbered or upper
+    case) start sections; list items, markdown tables and paragraphs
+    become the matching blocks. A text without headings is split every
+    PARAGRAPHS_PER_SECTION blocks.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    lines = [line for line in lines if not _IGNORED_LINE.match(line)]
+    first = next((i for i, line in enumerate(lines) if line), None)
+    title = _heading_text(lines[first])[:80] if first is not None else "Document"
+
+    sections: list[tuple[Optional[str], list[dict]]] = [(None, [])]
+    paragraph: list[str] = []
+    items: list[str] = []
+    table: list[str] = []
+
+    def flush() -> None:
+        content = sections[-1][1]
+        if paragraph:
+            content.append({"type": "paragraph", "text": " ".join(paragraph)})
+            paragraph.clear()
+        if items:
+            content.append({"type": "list", "style": "bullet", "items": [{"text": i} for i in items]})
+            items.clear()
+        if table:
+            content.append(_table_block(table))
+            table.clear()
+
+    for line in lines[first + 1:] if first is not None else []:
+        if not line:
+            flush()
+        elif line.startswith("|") and line.endswith("|"):
+            if not table:
+                flush()
+            table.append(line)
+        elif _is_heading(line):
+            flush()
+            sections.append((_heading_text(line)[:80], []))
+        elif match := _LIST_ITEM.match(line):
+            if paragraph or table:
+                flush()
+            items.append(match.group(1))
+        else:
+            if items or table:
+                flush()
+            paragraph.append(line)
+    flush()
+
+    if len(sections) == 1:
+        # No headings: fixed-size parts
+        blocks = sections[0][1]
+        sections = [
+            (f"Partie {n + 1}", blocks[i:i + PARAGRAPHS_PER_SECTION])
+            for n, i in enumerate(range(0, len(blocks), PARAGRAPHS_PER_SECTION))
+        ] or [("Introduction", [])]
+    elif not sections[0][1]:
+        sections.pop(0)
+
+    return {
+        "metadata": {"title": title},
+        "toc": True,
+        "sections": [
+            {"type": "section", "title": name or "Introduction", "content": content}
+            for name, content in sections
+        ],
+        "sources": [],
+    }
+
+
+def document_text(messages: list[dict]) -> str:
+    """Get the document text out of the chat messages of an analysis request."""
+    content = next(
+        (str(m.get("content", "")) for m in messages if m.get("role") == "user"), ""
+    )
+    match = _DOCUMENT_PATTERN.search(content)
+    return match.group(1) if match else content
+
+
+class MockLLM:
+    """State of the mock server: random source, request budget and counters."""
+
+    def __init__(self, options: MockOptions):
+        self.options = options
+        self.random = random.Random(options.seed)
+        self.stats = {
+            "requests": 0, "completions": 0, "streamed": 0, "errors": 0,
+            "rate_limited": 0, "truncated": 0, "continuations": 0, "fixes": 0,
+        }
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+
+    def latency(self) -> float:
+        """Draw the delay of one answer, in seconds."""
+        median = self.options.latency_ms / 1000
+        spread = self.options.latency_spread
+        if median <= 0:
+            return 0.0
+        if self.options.latency_distribution == "uniform":
+            return max(0.0, self.random.uniform(median * (1 - spread), median * (1 + spread)))
+        if self.options.latency_distribution == "lognormal":
+            return self.random.lognormvariate(math.log(median), spread)
+        return median
+
+    def rate_limit(self) -> Optional[JSONResponse]:
+        """Return a 429 response if this request is over the budget or drawn as limited."""
+        options = self.options
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start, self._window_requests = now, 0
+
+        limited = options.rate_limit_rate > 0 and self.random.random() < options.rate_limit_rate
+        retry_after = options.retry_after_seconds
+        remaining = None
+
+        if options.requests_per_minute > 0:
+            remaining = options.requests_per_minute - self._window_requests
+            if remaining <= 0:
+                limited = True
+                retry_after = max(retry_after, 60 - (now - self._window_start))
+
+        if not limited:
+            self._window_requests += 1
+            return None
+
+        self.stats["rate_limited"] += 1
+        headers = {"retry-after": f"{retry_after:.0f}" if retry_after >= 1 else f"{retry_after:.3f}"}
+        if options.requests_per_minute > 0:
+            headers.update({
+                "x-ratelimit-limit-requests": str(options.requests_per_minute),
+                "x-ratelimit-remaining-requests": str(max(0, remaining or 0)),
+                "x-ratelimit-reset-requests": f"{60 - (now - self._window_start):.3f}s",
+            })
+        return JSONResponse(
+            status_code=429,
+            headers=headers,
+            content={"error": {"type": "rate_limit_exceeded", "message": "Rate limit reached"}},
+        )
+
+    def completion(self, messages: list[dict]) -> str:
+        """Answer an analysis, a continuation or a fix request."""
+        system = next((str(m.get("content", "")) for m in messages if m.get("role") == "system"), "")
+        last = messages[-1] if messages else {}
+
+        if system == FIX_PROMPT:
+            self.stats["fixes"] += 1
+            broken = str(last.get("content", "")).split("JSON à corriger :\n", 1)[-1]
+            return repair_json(broken)[0]
+
+        full = json.dumps(build_document(document_text(messages)), ensure_ascii=False)
+
+        if last.get("role") == "user" and last.get("content") == CONTINUE_PROMPT and len(messages) >= 2:
+            self.stats["continuations"] += 1
+            partial = str(messages[-2].get("content", ""))
+            return full[len(partial):] if full.startswith(partial) else full
+
+        if self.options.truncate_rate > 0 and self.random.random() < self.options.truncate_rate:
+            self.stats["truncated"] += 1
+            return full[:len(full) // 2]
+        return full
+
+
+def create_app(options: Optional[MockOptions] = None) -> FastAPI:
+    """
+    Create the mock server.
+
+    Args:
+        options: Latency, error and streaming behaviour (defaults: none).
+    """
+    mock = MockLLM(options or MockOptions())
+    app = FastAPI(title="AutoDoc mock LLM")
+    app.state.mock = mock
+
+    @app.get("/stats")
+    async def stats():
+        """Counters of the requests served so far."""
+        return mock.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        mock.stats["requests"] += 1
+
+        limited = mock.rate_limit()
+        if limited is not None:
+            return limited
+
+        await asyncio.sleep(mock.latency())
+
+        if mock.options.error_rate > 0 and mock.random.random() < mock.options.error_rate:
+            mock.stats["errors"] += 1
+            return JSONResponse(
+                status_code=mock.random.choice(ERROR_STATUSES),
+                content={"error": {"type": "server_error", "message": "Injected failure"}},
+            )
+
+        messages = body.get("messages", [])
+        content = mock.completion(messages)
+        model = body.get("model", "mock")
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", ""))) for m in messages) // 4,
+            "completion_tokens": len(content) // 4,
+        }
+
+        if body.get("stream"):
+            mock.stats["streamed"] += 1
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(
+                _stream(content, model, usage if include_usage else None, mock.options),
+                media_type="text/event-stream",
+            )
+
+        mock.stats["completions"] += 1
+        return JSONResponse({
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    return app
+
+
+async def _stream(content: str, model: str, usage: Optional[dict], options: MockOptions):
+    """Yield a completion as OpenAI server-sent events."""
+    size = max(1, options.stream_chunk_chars)
+
+    def event(delta: dict, finish_reason: Optional[str] = None) -> str:
+        chunk = {
+            "id": "mock-completion",
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+    yield event({"role": "assistant"})
+    for start in range(0, len(content), size):
+        if options.stream_interval_ms > 0:
+            await asyncio.sleep(options.stream_interval_ms / 1000)
+        yield event({"content": content[start:start + size]})
+    yield event({}, "stop")
+
+    if usage is not None:
+        yield f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+class FakeLLMServer:
+    """
+    Run a mock server on a local port, in a background thread.
+
+    Its own thread and event loop keep the server's work out of the
+    measured process loop. Usable as a context manager.
+    """
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 0):
+        self.app = app
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to use as a custom provider."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> None:
+        """Start serving and wait until the port accepts connections."""
+        import uvicorn
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+
+        config = uvicorn.Config(self.app, log_level="warning", access_log=False)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(
+            target=self._server.run, kwargs={"sockets": [sock]}, daemon=True
+        )
+        self._thread.start()
+
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Fake LLM server failed to start")
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        """Stop the server and wait for its thread."""
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def __enter__(self) -> "FakeLLMServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the mock server from the command line."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server for AutoDoc.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0, help="median answer delay")
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="uniform: ±fraction of the median; lognormal: sigma")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of 5xx answers")
+    parser.add_argument("--rate-limit-rate", type=float, default=0, help="share of random 429 answers")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429 (0 = no limit)")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After of random 429s, in seconds")
+    parser.add_argument("--truncate-rate", type=float, default=0, help="share of answers cut mid-JSON")
+    parser.add_argument("--stream-chunk-chars", type=int, default=40)
+    parser.add_argument("--stream-interval-ms", type=float, default=0)
+    parser.add_argument("--seed", type=int, help="seed of the random draws")
+    args = parser.parse_args(argv)
+
+    options = MockOptions(
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        requests_per_minute=args.rpm,
+        retry_after_seconds=args.retry_after,
+        truncate_rate=args.truncate_rate,
+        stream_chunk_chars=args.stream_chunk_chars,
+        stream_interval_ms=args.stream_interval_ms,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(options), host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
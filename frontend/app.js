@@ -32,7 +32,7 @@ const MODEL_OPTIONS = {
 // State
 let selectedFile = null;
 let convertedHtml = null;
-let convertedPdfBase64 = null;
+let convertedPdf = null;
 let outputFilename = null;
 let currentFormat = 'html';
 
@@ -230,7 +230,7 @@ function removeFile() {
     elements.dropzone.style.display = 'block';
     elements.resultSection.style.display = 'none';
     convertedHtml = null;
-    convertedPdfBase64 = null;
+    convertedPdf = null;
     outputFilename = null;
     currentFormat = 'html';
     updateConvertButton();
@@ -291,19 +291,41 @@ async function handleConvert() {
         formData.append('llm_config', JSON.stringify(llmConfig));
         formData.append('output_format', outputFormat);
 
-        const response = await fetch(`${API_URL}/convert`, {
+        // Queue the conversion, then follow its progress
+        const response = await fetch(`${API_URL}/jobs`, {
             method: 'POST',
             body: formData,
         });
 
-        const result = await response.json();
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            showStatus('error', error.detail || 'Erreur lors de la conversion.');
+            return;
+        }
+
+        const job = await response.json();
+        await followJobProgress(job.id);
+
+        const resultResponse = await fetch(`${API_URL}/jobs/${job.id}/result`);
+        const result = await resultResponse.json();
 
         if (result.success) {
-            convertedHtml = result.html;
-            convertedPdfBase64 = result.pdf_base64;
             outputFilename = result.filename;
             currentFormat = result.format || 'html';
 
+            // Fetch the output as binary (large outputs aren't inlined)
+            if (currentFormat === 'pdf') {
+                const fileResponse = await fetchResultFile(result.result_url);
+                if (!fileResponse) return;
+                convertedPdf = await fileResponse.blob();
+            } else if (result.html) {
+                convertedHtml = result.html;
+            } else {
+                const fileResponse = await fetchResultFile(result.result_url);
+                if (!fileResponse) return;
+                convertedHtml = await fileResponse.text();
+            }
+
             // Update download button text
             elements.downloadBtn.innerHTML = currentFormat === 'pdf'
                 ? `<svg viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
@@ -335,6 +357,69 @@ async function handleConvert() {
     }
 }
 
+/**
+ * Download a finished output.
+ * Returns null after showing the server's error if the download failed.
+ */
+async function fetchResultFile(resultUrl) {
+    const response = await fetch(`${API_URL}${resultUrl}`);
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        showStatus('error', error.detail || 'Résultat introuvable. Relancez la conversion.');
+        return null;
+    }
+    return response;
+}
+
+// Progress messages per server-sent event
+const PROGRESS_MESSAGES = {
+    extracting: () => 'Extraction du texte...',
+    extracted: (d) => d.pages
+        ? `Texte extrait (${d.pages} pages). Analyse en cours...`
+        : 'Texte extrait. Analyse en cours...',
+    analyzing: (d) => `Analyse du document (${d.chunks_total} partie${d.chunks_total > 1 ? 's' : ''})...`,
+    section_ready: (d) => `Section analysée : ${d.title}`,
+    chunk_analyzed: (d) => `Analyse : partie ${d.chunks_done}/${d.chunks_total} terminée`,
+    generating: () => 'Génération du HTML...',
+    generated: (d) => `HTML généré (${formatFileSize(d.html_bytes)})`,
+    rendering: () => 'Génération du PDF...',
+    rendered: (d) => `PDF généré (${formatFileSize(d.pdf_bytes)})`,
+};
+
+/**
+ * Follow a job's server-sent events until it finishes.
+ * Resolves on completion or failure (the result endpoint has the details).
+ */
+function followJobProgress(jobId) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`${API_URL}/jobs/${jobId}/events`);
+
+        Object.entries(PROGRESS_MESSAGES).forEach(([event, message]) => {
+            source.addEventListener(event, (e) => {
+                showStatus('info', message(JSON.parse(e.data)));
+            });
+        });
+
+        const finish = () => {
+            source.close();
+            resolve();
+        };
+
+        source.addEventListener('status', (e) => {
+            const job = JSON.parse(e.data);
+            if (job.status === 'completed' || job.status === 'failed') finish();
+        });
+        source.addEventListener('completed', finish);
+        source.addEventListener('failed', finish);
+
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                reject(new Error('Progress stream closed'));
+            }
+        };
+    });
+}
+
 function setLoading(loading) {
     elements.convertBtn.disabled = loading;
     elements.btnText.style.display = loading ? 'none' : 'inline';
@@ -354,16 +439,9 @@ function hideStatus() {
 
 // Result actions
 function downloadResult() {
-    if (currentFormat === 'pdf' && convertedPdfBase64) {
-        // Download PDF from base64
-        const byteCharacters = atob(convertedPdfBase64);
-        const byteNumbers = new Array(byteCharacters.length);
-        for (let i = 0; i < byteCharacters.length; i++) {
-            byteNumbers[i] = byteCharacters.charCodeAt(i);
-        }
-        const byteArray = new Uint8Array(byteNumbers);
-        const blob = new Blob([byteArray], { type: 'application/pdf' });
-        const url = URL.createObjectURL(blob);
+    if (currentFormat === 'pdf' && convertedPdf) {
+        // Download PDF fetched as binary
+        const url = URL.createObjectURL(convertedPdf);
         const a = document.createElement('a');
         a.href = url;
         a.download = outputFilename || 'document.pdf';
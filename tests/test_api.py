@@ -0,0 +1,450 @@
+"""Tests for the FastAPI endpoints."""
+
+import json
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+
+LLM_CONFIG = json.dumps({"provider": "openai", "api_key": "sk-test"})
+
+
+class TestUploads:
+    """Tests for upload validation and spooling."""
+
+    def test_upload_spooled_to_disk_and_removed(self):
+        """Test that /convert gets a temporary path, deleted afterwards."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.models import ConversionResponse
+
+        seen = {}
+
+        async def fake_convert(file_content, filename, llm_config, output_format=None, progress=None):
+            seen["path"] = file_content
+            seen["content"] = file_content.read_bytes()
+            return ConversionResponse(success=True, html="<html></html>", filename="doc_converted.html")
+
+        with patch("backend.app.main.conversion_service.convert", side_effect=fake_convert):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert",
+                    files={"file": ("doc.pdf", b"%PDF-1.4 content", "application/pdf")},
+                    data={"llm_config": LLM_CONFIG},
+                )
+
+        assert response.status_code == 200
+        assert isinstance(seen["path"], Path)
+        assert seen["path"].suffix == ".pdf"
+        assert seen["content"] == b"%PDF-1.4 content"
+        assert not seen["path"].exists()
+
+    def test_pdf_rendering_failure_is_server_error(self):
+        """Test that a failed PDF rendering on /convert answers 500, not a 200 error body."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.models import ConversionResponse
+
+        failed = ConversionResponse(
+            success=False, error="Erreur lors de la génération du PDF: crash", error_stage="pdf"
+        )
+        with patch("backend.app.main.conversion_service.convert", return_value=failed):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert",
+                    files={"file": ("doc.pdf", b"%PDF-1.4", "application/pdf")},
+                    data={"llm_config": LLM_CONFIG, "output_format": "pdf"},
+                )
+
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Erreur lors de la génération du PDF: crash"
+
+    def test_large_pdf_returned_by_reference(self):
+        """Test that /convert links to a large PDF instead of inlining it as base64."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.config import settings
+        from backend.app.models import ConversionResponse
+
+        pdf = b"%PDF-1.4 " + b"x" * 4096
+        converted = ConversionResponse(success=True, pdf=pdf, filename="doc_converted.pdf", format="pdf")
+
+        with patch("backend.app.main.conversion_service.convert", return_value=converted), \
+                patch.object(settings, "job_inline_result_max_kb", 1):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert",
+                    files={"file": ("doc.pdf", b"%PDF-1.4", "application/pdf")},
+                    data={"llm_config": LLM_CONFIG, "output_format": "pdf"},
+                )
+                result = response.json()
+                download = client.get(result["result_url"])
+
+        assert response.status_code == 200
+        assert result["pdf_base64"] is None
+        assert download.status_code == 200
+        assert download.content == pdf
+
+    @pytest.mark.asyncio
+    async def test_download_name_outside_latin1(self):
+        """Test that a file named with characters outside latin-1 downloads."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.models import ConversionResponse
+        from backend.app.services.jobs import job_manager
+
+        job = await job_manager.keep_result(ConversionResponse(
+            success=True, pdf=b"%PDF-1.4", filename="Rapport d’audit_converted.pdf", format="pdf"
+        ))
+
+        with TestClient(app) as client:
+            response = client.get(f"/jobs/{job.id}/file")
+
+        assert response.status_code == 200
+        assert response.headers["content-disposition"] == (
+            'attachment; filename="Rapport d_audit_converted.pdf"; '
+            "filename*=UTF-8''Rapport%20d%E2%80%99audit_converted.pdf"
+        )
+
+    def test_oversized_upload_rejected_while_streaming(self):
+        """Test that a file over the limit is rejected and not spooled."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app, settings
+
+        with patch.object(settings, "max_file_size_mb", 1), \
+                patch("backend.app.main.UPLOAD_FORM_OVERHEAD_BYTES", 10 * 1024 * 1024), \
+                patch("backend.app.main.conversion_service.convert") as convert:
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert",
+                    files={"file": ("doc.pdf", b"x" * (2 * 1024 * 1024), "application/pdf")},
+                    data={"llm_config": LLM_CONFIG},
+                )
+
+        assert response.status_code == 400
+        assert "trop volumineux" in response.json()["detail"]
+        convert.assert_not_called()
+
+    def test_oversized_content_length_rejected_early(self):
+        """Test that a declared Content-Length over the limit is refused."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app, settings
+
+        with patch.object(settings, "max_file_size_mb", 1):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert",
+                    files={"file": ("doc.pdf", b"x" * (2 * 1024 * 1024), "application/pdf")},
+                    data={"llm_config": LLM_CONFIG},
+                )
+
+        assert response.status_code == 400
+        assert "trop volumineux" in response.json()["detail"]
+
+    def test_unsupported_extension(self):
+        """Test that unsupported file types are rejected."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+
+        with TestClient(app) as client:
+            response = client.post(
+                "/convert",
+                files={"file": ("notes.txt", b"text", "text/plain")},
+                data={"llm_config": LLM_CONFIG},
+            )
+
+        assert response.status_code == 400
+        assert "non supporté" in response.json()["detail"]
+
+
+class TestDownload:
+    """Tests for /convert/download."""
+
+    def test_download_streams_html(self):
+        """Test that the generated page is streamed as an attachment."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.models import DocumentStructure
+
+        doc = DocumentStructure.model_validate({
+            "metadata": {"title": "Rapport"},
+            "sections": [{"title": "Un", "content": [{"type": "paragraph", "text": "Texte"}]}],
+        })
+
+        with patch("backend.app.main.conversion_service.analyze", return_value=doc):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert/download",
+                    files={"file": ("rapport.pdf", b"%PDF-1.4", "application/pdf")},
+                    data={"llm_config": LLM_CONFIG},
+                )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/html; charset=utf-8"
+        assert "rapport_converted.html" in response.headers["content-disposition"]
+        assert "<p>Texte</p>" in response.text
+        assert response.text.rstrip().endswith("</html>")
+
+    def test_download_name_outside_latin1(self):
+        """Test that the streamed page downloads under a name outside latin-1."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.models import DocumentStructure
+
+        doc = DocumentStructure.model_validate({"metadata": {"title": "Cœur"}, "sections": []})
+
+        with patch("backend.app.main.conversion_service.analyze", return_value=doc):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert/download",
+                    files={"file": ("Cœur.docx", b"PK", "application/octet-stream")},
+                    data={"llm_config": LLM_CONFIG},
+                )
+
+        assert response.status_code == 200
+        assert "filename*=UTF-8''C%C5%93ur_converted.html" in response.headers["content-disposition"]
+
+    def test_download_error(self):
+        """Test that a failed analysis returns its message."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.services.converter import ConversionError
+
+        error = ConversionError("Le document ne contient pas de texte extractible.")
+        with patch("backend.app.main.conversion_service.analyze", side_effect=error):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert/download",
+                    files={"file": ("rapport.pdf", b"%PDF-1.4", "application/pdf")},
+                    data={"llm_config": LLM_CONFIG},
+                )
+
+        assert response.status_code == 500
+        assert response.json()["detail"] == "Le document ne contient pas de texte extractible."
+
+
+class TestResponses:
+    """Tests for content negotiation helpers."""
+
+    def test_negotiate_encoding(self):
+        """Test Accept-Encoding parsing with quality values."""
+        from backend.app.responses import negotiate_encoding
+
+        assert negotiate_encoding("gzip, deflate") == "gzip"
+        assert negotiate_encoding("deflate;q=1, gzip;q=0.5") == "gzip"
+        assert negotiate_encoding("gzip;q=0") is None
+        assert negotiate_encoding("identity") is None
+        assert negotiate_encoding(None) is None
+        assert negotiate_encoding("*") is not None
+
+    def test_streamed_download_compressed(self):
+        """Test that the streamed HTML download is gzip-compressed on the fly."""
+        import gzip
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.models import DocumentStructure
+
+        doc = DocumentStructure.model_validate({
+            "metadata": {"title": "Rapport"},
+            "sections": [{"title": "Un", "content": [{"type": "paragraph", "text": "Texte"}]}],
+        })
+
+        with patch("backend.app.main.conversion_service.analyze", return_value=doc):
+            with TestClient(app) as client:
+                with client.stream(
+                    "POST", "/convert/download",
+                    files={"file": ("rapport.pdf", b"%PDF-1.4", "application/pdf")},
+                    data={"llm_config": LLM_CONFIG},
+                    headers={"Accept-Encoding": "gzip"},
+                ) as response:
+                    raw = b"".join(response.iter_raw())
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "<p>Texte</p>" in gzip.decompress(raw).decode("utf-8")
+
+
+class TestMetrics:
+    """Tests for the Prometheus metrics."""
+
+    def test_registry_renders_text_format(self):
+        """Test counters, escaped labels and cumulative histogram buckets."""
+        from backend.app.metrics import MetricsRegistry
+
+        registry = MetricsRegistry(prefix="test_")
+        counter = registry.counter("calls_total", "Calls.", ("model",))
+        histogram = registry.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1))
+
+        counter.inc(model='gpt "4"')
+        counter.inc(2, model='gpt "4"')
+        histogram.observe(0.05, stage="extract")
+        histogram.observe(0.5, stage="extract")
+
+        text = registry.render()
+
+        assert "# TYPE test_calls_total counter" in text
+        assert 'test_calls_total{model="gpt \\"4\\""} 3' in text
+        assert 'test_latency_seconds_bucket{stage="extract",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{stage="extract",le="1"} 2' in text
+        assert 'test_latency_seconds_bucket{stage="extract",le="+Inf"} 2' in text
+        assert 'test_latency_seconds_count{stage="extract"} 2' in text
+        assert 'test_latency_seconds_sum{stage="extract"} 0.55' in text
+
+    def test_metrics_endpoint_reports_stages(self):
+        """Test that a conversion's stages show up on /metrics."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.models import DocumentStructure
+
+        doc = DocumentStructure.model_validate({"metadata": {"title": "Rapport"}, "sections": []})
+
+        with patch("backend.app.services.converter.ConversionService._extract_text", return_value="Texte"), \
+                patch("backend.app.services.converter.llm_service.analyze_document", return_value=doc):
+            with TestClient(app) as client:
+                converted = client.post(
+                    "/convert",
+                    files={"file": ("doc.pdf", b"%PDF-1.4 metrics", "application/pdf")},
+                    data={"llm_config": LLM_CONFIG},
+                )
+                response = client.get("/metrics")
+
+        assert converted.json()["success"] is True
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        for stage in ("extract", "chunk", "analyze", "html"):
+            assert f'autodoc_stage_duration_seconds_count{{stage="{stage}"}}' in response.text
+        assert 'autodoc_conversions_total{format="html",status="success"}' in response.text
+        assert "autodoc_conversions_in_progress 0" in response.text
+        assert "autodoc_jobs_queued 0" in response.text
+
+
+def _archive(entries: dict[str, bytes]) -> bytes:
+    """Build an in-memory zip archive."""
+    import io
+    import zipfile
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+async def _fake_batch_convert(file_content, filename, llm_config, output_format=None, progress=None):
+    """Conversion stub failing on documents named 'broken'."""
+    from backend.app.models import ConversionResponse
+
+    if filename.startswith("broken"):
+        return ConversionResponse(success=False, error="Erreur de validation: boom")
+    stem = filename.rsplit(".", 1)[0]
+    return ConversionResponse(
+        success=True,
+        html=f"<html>{file_content.read_text()}</html>",
+        filename=f"{stem}_converted.html",
+    )
+
+
+class TestBatch:
+    """Tests for /convert/batch."""
+
+    def test_batch_returns_zip_of_outputs(self):
+        """Test files and zip archives converted into one result archive."""
+        import io
+        import zipfile
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+
+        upload = _archive({
+            "dossier/a.pdf": b"A",
+            "autre/a.pdf": b"A2",
+            "notes.txt": b"ignored",
+            "__MACOSX/._a.pdf": b"junk",
+        })
+
+        with patch("backend.app.services.batch.conversion_service.convert", side_effect=_fake_batch_convert):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert/batch",
+                    files=[
+                        ("files", ("b.docx", b"B", "application/octet-stream")),
+                        ("files", ("broken.pdf", b"X", "application/pdf")),
+                        ("files", ("lot.zip", upload, "application/zip")),
+                    ],
+                    data={"llm_config": LLM_CONFIG},
+                )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert sorted(archive.namelist()) == [
+            "a_converted.html", "a_converted_2.html", "b_converted.html", "resultats.json",
+        ]
+        assert archive.read("b_converted.html") == b"<html>B</html>"
+
+        summary = json.loads(archive.read("resultats.json"))
+        assert [entry["source"] for entry in summary] == ["b.docx", "broken.pdf", "a.pdf", "a.pdf"]
+        assert summary[1] == {"source": "broken.pdf", "success": False, "error": "Erreur de validation: boom"}
+
+    @pytest.mark.asyncio
+    async def test_outputs_written_as_they_finish(self, tmp_path):
+        """Test that outputs go to the archive in completion order, the summary in upload order."""
+        import asyncio
+        import zipfile
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.batch import BatchConverter
+
+        async def convert(file_content, filename, llm_config, output_format=None, progress=None):
+            await asyncio.sleep(0.05 if filename == "slow.pdf" else 0)
+            return await _fake_batch_convert(file_content, filename, llm_config, output_format)
+
+        files = []
+        for name in ("slow.pdf", "fast.pdf"):
+            path = tmp_path / name
+            path.write_text(name)
+            files.append((name, path))
+
+        config = LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-test")
+        with patch("backend.app.services.batch.conversion_service.convert", side_effect=convert):
+            archive_path = await BatchConverter(concurrency=2).convert_to_archive(files, config)
+
+        with zipfile.ZipFile(archive_path) as archive:
+            assert archive.namelist() == ["fast_converted.html", "slow_converted.html", "resultats.json"]
+            summary = json.loads(archive.read("resultats.json"))
+        assert [entry["source"] for entry in summary] == ["slow.pdf", "fast.pdf"]
+        archive_path.unlink()
+
+    def test_batch_as_jobs(self):
+        """Test that delivery=jobs queues one job per document."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+
+        with patch("backend.app.services.jobs.conversion_service.convert", side_effect=_fake_batch_convert):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert/batch",
+                    files=[
+                        ("files", ("a.pdf", b"A", "application/pdf")),
+                        ("files", ("b.pdf", b"B", "application/pdf")),
+                    ],
+                    data={"llm_config": LLM_CONFIG, "delivery": "jobs"},
+                )
+
+        assert response.status_code == 202
+        assert [job["filename"] for job in response.json()] == ["a.pdf", "b.pdf"]
+
+    def test_batch_zip_over_file_limit(self):
+        """Test that an archive entry over the size limit is refused."""
+        from fastapi.testclient import TestClient
+        from backend.app.main import app, settings
+
+        upload = _archive({"big.pdf": b"x" * (2 * 1024 * 1024)})
+
+        with patch.object(settings, "max_file_size_mb", 1):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/convert/batch",
+                    files=[("files", ("lot.zip", upload, "application/zip"))],
+                    data={"llm_config": LLM_CONFIG},
+                )
+
+        assert response.status_code == 400
+        assert "Archive invalide" in response.json()["detail"]
@@ -40,6 +40,186 @@ class TestConversionService:
 
         assert len(chunks) > 1
 
+    @pytest.mark.asyncio
+    async def test_analyze_chunks_concurrent_and_ordered(self):
+        """Test that chunks run concurrently, bounded, and merge in order."""
+        import asyncio
+        from backend.app.services.converter import ConversionService
+        from backend.app.models import (
+            DocumentStructure, Metadata, Section, ConclusionSection, LLMConfig, LLMProvider
+        )
+
+        service = ConversionService()
+        service.max_concurrency = 2
+        in_flight = 0
+        peak = 0
+
+        async def fake_analyze(text, config, on_section=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            index = int(text.rsplit("chunk-", 1)[1])
+            # Later chunks finish first
+            await asyncio.sleep(0.01 * (5 - index))
+            in_flight -= 1
+            return DocumentStructure(
+                metadata=Metadata(title=f"Title {index}"),
+                sections=[Section(title=f"Section {index}", content=[])],
+                conclusion=ConclusionSection(title=f"Conclusion {index}"),
+            )
+
+        config = LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-test")
+        chunks = [f"chunk-{i}" for i in range(5)]
+
+        with patch(
+            "backend.app.services.converter.llm_service.analyze_document",
+            side_effect=fake_analyze,
+        ):
+            doc = await service._analyze_chunks(chunks, config)
+
+        assert peak == 2
+        assert [s.title for s in doc.sections] == [f"Section {i}" for i in range(5)]
+        assert doc.metadata.title == "Title 0"
+        assert doc.conclusion.title == "Conclusion 4"
+
+    @pytest.mark.asyncio
+    async def test_analyze_chunks_joins_split_section(self):
+        """Test that a section cut across two chunks is merged back."""
+        from backend.app.services.converter import ConversionService
+        from backend.app.models import DocumentStructure, Metadata, Section, LLMConfig, LLMProvider
+
+        results = {
+            "a": [Section(title="Intro", content=[]), Section(title="Budget", content=[{"type": "paragraph", "text": "1"}])],
+            "b": [Section(title="budget ", content=[{"type": "paragraph", "text": "2"}]), Section(title="Fin", content=[])],
+        }
+
+        async def fake_analyze(text, config, on_section=None):
+            return DocumentStructure(metadata=Metadata(title="T"), sections=results[text[-1]])
+
+        config = LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-test")
+        with patch(
+            "backend.app.services.converter.llm_service.analyze_document",
+            side_effect=fake_analyze,
+        ):
+            doc = await ConversionService()._analyze_chunks(["a", "b"], config)
+
+        assert [s.title for s in doc.sections] == ["Intro", "Budget", "Fin"]
+        assert [block["text"] for block in doc.sections[1].content] == ["1", "2"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    async def test_extract_text_off_event_loop(self, executor):
+        """Test extraction through the thread and process executors."""
+        import fitz
+        from backend.app.services.converter import ConversionService
+
+        pdf = fitz.open()
+        pdf.new_page().insert_text((72, 72), "Hello extraction")
+        content = pdf.tobytes()
+
+        service = ConversionService()
+        service.extraction_executor = executor
+        service.extraction_workers = 1
+        try:
+            text = await service._extract_text(content, "doc.pdf")
+        finally:
+            service.shutdown()
+
+        assert "--- Page 1 ---" in text
+        assert "Hello extraction" in text
+
+    @pytest.mark.asyncio
+    async def test_extract_text_invalid_file(self):
+        """Test that extraction errors surface as ValueError."""
+        from backend.app.services.converter import ConversionService
+
+        service = ConversionService()
+        service.extraction_executor = "thread"
+        try:
+            with pytest.raises(ValueError, match="Failed to parse PDF"):
+                await service._extract_text(b"not a pdf", "doc.pdf")
+        finally:
+            service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_identical_conversions_coalesced(self):
+        """Test that concurrent identical conversions share one run."""
+        import asyncio
+        from backend.app.services.converter import ConversionService
+        from backend.app.models import ConversionResponse, LLMConfig, LLMProvider, OutputFormat
+
+        service = ConversionService()
+        service.coalescing = True
+        gate = asyncio.Event()
+        runs = []
+
+        async def fake_convert(file_content, filename, llm_config, output_format, progress):
+            runs.append(output_format)
+            await gate.wait()
+            await progress("analyzed", duration_ms=1.0)
+            return ConversionResponse(success=True, html="<html/>", filename="a_converted.html")
+
+        config = LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-one")
+        other_key = LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-two")
+        events = {"a": [], "b": []}
+
+        def listener(name):
+            async def progress(event, **details):
+                events[name].append(event)
+            return progress
+
+        with patch.object(service, "_convert", side_effect=fake_convert):
+            first = asyncio.create_task(service.convert(b"same", "a.pdf", config, progress=listener("a")))
+            second = asyncio.create_task(service.convert(b"same", "b.pdf", config, progress=listener("b")))
+            as_pdf = asyncio.create_task(service.convert(b"same", "a.pdf", config, OutputFormat.PDF))
+            # Another account pays for (and fails or succeeds with) its own run
+            own_key = asyncio.create_task(service.convert(b"same", "c.pdf", other_key))
+            await asyncio.sleep(0.01)
+
+            # The first caller leaving doesn't cancel the shared run
+            first.cancel()
+            gate.set()
+            results = await asyncio.gather(second, as_pdf, own_key)
+
+        assert runs == [OutputFormat.HTML, OutputFormat.PDF, OutputFormat.HTML]
+        assert results[0].filename == "b_converted.html"
+        assert events == {"a": [], "b": ["analyzed"]}
+        assert service._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_shared_run_outlives_first_upload(self, tmp_path):
+        """Test that the shared run still reads the file once its first caller deleted it."""
+        import asyncio
+        from backend.app.services.converter import ConversionService
+        from backend.app.models import ConversionResponse, LLMConfig, LLMProvider
+
+        service = ConversionService()
+        service.coalescing = True
+        gate = asyncio.Event()
+
+        async def fake_convert(file_content, filename, llm_config, output_format, progress):
+            await gate.wait()
+            return ConversionResponse(success=True, html=file_content.read_text(), filename="a_converted.html")
+
+        config = LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-one")
+        uploads = [tmp_path / "first.pdf", tmp_path / "second.pdf"]
+        for upload in uploads:
+            upload.write_text("contenu")
+
+        with patch.object(service, "_convert", side_effect=fake_convert):
+            first = asyncio.create_task(service.convert(uploads[0], "a.pdf", config))
+            second = asyncio.create_task(service.convert(uploads[1], "b.pdf", config))
+            await asyncio.sleep(0.01)
+
+            # What /convert does when its client disconnects
+            first.cancel()
+            uploads[0].unlink()
+            gate.set()
+            result = await second
+
+        assert result.html == "contenu"
+        assert sorted(tmp_path.iterdir()) == [uploads[1]]
+
     def test_generate_output_filename(self):
         """Test output filename generation."""
         from backend.app.services.converter import ConversionService
@@ -51,6 +231,142 @@ class TestConversionService:
         assert service._generate_output_filename("file") == "file_converted.html"
 
 
+class TestTextChunker:
+    """Tests for token-aware chunking."""
+
+    def test_heuristic_counts_accents_and_symbols(self):
+        """Test that the estimator charges accented words and symbols more."""
+        from backend.app.services.chunker import HeuristicTokenizer
+
+        tokenizer = HeuristicTokenizer()
+
+        assert tokenizer.count("the cat") == 2
+        assert tokenizer.count("été réalisé") > tokenizer.count("ete realise")
+        assert tokenizer.count("a, b; c!") == 6
+
+    def test_no_chunk_exceeds_budget(self):
+        """Test that a single giant paragraph is split by sentence and word."""
+        from backend.app.services.chunker import TextChunker, HeuristicTokenizer
+
+        tokenizer = HeuristicTokenizer()
+        chunker = TextChunker(tokenizer)
+        text = "Une phrase assez longue pour le test. " * 200 + "x" * 500
+
+        chunks = chunker.split(text, max_tokens=50)
+
+        assert len(chunks) > 1
+        assert all(tokenizer.count(chunk) <= 50 for chunk in chunks)
+        assert "".join(chunks).replace(" ", "") == text.replace(" ", "")
+
+    def test_prefers_coarse_boundaries(self):
+        """Test that pages are kept whole when they fit the budget."""
+        from backend.app.services.chunker import TextChunker, HeuristicTokenizer
+
+        pages = [f"--- Page {i} ---\npremier paragraphe\n\nsecond paragraphe" for i in range(1, 5)]
+        text = "\n\n".join(pages)
+        chunker = TextChunker(HeuristicTokenizer())
+
+        max_tokens = chunker.tokenizer.count(pages[0] + "\n\n") * 2
+        chunks = chunker.split(text, max_tokens)
+
+        assert chunks == ["\n\n".join(pages[:2]), "\n\n".join(pages[2:])]
+
+    def test_tables_never_cut_mid_row(self):
+        """Test that a table stays whole, or is split between rows with its header."""
+        from backend.app.services.chunker import TextChunker, HeuristicTokenizer
+
+        header = "| Nom | Valeur |\n|---|---|"
+        rows = [f"| ligne {i} | {i * 10} |" for i in range(40)]
+        text = "Introduction du rapport.\n\n" + header + "\n" + "\n".join(rows)
+        chunker = TextChunker(HeuristicTokenizer())
+
+        chunks = chunker.split(text, max_tokens=80)
+
+        table_chunks = [chunk for chunk in chunks if "|" in chunk]
+        assert len(table_chunks) > 1
+        for chunk in table_chunks:
+            assert chunk.startswith(header)
+            assert all(line.startswith("|") and line.endswith("|") for line in chunk.splitlines())
+        assert sum(chunk.count("| ligne ") for chunk in chunks) == 40
+
+    def test_continuation_chunks_carry_breadcrumb(self):
+        """Test that a chunk starting mid-section names its headings."""
+        from backend.app.services.chunker import TextChunker, HeuristicTokenizer
+
+        body = "\n\n".join(f"Paragraphe {i} du chapitre sur le budget annuel." for i in range(150))
+        text = f"# Rapport\n\n## Budget\n\n{body}\n\n## Annexes\n\nFin."
+        chunker = TextChunker(HeuristicTokenizer())
+
+        chunks = chunker.split(text, max_tokens=600)
+
+        assert len(chunks) > 2
+        assert chunks[0].startswith("# Rapport")
+        assert chunks[1].startswith("[Section en cours : Rapport > Budget]")
+        assert all(chunker.tokenizer.count(chunk) <= 600 for chunk in chunks)
+        # The last section starts its own chunk, with only its parent as context
+        assert chunks[-1] == "[Section en cours : Rapport]\n\n## Annexes\n\nFin."
+
+    def test_content_defined_boundaries_survive_edits(self):
+        """Test that an edit only changes the chunks around it."""
+        import random
+        from backend.app.services.chunker import TextChunker, HeuristicTokenizer
+
+        rng = random.Random(7)
+        words = "le rapport budget analyse projet équipe résultat client données".split()
+        paragraphs = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(10, 60))) + "."
+            for _ in range(300)
+        ]
+        edited = list(paragraphs)
+        edited.insert(20, "Un nouveau paragraphe ajouté dans la deuxième version.")
+
+        chunker = TextChunker(HeuristicTokenizer(), content_defined=True)
+        before = chunker.split("\n\n".join(paragraphs), max_tokens=500)
+        after = chunker.split("\n\n".join(edited), max_tokens=500)
+
+        assert len(before) > 20
+        assert len(set(after) - set(before)) <= 3
+
+    def test_chunks_never_exceed_budget(self):
+        """Test that every chunk fits the budget, counted as a whole."""
+        import random
+        import re
+        from backend.app.services.chunker import TextChunker, HeuristicTokenizer
+
+        tokenizer = HeuristicTokenizer()
+        words = "le rapport budget analyse projet équipe 2024 : client".split()
+
+        for seed in range(30):
+            rng = random.Random(seed)
+            parts = []
+            for index in range(rng.randint(5, 30)):
+                if rng.random() < 0.1:
+                    parts.append(f"## Partie {index}")
+                else:
+                    parts.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 120))))
+                # Newline runs that the line level cuts into 0-token pieces
+                parts.append(rng.choice(["\n", "\n\n", "\n\n\n", "\n \n"]))
+            text = "".join(parts)
+            max_tokens = rng.choice([20, 60, 150, 600])
+
+            for content_defined in (False, True):
+                chunker = TextChunker(tokenizer, content_defined=content_defined)
+                chunks = chunker.split(text, max_tokens)
+
+                assert all(tokenizer.count(chunk) <= max_tokens for chunk in chunks)
+                # Nothing lost or reordered, breadcrumbs aside
+                kept = " ".join(re.sub(r"^\[Section en cours : [^\]]*\]", "", chunk) for chunk in chunks)
+                assert kept.split() == text.split()
+
+    def test_budget_follows_model_context(self):
+        """Test that small context windows lower the chunk budget."""
+        from backend.app.services.chunker import max_chunk_tokens
+
+        assert max_chunk_tokens(6000, "gpt-4", prompt_tokens=1000) == 3236
+        assert max_chunk_tokens(6000, "gpt-4o-mini", prompt_tokens=1000) == 6000
+        assert max_chunk_tokens(6000, "llama3", prompt_tokens=1000) == 6000
+
+
 class TestHTMLGenerator:
     """Tests for HTML generator."""
 
@@ -87,6 +403,17 @@ class TestHTMLGenerator:
         result = generator._escape("This is *italic* text")
         assert "<em>italic</em>" in result
 
+    def test_escape_markdown_nested(self):
+        """Test nested emphasis and stray stars in one pass."""
+        from backend.app.services.html_generator import HTMLGenerator
+
+        generator = HTMLGenerator()
+
+        assert generator._escape("**a *b* c**") == "<strong>a <em>b</em> c</strong>"
+        assert generator._escape("*a **b** c*") == "<em>a <strong>b</strong> c</em>"
+        assert generator._escape("*x**y**") == "*x<strong>y</strong>"
+        assert generator._escape("3 * 4") == "3 * 4"
+
     def test_generate_cover(self):
         """Test cover page generation."""
         from backend.app.services.html_generator import HTMLGenerator
@@ -146,6 +473,94 @@ class TestHTMLGenerator:
         assert "<th>Col1</th>" in html
         assert "<td>A</td>" in html
 
+    def test_generate_iter_matches_generate(self):
+        """Test that the streamed fragments form the full page, one section per fragment."""
+        from backend.app.services.html_generator import HTMLGenerator
+        from backend.app.templates.base_template import get_html_template
+        from backend.app.models import DocumentStructure
+
+        generator = HTMLGenerator()
+        doc = DocumentStructure.model_validate({
+            "metadata": {"title": "Rapport"},
+            "sections": [
+                {"title": "Un", "content": [{"type": "paragraph", "text": "**A**"}]},
+                {"title": "Deux", "content": [{"type": "paragraph", "text": "B"}]},
+            ],
+        })
+
+        fragments = list(generator.generate_iter(doc))
+        html = generator.generate(doc)
+
+        assert "".join(fragments) == html
+        assert html.startswith(get_html_template("Rapport", "")[:100])
+        assert sum('class="section-title"' in fragment for fragment in fragments) == 2
+
+
+class TestHTMLTemplate:
+    """Tests for the HTML template and font assets."""
+
+    def test_online_template_links_google_fonts(self):
+        """Test that the default template links the remote fonts."""
+        from backend.app.templates.base_template import get_html_template
+
+        html = get_html_template("Title", "<p>Body</p>", offline=False)
+
+        assert "fonts.googleapis.com" in html
+        assert "<p>Body</p>" in html
+
+    def test_offline_template_has_no_remote_assets(self):
+        """Test that offline mode makes no network reference."""
+        from backend.app.templates.base_template import get_html_template
+
+        html = get_html_template("Title", "<p>Body</p>", offline=True)
+
+        assert "fonts.googleapis.com" not in html
+        assert "https://" not in html
+
+    def test_template_parts_match_format(self):
+        """Test that concatenating the cached parts equals formatting the template."""
+        from backend.app.templates.base_template import (
+            BASE_CSS, GOOGLE_FONTS_LINK, HTML_TEMPLATE, get_html_template
+        )
+
+        html = get_html_template("Titre {x}", "<p>{Corps}</p>", offline=False)
+
+        assert html == HTML_TEMPLATE.format(
+            title="Titre {x}", font_links=GOOGLE_FONTS_LINK, css=BASE_CSS, content="<p>{Corps}</p>"
+        )
+
+    def test_font_face_css_embeds_bundled_fonts(self, tmp_path):
+        """Test that bundled fonts become data-URI @font-face rules."""
+        from backend.app.templates.fonts import get_font_face_css
+
+        (tmp_path / "CormorantGaramond-500-italic.woff2").write_bytes(b"font")
+        (tmp_path / "Unknown-400.woff2").write_bytes(b"font")
+
+        css = get_font_face_css(tmp_path)
+
+        assert css.count("@font-face") == 1
+        assert "font-family: 'Cormorant Garamond'" in css
+        assert "font-style: italic" in css
+        assert "font-weight: 500" in css
+        assert "data:font/woff2;base64,Zm9udA==" in css
+
+    def test_offline_mode_requires_bundled_fonts(self, tmp_path):
+        """Test that offline mode refuses to start without the font files."""
+        from fastapi.testclient import TestClient
+        from backend.app.config import settings
+        from backend.app.main import app
+        from backend.app.templates.fonts import BUNDLED_FONTS, missing_fonts
+
+        for name in BUNDLED_FONTS[1:]:
+            (tmp_path / name).write_bytes(b"font")
+        assert missing_fonts(tmp_path) == [BUNDLED_FONTS[0]]
+
+        with patch.object(settings, "offline_assets", True), \
+                patch("backend.app.main.missing_fonts", return_value=[BUNDLED_FONTS[0]]):
+            with pytest.raises(RuntimeError, match=BUNDLED_FONTS[0]):
+                with TestClient(app):
+                    pass
+
 
 class TestDocumentStructure:
     """Tests for document structure models."""
@@ -190,3 +605,116 @@ class TestDocumentStructure:
         assert doc.metadata.title == "Full Test"
         assert len(doc.sections) == 1
         assert len(doc.sources) == 1
+
+
+class FakeBrowser:
+    """Stand-in for a Playwright browser."""
+
+    def __init__(self, crash=False):
+        self.crash = crash
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class TestPDFGenerator:
+    """Tests for the PDF browser pool."""
+
+    def _generator(self, **kwargs):
+        from backend.app.services.pdf_generator import PDFGenerator
+
+        generator = PDFGenerator(**kwargs)
+        generator.launched = []
+
+        async def launch():
+            browser = FakeBrowser()
+            generator.launched.append(browser)
+            return browser
+
+        async def render(browser, html_content):
+            if browser.crash:
+                browser.connected = False
+                raise RuntimeError("Target closed")
+            return b"%PDF " + html_content.encode()
+
+        generator._launch = launch
+        generator._render = render
+        return generator
+
+    @pytest.mark.asyncio
+    async def test_browser_reused_between_jobs(self):
+        """Test that consecutive jobs share a warm browser."""
+        generator = self._generator(pool_size=1, max_renders=10)
+
+        assert await generator.generate_pdf_async("a") == b"%PDF a"
+        assert await generator.generate_pdf_async("b") == b"%PDF b"
+
+        assert len(generator.launched) == 1
+
+    @pytest.mark.asyncio
+    async def test_browser_recycled_after_max_renders(self):
+        """Test that a browser is closed after max_renders jobs."""
+        generator = self._generator(pool_size=1, max_renders=2)
+
+        for _ in range(3):
+            await generator.generate_pdf_async("x")
+
+        assert len(generator.launched) == 2
+        assert generator.launched[0].closed
+
+    @pytest.mark.asyncio
+    async def test_crashed_browser_replaced(self):
+        """Test that a crashed browser is replaced on the next job."""
+        generator = self._generator(pool_size=1, max_renders=10)
+        await generator.start()
+        generator.launched[0].crash = True
+
+        with pytest.raises(RuntimeError):
+            await generator.generate_pdf_async("x")
+
+        assert await generator.generate_pdf_async("y") == b"%PDF y"
+        assert len(generator.launched) == 2
+
+    @pytest.mark.asyncio
+    async def test_pool_bounds_concurrency(self):
+        """Test that no more browsers than pool_size are launched."""
+        import asyncio
+
+        generator = self._generator(pool_size=2, max_renders=100)
+
+        await asyncio.gather(*(generator.generate_pdf_async(str(i)) for i in range(6)))
+
+        assert len(generator.launched) == 2
+        await generator.shutdown()
+        assert all(browser.closed for browser in generator.launched)
+
+    @pytest.mark.asyncio
+    async def test_playwright_started_once(self):
+        """Test that concurrent first launches share one Playwright driver."""
+        import asyncio
+        from backend.app.services.pdf_generator import PDFGenerator
+
+        started = []
+
+        class FakeStarter:
+            async def start(self):
+                await asyncio.sleep(0.01)
+                driver = MagicMock()
+                driver.stop = AsyncMock()
+                started.append(driver)
+                return driver
+
+        generator = PDFGenerator(pool_size=3)
+        with patch("backend.app.services.pdf_generator.async_playwright", FakeStarter):
+            drivers = await asyncio.gather(*(generator._get_playwright() for _ in range(3)))
+
+        assert len(started) == 1
+        assert all(driver is started[0] for driver in drivers)
+        await generator.shutdown()
+        started[0].stop.assert_awaited_once()
@@ -85,3 +85,35 @@ class TestGetExtractor:
         from backend.app.extractors import get_extractor, PDFExtractor
         extractor = get_extractor("document.PDF")
         assert isinstance(extractor, PDFExtractor)
+
+
+class TestPDFParallelExtraction:
+    """Tests for page-range parallel PDF extraction."""
+
+    def test_split_pages(self):
+        """Test that pages are split into contiguous, balanced ranges."""
+        from backend.app.extractors import PDFExtractor
+
+        assert PDFExtractor._split_pages(10, 3) == [(0, 4), (4, 7), (7, 10)]
+        assert PDFExtractor._split_pages(2, 4) == [(0, 1), (1, 2)]
+        assert PDFExtractor._split_pages(5, 1) == [(0, 5)]
+
+    @pytest.mark.asyncio
+    async def test_parallel_matches_serial(self, tmp_path):
+        """Test that parallel extraction keeps page order and markers."""
+        import fitz
+        from concurrent.futures import ThreadPoolExecutor
+        from backend.app.extractors import PDFExtractor
+
+        pdf = fitz.open()
+        for i in range(7):
+            pdf.new_page().insert_text((72, 72), f"Content of page {i + 1}")
+        path = tmp_path / "doc.pdf"
+        pdf.save(path)
+
+        extractor = PDFExtractor()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            parallel = await extractor.extract_parallel(path, executor, workers=3, min_pages=2)
+
+        assert parallel == extractor.extract(path)
+        assert parallel.index("--- Page 7 ---") > parallel.index("--- Page 1 ---")
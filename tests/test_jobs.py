@@ -0,0 +1,359 @@
+"""Tests for asynchronous conversion jobs."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+
+
+def _config():
+    from backend.app.models import LLMConfig, LLMProvider
+    return LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-test")
+
+
+async def _fake_convert(file_content, filename, llm_config, output_format=None, progress=None):
+    """Conversion stub reporting the same stages as the real service."""
+    from backend.app.models import ConversionResponse
+
+    await progress("extracting")
+    await progress("extracted", pages=3, characters=100, duration_ms=5.0)
+    await progress("analyzing", chunks_total=2)
+    await progress("chunk_analyzed", chunk=2, chunks_done=1, chunks_total=2, duration_ms=1.0)
+    await progress("chunk_analyzed", chunk=1, chunks_done=2, chunks_total=2, duration_ms=2.0)
+    await progress("analyzed", duration_ms=2.0)
+    await progress("generating")
+    await progress("generated", html_bytes=13, duration_ms=1.0)
+
+    if file_content == b"broken":
+        return ConversionResponse(success=False, error="Erreur de validation: boom")
+    return ConversionResponse(success=True, html="<html></html>", filename="doc_converted.html")
+
+
+async def _wait_finished(manager, job_id):
+    """Poll a job until it is finished."""
+    from backend.app.services.jobs import FINISHED_STATUSES
+
+    for _ in range(100):
+        job = await manager.get(job_id)
+        if job.status in FINISHED_STATUSES:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("Job did not finish")
+
+
+class TestJobManager:
+    """Tests for the job queue and workers."""
+
+    @pytest.mark.asyncio
+    async def test_job_completes_with_progress(self):
+        """Test that a job runs in the background and stores its result."""
+        from backend.app.models import JobStatus
+        from backend.app.services.jobs import JobManager, MemoryJobStore
+
+        manager = JobManager(MemoryJobStore(), workers=1)
+
+        with patch("backend.app.services.jobs.conversion_service.convert", side_effect=_fake_convert):
+            job = await manager.submit(b"content", "doc.pdf", _config())
+            assert job.status == JobStatus.QUEUED
+            job = await _wait_finished(manager, job.id)
+
+        assert job.status == JobStatus.COMPLETED
+        assert job.stage == "generating"
+        assert (job.chunks_done, job.chunks_total) == (2, 2)
+        assert job.timings == {"extracted": 5.0, "analyzed": 2.0, "generated": 1.0}
+        assert (await manager.get_result(job.id)).html == "<html></html>"
+
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_events_stream_until_completed(self):
+        """Test that subscribers get a snapshot, progress, then completion."""
+        from backend.app.services.jobs import JobManager, MemoryJobStore
+
+        manager = JobManager(MemoryJobStore(), workers=1)
+        gate = asyncio.Event()
+
+        async def gated_convert(*args, **kwargs):
+            await gate.wait()
+            return await _fake_convert(*args, **kwargs)
+
+        with patch("backend.app.services.jobs.conversion_service.convert", side_effect=gated_convert):
+            job = await manager.submit(b"content", "doc.pdf", _config())
+            stream = manager.events(job.id)
+
+            event, data = await stream.__anext__()
+            assert event == "status"
+            assert data["id"] == job.id
+
+            gate.set()
+            events = [event async for event, data in stream]
+
+        assert events[0] == "extracting"
+        assert "chunk_analyzed" in events
+        assert events[-1] == "completed"
+        assert manager._subscribers == {}
+
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_events_keepalive_ping(self):
+        """Test that a silent job yields keep-alive pings."""
+        from backend.app.models import JobInfo
+        from backend.app.services.jobs import JobManager, MemoryJobStore
+
+        manager = JobManager(MemoryJobStore())
+        await manager.store.save(JobInfo(id="idle", created_at=0, updated_at=0))
+
+        stream = manager.events("idle", keepalive_seconds=0.01)
+        assert (await stream.__anext__())[0] == "status"
+        assert (await stream.__anext__())[0] == "ping"
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_failed_job_keeps_error(self):
+        """Test that a failed conversion marks the job as failed."""
+        from backend.app.models import JobStatus
+        from backend.app.services.jobs import JobManager, MemoryJobStore
+
+        manager = JobManager(MemoryJobStore(), workers=1)
+
+        with patch("backend.app.services.jobs.conversion_service.convert", side_effect=_fake_convert):
+            job = await manager.submit(b"broken", "doc.pdf", _config())
+            job = await _wait_finished(manager, job.id)
+
+        assert job.status == JobStatus.FAILED
+        assert "boom" in job.error
+
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_queue_full(self):
+        """Test that submissions beyond the queue size are rejected."""
+        from backend.app.services.jobs import JobManager, MemoryJobStore, JobQueueFullError
+
+        manager = JobManager(MemoryJobStore(), workers=1, queue_size=1)
+        await manager.start()
+        # Stop workers so nothing drains the queue
+        for task in manager._tasks:
+            task.cancel()
+
+        await manager.submit(b"a", "a.pdf", _config())
+        with pytest.raises(JobQueueFullError):
+            await manager.submit(b"b", "b.pdf", _config())
+
+        await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_sqlite_store_round_trip(self, tmp_path):
+        """Test that the SQLite store persists jobs, results and purges."""
+        from backend.app.models import ConversionResponse, JobInfo, JobStatus
+        from backend.app.services.jobs import SQLiteJobStore
+
+        store = SQLiteJobStore(tmp_path / "jobs.sqlite3")
+        job = JobInfo(id="abc", created_at=1.0, updated_at=1.0)
+        await store.save(job)
+
+        job.status = JobStatus.COMPLETED
+        await store.save(job)
+        await store.save_result("abc", ConversionResponse(success=True, html="<p/>"))
+
+        reopened = SQLiteJobStore(tmp_path / "jobs.sqlite3")
+        assert (await reopened.get("abc")).status == JobStatus.COMPLETED
+        assert (await reopened.get_result("abc")).html == "<p/>"
+
+        await reopened.purge(older_than=2.0)
+        assert await reopened.get("abc") is None
+
+    @pytest.mark.asyncio
+    async def test_sqlite_store_keeps_pdf_binary(self, tmp_path):
+        """Test that PDFs are stored as a blob, also in databases of the old schema."""
+        import sqlite3
+        from backend.app.models import ConversionResponse, JobInfo
+        from backend.app.services.jobs import SQLiteJobStore
+
+        path = tmp_path / "jobs.sqlite3"
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, info TEXT NOT NULL, result TEXT, "
+            "status TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.close()
+
+        store = SQLiteJobStore(path)
+        await store.save(JobInfo(id="abc", created_at=1.0, updated_at=1.0))
+        await store.save_result("abc", ConversionResponse(success=True, pdf=b"%PDF\x00\xff", format="pdf"))
+
+        result = await SQLiteJobStore(path).get_result("abc")
+        assert result.pdf == b"%PDF\x00\xff"
+        assert result.pdf_base64 is None
+
+    @pytest.mark.asyncio
+    async def test_restart_fails_unfinished_jobs(self, tmp_path):
+        """Test that jobs left queued or running by a restart are marked failed."""
+        from backend.app.models import JobInfo, JobStatus
+        from backend.app.services.jobs import INTERRUPTED_ERROR, JobManager, SQLiteJobStore
+
+        path = tmp_path / "jobs.sqlite3"
+        store = SQLiteJobStore(path)
+        for job_id, status in (("q", JobStatus.QUEUED), ("r", JobStatus.RUNNING), ("c", JobStatus.COMPLETED)):
+            await store.save(JobInfo(id=job_id, status=status, created_at=1.0, updated_at=1.0))
+
+        manager = JobManager(SQLiteJobStore(path), workers=1)
+        await manager.start()
+
+        for job_id in ("q", "r"):
+            job = await manager.get(job_id)
+            assert job.status == JobStatus.FAILED
+            assert job.error == INTERRUPTED_ERROR
+        assert (await manager.get("c")).status == JobStatus.COMPLETED
+
+        await manager.shutdown()
+
+    def test_incomplete_store_rejected(self):
+        """Test that a store missing a method fails when created, not mid-request."""
+        from backend.app.services.jobs import JobStore
+
+        class SaveOnlyStore(JobStore):
+            async def save(self, job):
+                pass
+
+        with pytest.raises(TypeError, match="abstract"):
+            SaveOnlyStore()
+
+class TestJobEndpoints:
+    """Tests for the /jobs API."""
+
+    def test_submit_poll_and_fetch_result(self):
+        """Test the job lifecycle through the HTTP API."""
+        import time
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+
+        llm_config = json.dumps({"provider": "openai", "api_key": "sk-test"})
+
+        with patch("backend.app.services.jobs.conversion_service.convert", side_effect=_fake_convert):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/jobs",
+                    files={"file": ("doc.pdf", b"content", "application/pdf")},
+                    data={"llm_config": llm_config},
+                )
+                assert response.status_code == 202
+                job_id = response.json()["id"]
+
+                for _ in range(100):
+                    status = client.get(f"/jobs/{job_id}").json()["status"]
+                    if status == "completed":
+                        break
+                    time.sleep(0.01)
+
+                with client.stream("GET", f"/jobs/{job_id}/events") as events:
+                    body = "".join(events.iter_text())
+                assert events.headers["content-type"].startswith("text/event-stream")
+                # Job already finished: the stream is a single snapshot
+                assert body.startswith("event: status\n")
+                assert '"status": "completed"' in body
+
+                result = client.get(f"/jobs/{job_id}/result").json()
+                assert result["success"] is True
+                assert result["html"] == "<html></html>"
+                assert result["result_url"] == f"/jobs/{job_id}/file"
+                assert "pdf" not in result
+
+                assert client.get("/jobs/unknown").status_code == 404
+
+    def test_pdf_result_downloaded_as_binary(self):
+        """Test that a large PDF is served by result_url instead of inline base64."""
+        import time
+        from fastapi.testclient import TestClient
+        from backend.app.main import app, settings
+        from backend.app.models import ConversionResponse
+
+        pdf = b"%PDF-1.7" + bytes(range(256)) * 8
+
+        async def fake_convert(file_content, filename, llm_config, output_format=None, progress=None):
+            return ConversionResponse(
+                success=True, html="<html></html>", pdf=pdf,
+                filename="doc_converted.pdf", format="pdf",
+            )
+
+        llm_config = json.dumps({"provider": "openai", "api_key": "sk-test"})
+
+        with patch("backend.app.services.jobs.conversion_service.convert", side_effect=fake_convert), \
+                patch.object(settings, "job_inline_result_max_kb", 1):
+            with TestClient(app) as client:
+                job_id = client.post(
+                    "/jobs",
+                    files={"file": ("doc.pdf", b"content", "application/pdf")},
+                    data={"llm_config": llm_config, "output_format": "pdf"},
+                ).json()["id"]
+
+                for _ in range(100):
+                    if client.get(f"/jobs/{job_id}").json()["status"] == "completed":
+                        break
+                    time.sleep(0.01)
+
+                result = client.get(f"/jobs/{job_id}/result").json()
+                assert result["pdf_base64"] is None
+                assert result["html"] == "<html></html>"
+
+                response = client.get(result["result_url"])
+                assert response.status_code == 200
+                assert response.headers["content-type"] == "application/pdf"
+                assert "doc_converted.pdf" in response.headers["content-disposition"]
+                assert response.content == pdf
+
+    def test_result_file_compressed_and_conditional(self):
+        """Test gzip negotiation, content ETags and 304 on re-download."""
+        import time
+        from fastapi.testclient import TestClient
+        from backend.app.main import app
+        from backend.app.models import ConversionResponse
+
+        page = "<html>" + "<p>Rapport</p>" * 1000 + "</html>"
+
+        async def fake_convert(file_content, filename, llm_config, output_format=None, progress=None):
+            return ConversionResponse(success=True, html=page, filename="doc_converted.html")
+
+        llm_config = json.dumps({"provider": "openai", "api_key": "sk-test"})
+
+        with patch("backend.app.services.jobs.conversion_service.convert", side_effect=fake_convert):
+            with TestClient(app) as client:
+                job_id = client.post(
+                    "/jobs",
+                    files={"file": ("doc.pdf", b"content", "application/pdf")},
+                    data={"llm_config": llm_config},
+                ).json()["id"]
+
+                for _ in range(100):
+                    if client.get(f"/jobs/{job_id}").json()["status"] == "completed":
+                        break
+                    time.sleep(0.01)
+
+                response = client.get(f"/jobs/{job_id}/file", headers={"Accept-Encoding": "gzip"})
+                assert response.headers["content-encoding"] == "gzip"
+                assert "Accept-Encoding" in response.headers["vary"]
+                assert response.text == page
+                assert int(response.headers["content-length"]) < len(page) // 10
+                etag = response.headers["etag"]
+                assert etag.endswith('-gzip"')
+
+                # Same bytes on every request: the ETag is strong
+                again = client.get(f"/jobs/{job_id}/file", headers={"Accept-Encoding": "gzip"})
+                assert again.headers["etag"] == etag
+
+                cached = client.get(f"/jobs/{job_id}/file", headers={"If-None-Match": etag})
+                assert cached.status_code == 304
+                assert cached.content == b""
+
+                plain = client.get(f"/jobs/{job_id}/file", headers={"Accept-Encoding": "identity"})
+                assert "content-encoding" not in plain.headers
+                assert plain.headers["etag"] != etag
+
+                result = client.get(f"/jobs/{job_id}/result", headers={"Accept-Encoding": "gzip"})
+                assert result.headers["content-encoding"] == "gzip"
+                assert result.json()["html"] == page
+                assert client.get(
+                    f"/jobs/{job_id}/result", headers={"If-None-Match": result.headers["etag"]}
+                ).status_code == 304
+
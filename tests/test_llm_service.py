@@ -101,3 +101,816 @@ class TestLLMConfig:
 
         assert config.provider == LLMProvider.CUSTOM
         assert config.base_url == "http://localhost:1234"
+
+
+class TestLLMClientPool:
+    """Tests for pooled HTTP clients."""
+
+    @pytest.mark.asyncio
+    async def test_client_reused_per_base_url(self):
+        """Test that one client is kept per base URL."""
+        from backend.app.services.llm_service import LLMService
+
+        service = LLMService()
+
+        first = service._get_client("http://localhost:1234/")
+        second = service._get_client("http://localhost:1234")
+        other = service._get_client("http://localhost:5678")
+
+        assert first is second
+        assert first is not other
+
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_shutdown_closes_clients(self):
+        """Test that shutdown closes clients and later calls reopen them."""
+        from backend.app.services.llm_service import LLMService, OPENAI_BASE_URL
+
+        service = LLMService()
+        await service.startup()
+        client = service._get_client(OPENAI_BASE_URL)
+
+        await service.shutdown()
+
+        assert client.is_closed
+        assert service._get_client(OPENAI_BASE_URL) is not client
+
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_client_closed(self):
+        """Test that custom base URLs over the limit close the oldest client."""
+        import asyncio
+        from backend.app.services.llm_service import LLMService, OPENAI_BASE_URL
+
+        service = LLMService()
+        service.max_clients = 4
+        await service.startup()
+
+        first = service._get_client("http://one.local")
+        second = service._get_client("http://two.local")
+        service._get_client("http://one.local")
+        service._get_client("http://three.local")
+        await asyncio.sleep(0)
+
+        assert len(service._clients) == 4
+        assert second.is_closed
+        assert not first.is_closed
+        assert OPENAI_BASE_URL in service._clients
+
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_global_limiter_bounds_calls(self):
+        """Test that LLM calls from many conversions share one limit."""
+        import asyncio
+        from backend.app.services.llm_service import LLMService
+        from backend.app.models import LLMConfig, LLMProvider
+
+        service = LLMService()
+        service.cache = None
+        service.max_concurrency = 3
+        in_flight = 0
+        peak = 0
+
+        async def fake_call(text, config):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return '{"metadata": {"title": "T"}, "sections": []}'
+
+        config = LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-test")
+        with patch.object(service, "_call_openai", side_effect=fake_call):
+            await asyncio.gather(*(
+                service.analyze_document(f"text {i}", config) for i in range(10)
+            ))
+
+        assert peak == 3
+
+
+class TestAnalysisCache:
+    """Tests for the analysis result cache."""
+
+    def _config(self, model="gpt-4"):
+        from backend.app.models import LLMConfig, LLMProvider
+        return LLMConfig(provider=LLMProvider.OPENAI, api_key="sk-test", model=model)
+
+    def _doc(self, title="Cached"):
+        from backend.app.models import DocumentStructure, Metadata
+        return DocumentStructure(metadata=Metadata(title=title), sections=[])
+
+    def test_make_key_ignores_api_key(self):
+        """Test that the key depends on text, model and prompt, not the secret."""
+        from backend.app.services.analysis_cache import AnalysisCache
+
+        config = self._config()
+        other_key = config.model_copy(update={"api_key": "sk-other"})
+
+        key = AnalysisCache.make_key("text", config, "v1")
+
+        assert key == AnalysisCache.make_key("text", other_key, "v1")
+        assert key != AnalysisCache.make_key("other text", config, "v1")
+        assert key != AnalysisCache.make_key("text", self._config("gpt-4o"), "v1")
+        assert key != AnalysisCache.make_key("text", config, "v2")
+
+    @pytest.mark.asyncio
+    async def test_memory_lru_eviction(self):
+        """Test that the memory tier evicts least recently used entries."""
+        from backend.app.services.analysis_cache import AnalysisCache
+
+        cache = AnalysisCache(memory_entries=2)
+
+        await cache.set("a", self._doc("A"))
+        await cache.set("b", self._doc("B"))
+        await cache.get("a")
+        await cache.set("c", self._doc("C"))
+
+        assert (await cache.get("a")).metadata.title == "A"
+        assert await cache.get("b") is None
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_new_instance(self, tmp_path):
+        """Test that the SQLite tier is shared across instances."""
+        from backend.app.services.analysis_cache import AnalysisCache
+
+        db_path = tmp_path / "cache.sqlite3"
+        await AnalysisCache(db_path=db_path).set("key", self._doc("Disk"))
+
+        result = await AnalysisCache(memory_entries=0, db_path=db_path).get("key")
+
+        assert result.metadata.title == "Disk"
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_ttl_and_size(self, tmp_path):
+        """Test TTL expiry and size eviction on disk."""
+        from backend.app.services.analysis_cache import AnalysisCache
+
+        cache = AnalysisCache(
+            memory_entries=0, db_path=tmp_path / "cache.sqlite3", max_disk_entries=2
+        )
+        for key in ("a", "b", "c"):
+            await cache.set(key, self._doc(key))
+
+        assert await cache.get("a") is None
+        assert await cache.get("c") is not None
+
+        cache.ttl_seconds = -1
+        assert await cache.get("c") is None
+
+    @pytest.mark.asyncio
+    async def test_analyze_document_uses_cache(self):
+        """Test that a cached analysis skips the LLM call."""
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.analysis_cache import AnalysisCache
+
+        service = LLMService()
+        service.cache = AnalysisCache()
+        response = '{"metadata": {"title": "From LLM"}, "sections": []}'
+
+        with patch.object(service, "_call_openai", AsyncMock(return_value=response)) as call:
+            first = await service.analyze_document("same text", self._config())
+            second = await service.analyze_document("same text", self._config())
+
+        assert call.await_count == 1
+        assert first.metadata.title == second.metadata.title == "From LLM"
+
+
+class TestStreaming:
+    """Tests for streamed completions and incremental section parsing."""
+
+    DOCUMENT = (
+        '{"metadata": {"title": "Streamed"}, "toc": true, "sections": ['
+        '{"type": "section", "title": "One {not a brace}", "content": '
+        '[{"type": "paragraph", "text": "He said \\"}\\""}]},'
+        '{"type": "section", "title": "Two", "content": []}'
+        '], "sources": []}'
+    )
+
+    def test_parser_emits_sections_as_they_close(self):
+        """Test that sections are emitted one by one, even fed char by char."""
+        from backend.app.services.json_stream import SectionStreamParser
+
+        parser = SectionStreamParser()
+        emitted = []
+        for char in "```json\n" + self.DOCUMENT:
+            emitted.extend(section["title"] for section in parser.feed(char))
+
+        assert emitted == ["One {not a brace}", "Two"]
+
+    def test_parser_emits_first_section_before_end(self):
+        """Test that the first section is available before the document ends."""
+        from backend.app.services.json_stream import SectionStreamParser
+
+        parser = SectionStreamParser()
+        cut = self.DOCUMENT.index(',{"type": "section", "title": "Two"')
+
+        assert [s["title"] for s in parser.feed(self.DOCUMENT[:cut])] == ["One {not a brace}"]
+        assert [s["title"] for s in parser.feed(self.DOCUMENT[cut:])] == ["Two"]
+
+    def test_parser_fails_fast_on_prose(self):
+        """Test that non-JSON output is rejected before the stream ends."""
+        from backend.app.services.json_stream import SectionStreamParser
+
+        parser = SectionStreamParser()
+        parser.feed("``")
+
+        with pytest.raises(ValueError, match="Invalid JSON"):
+            parser.feed("Voici le document :")
+
+    def test_parser_rejects_invalid_section(self):
+        """Test that a section missing required fields fails immediately."""
+        from backend.app.services.json_stream import SectionStreamParser
+
+        parser = SectionStreamParser()
+
+        with pytest.raises(ValueError, match="Invalid document structure"):
+            parser.feed('{"metadata": {"title": "X"}, "sections": [{"content": []}')
+
+    @pytest.mark.asyncio
+    async def test_openai_stream_end_to_end(self):
+        """Test streaming through an OpenAI-compatible SSE response."""
+        import httpx
+        import json
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.llm_service import LLMService
+
+        pieces = [self.DOCUMENT[i:i + 20] for i in range(0, len(self.DOCUMENT), 20)]
+        body = "".join(
+            f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n"
+            for piece in pieces
+        ) + "data: [DONE]\n\n"
+
+        def handler(request):
+            assert json.loads(request.content)["stream"] is True
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+        service = LLMService()
+        service.cache = None
+        service.streaming = True
+        service._clients["http://llm.local"] = httpx.AsyncClient(
+            base_url="http://llm.local", transport=httpx.MockTransport(handler)
+        )
+        config = LLMConfig(
+            provider=LLMProvider.CUSTOM, api_key="none", model="m", base_url="http://llm.local"
+        )
+        titles = []
+
+        async def on_section(section):
+            titles.append(section["title"])
+
+        doc = await service.analyze_document("text", config, on_section)
+
+        assert doc.metadata.title == "Streamed"
+        assert titles == ["One {not a brace}", "Two"]
+
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_retried_stream_reports_sections_once(self):
+        """Test that sections of a stream cut and retried are not reported twice."""
+        import httpx
+        import json
+        from unittest.mock import patch
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.rate_limiter import RateLimiter
+
+        def events(text):
+            return "".join(
+                f"data: {json.dumps({'choices': [{'delta': {'content': text[i:i + 20]}}]})}\n\n"
+                for i in range(0, len(text), 20)
+            )
+
+        cut = self.DOCUMENT.index(',{"type": "section", "title": "Two"')
+        calls = []
+
+        class CutStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield events(self.document[:cut]).encode()
+                raise httpx.ReadError("connection reset")
+
+        CutStream.document = self.DOCUMENT
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(200, stream=CutStream(), headers={"content-type": "text/event-stream"})
+            body = events(self.DOCUMENT) + "data: [DONE]\n\n"
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+        service = LLMService()
+        service.cache = None
+        service.streaming = True
+        service.rate_limiter = RateLimiter(0, 0, max_concurrency=4)
+        service._clients["http://llm.local"] = httpx.AsyncClient(
+            base_url="http://llm.local", transport=httpx.MockTransport(handler)
+        )
+        config = LLMConfig(
+            provider=LLMProvider.CUSTOM, api_key="none", model="m", base_url="http://llm.local"
+        )
+        titles = []
+
+        async def on_section(section):
+            titles.append(section["title"])
+
+        with patch.object(LLMService, "_backoff", return_value=0):
+            doc = await service.analyze_document("text", config, on_section)
+
+        assert len(calls) == 2
+        assert doc.metadata.title == "Streamed"
+        assert titles == ["One {not a brace}", "Two"]
+
+        await service.shutdown()
+
+    def test_anthropic_delta_extraction(self):
+        """Test reading text deltas from Anthropic stream events."""
+        from backend.app.models import LLMProvider
+        from backend.app.services.llm_service import LLMService
+
+        service = LLMService()
+        event = {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "{"}}
+
+        assert service._extract_delta(event, LLMProvider.ANTHROPIC) == "{"
+        assert service._extract_delta({"type": "ping"}, LLMProvider.ANTHROPIC) is None
+        with pytest.raises(ValueError):
+            service._extract_delta({"type": "error", "error": {}}, LLMProvider.ANTHROPIC)
+
+
+class TestRateLimiter:
+    """Tests for provider rate limits and adaptive concurrency."""
+
+    def test_parse_reset_formats(self):
+        """Test Retry-After and reset header formats."""
+        from datetime import datetime, timedelta, timezone
+        from backend.app.services.rate_limiter import parse_reset
+
+        assert parse_reset("7") == 7.0
+        assert parse_reset("6m0s") == 360.0
+        assert parse_reset("1m30.5s") == 90.5
+        assert parse_reset("20ms") == 0.02
+        future = (datetime.now(timezone.utc) + timedelta(seconds=30)).isoformat()
+        assert 28 < parse_reset(future) <= 30
+        assert parse_reset(None) is None
+        assert parse_reset("soon") is None
+
+    @pytest.mark.asyncio
+    async def test_headers_set_limits_and_pause(self):
+        """Test that rate-limit headers update the buckets and block at zero."""
+        import time
+        from backend.app.services.rate_limiter import ProviderLimiter
+
+        limiter = ProviderLimiter()
+        limiter.update({
+            "x-ratelimit-limit-requests": "500",
+            "x-ratelimit-remaining-requests": "499",
+            "x-ratelimit-limit-tokens": "30000",
+            "x-ratelimit-remaining-tokens": "0",
+            "x-ratelimit-reset-tokens": "2s",
+        })
+
+        assert limiter.requests.per_minute == 500
+        assert limiter.tokens.per_minute == 30000
+        assert limiter.tokens.available <= 0
+        assert limiter.blocked_until > time.monotonic() + 1
+
+    @pytest.mark.asyncio
+    async def test_aimd_window(self):
+        """Test that 429 halves the window and successes grow it back."""
+        from backend.app.services.rate_limiter import ProviderLimiter
+
+        limiter = ProviderLimiter(max_concurrency=8)
+        limiter.on_rate_limited(retry_after=0)
+        assert limiter.concurrency == 4
+
+        for _ in range(20):
+            limiter.on_success()
+        assert 4 < limiter.concurrency <= 8
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_delays_calls(self):
+        """Test that a spent token budget delays the next call."""
+        import time
+        from backend.app.services.rate_limiter import ProviderLimiter
+
+        limiter = ProviderLimiter(tokens_per_minute=6000)
+        await limiter.acquire(6000)
+        limiter.release()
+
+        started = time.monotonic()
+        await limiter.acquire(10)  # 10 tokens refill in 0.1s
+        assert time.monotonic() - started >= 0.08
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_limiters_dropped(self):
+        """Test that the registry stays bounded but keeps busy limiters."""
+        from backend.app.services.rate_limiter import RateLimiter
+
+        registry = RateLimiter(0, 0, max_concurrency=4, max_limiters=3)
+        busy = registry.get("custom", "key-0", "m")
+        await busy.acquire(10)
+        paused = registry.get("custom", "key-1", "m")
+        paused.on_rate_limited(retry_after=60)
+        recent = registry.get("custom", "key-2", "m")
+
+        for index in range(3, 10):
+            last = registry.get("custom", f"key-{index}", "m")
+
+        assert len(registry._limiters) == 3
+        assert list(registry._limiters.values()) == [busy, paused, last]
+        assert registry.get("custom", "key-2", "m") is not recent
+
+    @pytest.mark.asyncio
+    async def test_429_is_retried_after_retry_after(self):
+        """Test that a rate-limited call waits and succeeds instead of failing."""
+        import httpx
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.rate_limiter import RateLimiter
+
+        calls = []
+        body = {"choices": [{"message": {"content": '{"metadata": {"title": "OK"}, "sections": []}'}}]}
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"retry-after": "0.05"}, json={})
+            return httpx.Response(200, json=body)
+
+        service = LLMService()
+        service.cache = None
+        service.rate_limiter = RateLimiter(0, 0, max_concurrency=4)
+        service._clients["http://llm.local"] = httpx.AsyncClient(
+            base_url="http://llm.local", transport=httpx.MockTransport(handler)
+        )
+        config = LLMConfig(
+            provider=LLMProvider.CUSTOM, api_key="k", model="m", base_url="http://llm.local"
+        )
+
+        doc = await service.analyze_document("text", config)
+
+        assert doc.metadata.title == "OK"
+        assert len(calls) == 2
+        limiter = service.rate_limiter.get("custom", "k", "m")
+        assert limiter.concurrency < 4
+        assert limiter.in_flight == 0
+
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_429_fails_after_retries(self):
+        """Test that persistent 429s still fail once retries are exhausted."""
+        import httpx
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.rate_limiter import RateLimiter
+
+        service = LLMService()
+        service.cache = None
+        service.rate_limit_retries = 1
+        service.rate_limiter = RateLimiter(0, 0, max_concurrency=4)
+        service._clients["http://llm.local"] = httpx.AsyncClient(
+            base_url="http://llm.local",
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(429, headers={"retry-after": "0"}, json={})
+            ),
+        )
+        config = LLMConfig(
+            provider=LLMProvider.CUSTOM, api_key="k", model="m", base_url="http://llm.local"
+        )
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await service.analyze_document("text", config)
+
+        await service.shutdown()
+
+
+class TestRetriesAndRepair:
+    """Tests for transient error retries and invalid JSON recovery."""
+
+    def _service(self, handler):
+        import httpx
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.rate_limiter import RateLimiter
+
+        service = LLMService()
+        service.cache = None
+        service.rate_limiter = RateLimiter(0, 0, max_concurrency=4)
+        service._clients["http://llm.local"] = httpx.AsyncClient(
+            base_url="http://llm.local", transport=httpx.MockTransport(handler)
+        )
+        return service
+
+    def _config(self):
+        from backend.app.models import LLMConfig, LLMProvider
+        return LLMConfig(provider=LLMProvider.CUSTOM, api_key="k", model="m", base_url="http://llm.local")
+
+    @staticmethod
+    def _reply(content):
+        import httpx
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    def test_repair_json(self):
+        """Test local repair of prose, trailing commas and truncation."""
+        import json
+        from backend.app.services.json_stream import repair_json
+
+        repaired, truncated = repair_json('Voici :\n```json\n{"a": [1, 2,],}\n```\nFin.')
+        assert (json.loads(repaired), truncated) == ({"a": [1, 2]}, False)
+
+        repaired, truncated = repair_json('{"s": [{"t": "coupé', )
+        assert (json.loads(repaired), truncated) == ({"s": [{"t": "coupé"}]}, True)
+
+        repaired, truncated = repair_json('{"a": 1, "b":')
+        assert (json.loads(repaired), truncated) == ({"a": 1}, True)
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_retried(self):
+        """Test that a 503 and a timeout are retried with backoff."""
+        import httpx
+        from backend.app.services.llm_service import LLMService
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(503, json={})
+            if len(calls) == 2:
+                raise httpx.ReadTimeout("slow", request=request)
+            return self._reply('{"metadata": {"title": "OK"}, "sections": []}')
+
+        service = self._service(handler)
+        with patch.object(LLMService, "_backoff", return_value=0):
+            doc = await service.analyze_document("text", self._config())
+
+        assert doc.metadata.title == "OK"
+        assert len(calls) == 3
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_client_errors_not_retried(self):
+        """Test that a 401 fails immediately."""
+        import httpx
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(401, json={})
+
+        service = self._service(handler)
+        with pytest.raises(httpx.HTTPStatusError):
+            await service.analyze_document("text", self._config())
+
+        assert len(calls) == 1
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_truncated_answer_continued(self):
+        """Test that a cut answer is completed by a continue follow-up."""
+        import json
+        from backend.app.services.llm_service import CONTINUE_PROMPT
+
+        partial = '{"metadata": {"title": "T"}, "sections": [{"type": "section", "title": "A", "con'
+        rest = 'tent": []}, {"type": "section", "title": "B", "content": []}]}'
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return self._reply(partial if len(requests) == 1 else rest)
+
+        service = self._service(handler)
+        doc = await service.analyze_document("text", self._config())
+
+        assert [section.title for section in doc.sections] == ["A", "B"]
+        messages = requests[1]["messages"]
+        assert messages[-2] == {"role": "assistant", "content": partial}
+        assert messages[-1]["content"] == CONTINUE_PROMPT
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_invalid_structure_fixed_without_document(self):
+        """Test that invalid JSON is sent back alone to be fixed."""
+        import json
+        from backend.app.services.llm_service import FIX_PROMPT
+
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            if len(requests) == 1:
+                return self._reply('{"metadata": {}, "sections": []}')
+            return self._reply('{"metadata": {"title": "Fixed"}, "sections": []}')
+
+        service = self._service(handler)
+        doc = await service.analyze_document("secret document text", self._config())
+
+        assert doc.metadata.title == "Fixed"
+        assert requests[1]["messages"][0]["content"] == FIX_PROMPT
+        assert "secret document text" not in json.dumps(requests[1])
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_local_repair_needs_no_followup(self):
+        """Test that prose around valid JSON costs no extra call."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return self._reply('Voici le JSON :\n{"metadata": {"title": "T"}, "sections": [],}\nBonne lecture !')
+
+        service = self._service(handler)
+        doc = await service.analyze_document("text", self._config())
+
+        assert doc.metadata.title == "T"
+        assert len(calls) == 1
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_streamed_output_repaired(self):
+        """Test that a malformed streamed section is repaired, not failed."""
+        import httpx
+        import json
+
+        document = (
+            '{"metadata": {"title": "T"}, "sections": ['
+            '{"type": "section", "title": "A", "content": []},'
+            '{"type": "section", "title": "B", "content": [],},'
+            '{"type": "section", "title": "C", "content": []}]}'
+        )
+        body = "".join(
+            f"data: {json.dumps({'choices': [{'delta': {'content': document[i:i + 15]}}]})}\n\n"
+            for i in range(0, len(document), 15)
+        ) + "data: [DONE]\n\n"
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+        service = self._service(handler)
+        service.streaming = True
+        titles = []
+
+        async def on_section(section):
+            titles.append(section["title"])
+
+        doc = await service.analyze_document("text", self._config(), on_section)
+
+        assert [section.title for section in doc.sections] == ["A", "B", "C"]
+        assert titles == ["A", "B", "C"]
+        assert len(calls) == 1
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_recovered_analysis_not_cached(self):
+        """Test that an analysis salvaged from a truncated answer isn't cached."""
+        from backend.app.services.analysis_cache import AnalysisCache
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return self._reply('{"metadata": {"title": "T"}, "sections": [{"type": "section", "title": "A", "con')
+
+        service = self._service(handler)
+        service.repair_followups = False
+        service.cache = AnalysisCache()
+
+        doc = await service.analyze_document("text", self._config())
+        await service.analyze_document("text", self._config())
+
+        assert doc.sections == []
+        assert len(calls) == 2
+        await service.shutdown()
+
+
+class TestLLMMetrics:
+    """Tests for LLM metrics."""
+
+    @pytest.mark.asyncio
+    async def test_call_records_latency_tokens_and_retries(self):
+        """Test that a retried call records its latency, retry and reported usage."""
+        import httpx
+        from backend.app.metrics import LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_TOKENS
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.rate_limiter import RateLimiter
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(502, json={})
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": '{"metadata": {"title": "OK"}, "sections": []}'}}],
+                "usage": {"prompt_tokens": 1200, "completion_tokens": 300},
+            })
+
+        service = LLMService()
+        service.cache = None
+        service.metric_models = {"metrics-model"}
+        service.rate_limiter = RateLimiter(0, 0, max_concurrency=4)
+        service._clients["http://metrics.local"] = httpx.AsyncClient(
+            base_url="http://metrics.local", transport=httpx.MockTransport(handler)
+        )
+        config = LLMConfig(
+            provider=LLMProvider.CUSTOM, api_key="k", model="metrics-model", base_url="http://metrics.local"
+        )
+
+        labels = {"provider": "custom", "model": "metrics-model"}
+        calls_before = LLM_REQUEST_SECONDS.count(**labels)
+        retries_before = LLM_RETRIES.value(provider="custom", reason="transient")
+        tokens_before = LLM_TOKENS.value(direction="out", **labels)
+
+        with patch.object(LLMService, "_backoff", return_value=0):
+            await service.analyze_document("text", config)
+
+        assert LLM_REQUEST_SECONDS.count(**labels) == calls_before + 2
+        assert LLM_RETRIES.value(provider="custom", reason="transient") == retries_before + 1
+        assert LLM_TOKENS.value(direction="out", **labels) == tokens_before + 300
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_unknown_models_share_one_label(self):
+        """Test that model names outside the known list are labelled "other"."""
+        import httpx
+        from backend.app.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.rate_limiter import RateLimiter
+
+        def handler(request):
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": '{"metadata": {"title": "OK"}, "sections": []}'}}],
+            })
+
+        service = LLMService()
+        service.cache = None
+        service.rate_limiter = RateLimiter(0, 0, max_concurrency=4)
+        service._clients["http://metrics.local"] = httpx.AsyncClient(
+            base_url="http://metrics.local", transport=httpx.MockTransport(handler)
+        )
+
+        labels = {"provider": "custom", "model": "other"}
+        calls_before = LLM_REQUEST_SECONDS.count(**labels)
+
+        for model in ("caller-model-1", "caller-model-2"):
+            config = LLMConfig(
+                provider=LLMProvider.CUSTOM, api_key="k", model=model, base_url="http://metrics.local"
+            )
+            await service.analyze_document("text", config)
+
+        assert LLM_REQUEST_SECONDS.count(**labels) == calls_before + 2
+        assert LLM_REQUEST_SECONDS.count(provider="custom", model="caller-model-1") == 0
+        assert LLM_TOKENS.value(direction="out", **labels) > 0
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_streamed_usage_recorded(self):
+        """Test that a stream asks for usage and records the reported figures."""
+        import httpx
+        import json
+        from backend.app.metrics import LLM_TOKENS
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.rate_limiter import RateLimiter
+
+        document = '{"metadata": {"title": "OK"}, "sections": []}'
+        body = (
+            f"data: {json.dumps({'choices': [{'delta': {'content': document}}], 'usage': None})}\n\n"
+            f"data: {json.dumps({'choices': [], 'usage': {'prompt_tokens': 1234, 'completion_tokens': 56}})}\n\n"
+            "data: [DONE]\n\n"
+        )
+        payloads = []
+
+        def handler(request):
+            payloads.append(json.loads(request.content))
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+        service = LLMService()
+        service.cache = None
+        service.streaming = True
+        service.metric_models = {"stream-model"}
+        service.rate_limiter = RateLimiter(0, 0, max_concurrency=4)
+        service._clients["http://metrics.local"] = httpx.AsyncClient(
+            base_url="http://metrics.local", transport=httpx.MockTransport(handler)
+        )
+        config = LLMConfig(
+            provider=LLMProvider.CUSTOM, api_key="k", model="stream-model", base_url="http://metrics.local"
+        )
+
+        labels = {"provider": "custom", "model": "stream-model"}
+        tokens_in = LLM_TOKENS.value(direction="in", **labels)
+        tokens_out = LLM_TOKENS.value(direction="out", **labels)
+
+        await service.analyze_document("text", config)
+
+        assert payloads[0]["stream_options"] == {"include_usage": True}
+        assert LLM_TOKENS.value(direction="in", **labels) == tokens_in + 1234
+        assert LLM_TOKENS.value(direction="out", **labels) == tokens_out + 56
+        await service.shutdown()
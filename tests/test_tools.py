@@ -0,0 +1,166 @@
+"""Tests for the benchmark harness and the fake LLM server."""
+
+import pytest
+from unittest.mock import patch
+
+
+class TestFakeLLM:
+    """Tests for the fake OpenAI-compatible server."""
+
+    def test_answer_is_valid_document_structure(self):
+        """Test that the fake analysis validates and follows the input."""
+        import json
+        from fastapi.testclient import TestClient
+        from backend.app.models import DocumentStructure
+        from backend.app.tools.fake_llm import create_app
+
+        text = "Rapport annuel\n\n" + "\n\n".join(f"Paragraphe {i}." for i in range(9))
+        payload = {
+            "model": "fake-model",
+            "messages": [
+                {"role": "system", "content": "prompt"},
+                {"role": "user", "content": f"Document à analyser :\n---\n{text}\n---"},
+            ],
+        }
+
+        with TestClient(create_app()) as client:
+            first = client.post("/v1/chat/completions", json=payload).json()
+            second = client.post("/v1/chat/completions", json=payload).json()
+
+        content = first["choices"][0]["message"]["content"]
+        doc = DocumentStructure(**json.loads(content))
+
+        assert doc.metadata.title == "Rapport annuel"
+        assert len(doc.sections) == 3
+        assert content == second["choices"][0]["message"]["content"]
+        assert first["usage"]["completion_tokens"] > 0
+
+    def test_headings_lists_and_tables(self):
+        """Test that the heuristic sectioning follows the document structure."""
+        from backend.app.models import DocumentStructure
+        from backend.app.tools.fake_llm import build_document
+
+        text = (
+            "--- Page 1 ---\nRapport annuel\n\nPréambule.\n"
+            "1. Contexte\nLe projet a démarré.\n- point a\n- point b\n"
+            "| A | B |\n|---|---|\n| 1 | 2 |\n## Annexe\nTexte final."
+        )
+        doc = DocumentStructure(**build_document(text))
+
+        assert doc.metadata.title == "Rapport annuel"
+        assert [s.title for s in doc.sections] == ["Introduction", "1. Contexte", "Annexe"]
+        assert [b["type"] for b in doc.sections[1].content] == ["paragraph", "list", "table"]
+        assert doc.sections[1].content[2]["rows"] == [["1", "2"]]
+
+    def test_requests_per_minute_budget(self):
+        """Test that requests over the budget get a 429 with rate-limit headers."""
+        from fastapi.testclient import TestClient
+        from backend.app.tools.fake_llm import MockOptions, create_app
+
+        payload = {"model": "m", "messages": [{"role": "user", "content": "Titre\n\nTexte."}]}
+
+        with TestClient(create_app(MockOptions(requests_per_minute=2))) as client:
+            statuses = [client.post("/v1/chat/completions", json=payload) for _ in range(3)]
+            stats = client.get("/stats").json()
+
+        assert [r.status_code for r in statuses] == [200, 200, 429]
+        assert statuses[2].headers["x-ratelimit-remaining-requests"] == "0"
+        assert float(statuses[2].headers["retry-after"]) > 0
+        assert stats["rate_limited"] == 1
+
+    def test_streamed_answer(self):
+        """Test that a streamed answer joins into the plain one, with usage last."""
+        import json
+        from fastapi.testclient import TestClient
+        from backend.app.tools.fake_llm import MockOptions, create_app
+
+        payload = {"model": "m", "messages": [{"role": "user", "content": "Titre\n\nTexte."}]}
+
+        with TestClient(create_app(MockOptions(stream_chunk_chars=7))) as client:
+            plain = client.post("/v1/chat/completions", json=payload).json()
+            streamed = client.post("/v1/chat/completions", json={
+                **payload, "stream": True, "stream_options": {"include_usage": True},
+            })
+
+        events = [line[6:] for line in streamed.text.splitlines() if line.startswith("data: ")]
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(event) for event in events[:-1]]
+        text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks if c["choices"])
+
+        assert text == plain["choices"][0]["message"]["content"]
+        assert chunks[-1]["usage"] == plain["usage"]
+
+    @pytest.mark.asyncio
+    async def test_service_recovers_from_injected_failures(self):
+        """Test that retries and continuations get a full document through failures."""
+        from unittest.mock import patch
+        from backend.app.models import LLMConfig, LLMProvider
+        from backend.app.services.llm_service import LLMService
+        from backend.app.services.rate_limiter import RateLimiter
+        from backend.app.tools.fake_llm import FakeLLMServer, MockOptions, build_document, create_app
+
+        options = MockOptions(
+            error_rate=0.3, rate_limit_rate=0.3, retry_after_seconds=0.01, truncate_rate=0.5, seed=8
+        )
+        text = "Rapport\n\n1. Contexte\nTexte du contexte.\n2. Suite\nTexte de la suite."
+
+        service = LLMService()
+        service.cache = None
+        service.streaming = True
+        service.max_retries = service.rate_limit_retries = 20
+        service.rate_limiter = RateLimiter(0, 0, max_concurrency=4)
+
+        app = create_app(options)
+        with FakeLLMServer(app) as server, patch.object(LLMService, "_backoff", return_value=0):
+            config = LLMConfig(
+                provider=LLMProvider.CUSTOM, api_key="k", model="mock", base_url=server.base_url
+            )
+            try:
+                doc = await service.analyze_document(text, config)
+            finally:
+                await service.shutdown()
+
+        expected = build_document(text)
+        assert [s.title for s in doc.sections] == [s["title"] for s in expected["sections"]]
+        stats = app.state.mock.stats
+        assert stats["errors"] and stats["rate_limited"] and stats["continuations"]
+
+
+class TestBenchmark:
+    """Tests for the benchmark harness."""
+
+    def test_synthetic_documents_are_deterministic(self):
+        """Test that a seed always gives the same extractable document."""
+        from backend.app.extractors import pdf_extractor
+        from backend.app.tools.benchmark import make_docx, make_pdf, synthetic_pages
+
+        assert synthetic_pages(3, seed=7) == synthetic_pages(3, seed=7)
+        assert synthetic_pages(3, seed=7) != synthetic_pages(3, seed=8)
+
+        text = pdf_extractor.extract_from_bytes(make_pdf(2, seed=1))
+        heading, paragraphs = synthetic_pages(2, seed=1)[1]
+        assert heading in text
+        assert paragraphs[0].split()[0] in text
+        assert make_docx(1, seed=1)[:2] == b"PK"
+
+    def test_run_reports_levels(self, tmp_path):
+        """Test a small end-to-end run through the fake server."""
+        import json
+        from backend.app.services.pdf_generator import pdf_generator
+        from backend.app.tools.benchmark import main
+
+        output = tmp_path / "bench.json"
+        with patch.object(pdf_generator, "shutdown") as shutdown:
+            report = main([
+                "--pages", "2", "--documents", "2", "--concurrency", "1,2",
+                "--kind", "both", "--llm-latency-ms", "0", "--json", str(output),
+            ])
+
+        shutdown.assert_awaited_once()
+
+        assert json.loads(output.read_text()) == report
+        assert [level["concurrency"] for level in report["levels"]] == [1, 2]
+        for level in report["levels"]:
+            assert level["errors"] == 0
+            assert level["documents"] == 2
+            assert {"extract", "chunk", "analyze", "html"} <= set(level["stages"])